@@ -0,0 +1,93 @@
+# Benchmark: chat message write throughput under concurrent writers.
+# Compares the old pattern (one commit per message, default rollback journal) against the
+# write-behind queue (batched inserts, WAL, synchronous=NORMAL) on a scratch SQLite database.
+#
+# Run from the project directory:
+#   python benchmarks/bench_chat_writes.py [--writers 16] [--messages 200]
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from write_behind import WriteBehindQueue
+
+SCHEMA = (
+    "CREATE TABLE chat_message (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, "
+    "message TEXT NOT NULL, is_user BOOLEAN NOT NULL, timestamp DATETIME)"
+)
+INSERT = "INSERT INTO chat_message (session_id, message, is_user, timestamp) VALUES (?, ?, ?, ?)"
+
+
+def connect(path, wal):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    if wal:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def run_writers(writers, messages, write):
+    def writer(session_id):
+        for i in range(messages):
+            write((session_id, f"message {i} of session {session_id}", i % 2 == 0, datetime.utcnow().isoformat()))
+
+    threads = [threading.Thread(target=writer, args=(session_id,)) for session_id in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def per_row_commits(path, writers, messages):
+    local = threading.local()
+
+    def write(row):
+        if not hasattr(local, 'connection'):
+            local.connection = connect(path, wal=False)
+        local.connection.execute(INSERT, row)
+        local.connection.commit()
+
+    return run_writers(writers, messages, write)
+
+
+def write_behind(path, writers, messages):
+    connection = connect(path, wal=True)
+
+    def flush(rows):
+        with connection:
+            connection.executemany(INSERT, rows)
+
+    queue = WriteBehindQueue(flush)
+    started = time.perf_counter()
+    run_writers(writers, messages, queue.add)
+    queue.close()  # Includes the final flush, so every row is written when timing stops
+    return time.perf_counter() - started, queue.stats()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--messages', type=int, default=200, help='Messages per writer')
+    args = parser.parse_args()
+    total = args.writers * args.messages
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('per_row', 'write_behind'):
+            with sqlite3.connect(os.path.join(directory, f'{name}.db')) as connection:
+                connection.execute(SCHEMA)
+
+        per_row = per_row_commits(os.path.join(directory, 'per_row.db'), args.writers, args.messages)
+        batched, stats = write_behind(os.path.join(directory, 'write_behind.db'), args.writers, args.messages)
+
+    print(f"{args.writers} writers x {args.messages} messages = {total} rows")
+    print(f"{'mode':<16}{'seconds':>10}{'rows/s':>12}")
+    print(f"{'per-row commit':<16}{per_row:>10.2f}{total / per_row:>12.0f}")
+    print(f"{'write-behind':<16}{batched:>10.2f}{total / batched:>12.0f}   ({stats['flushed_batches']} batches)")
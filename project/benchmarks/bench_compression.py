@@ -0,0 +1,189 @@
+# Benchmark: on-disk size and read latency of the large text columns under each codec.
+# Writes the same corpus (stored transcripts and summaries, or a directory of .txt files) into
+# scratch SQLite databases as plain text, zlib, zstd and zstd with a trained dictionary, then
+# times random single-row reads including decompression. Transcript segments are then stored
+# both ways: with their own copy of the text (as before) and as offsets into the transcript, and
+# the combined size of transcripts plus segments is compared.
+#
+# Run from the project directory:
+#   python benchmarks/bench_compression.py [--db ../instance/youtube_videos.db] [--transcripts DIR] [--reads 2000]
+import argparse
+import glob
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compression
+from compression import TextCodec
+
+CORPUS_QUERIES = (
+    "SELECT transcript FROM you_tube_video",
+    "SELECT summary FROM file_summary",
+    "SELECT summary FROM code_summary",
+)
+
+
+def load_corpus(args):
+    if args.transcripts:
+        documents = []
+        for path in sorted(glob.glob(os.path.join(args.transcripts, '*.txt'))):
+            with open(path, encoding='utf-8') as f:
+                documents.append(f.read())
+        return documents
+    # Raw values, so rows that are already compressed are decoded here (any stored dictionaries
+    # are read from the compression_dictionaries directory next to the database)
+    reader = TextCodec()
+    reader.configure(os.path.join(os.path.dirname(os.path.abspath(args.db)), 'compression_dictionaries'))
+    connection = sqlite3.connect(f'file:{args.db}?mode=ro', uri=True)
+    documents = []
+    for query in CORPUS_QUERIES:
+        try:
+            documents.extend(reader.decompress(value) for (value,) in connection.execute(query))
+        except sqlite3.OperationalError:
+            pass  # Table not created yet
+    connection.close()
+    return [document for document in documents if document]
+
+
+# Segment texts per transcript: the stored segments (sliced from their transcript when only offsets
+# are stored), or the lines of each .txt file, as in a caption file
+def load_segments(args):
+    if args.transcripts:
+        segments = []
+        for path in sorted(glob.glob(os.path.join(args.transcripts, '*.txt'))):
+            with open(path, encoding='utf-8') as f:
+                segments.append([line.strip() for line in f if line.strip()])
+        return segments
+    reader = TextCodec()
+    reader.configure(os.path.join(os.path.dirname(os.path.abspath(args.db)), 'compression_dictionaries'))
+    connection = sqlite3.connect(f'file:{args.db}?mode=ro', uri=True)
+    segments = {}
+    try:
+        transcripts = dict(connection.execute("SELECT video_id, transcript FROM you_tube_video"))
+        rows = connection.execute(
+            "SELECT video_id, text, text_start, text_end FROM transcript_segment ORDER BY video_id, start_ms"
+        )
+        for video_id, text, text_start, text_end in rows:
+            if text_start is not None:
+                if not isinstance(transcripts.get(video_id, ''), str):
+                    transcripts[video_id] = reader.decompress(transcripts[video_id])
+                text = transcripts.get(video_id, '')[text_start:text_end]
+            segments.setdefault(video_id, []).append(text)
+    except sqlite3.OperationalError:
+        pass  # Tables not created yet, or from before the offsets
+    connection.close()
+    return list(segments.values())
+
+
+# Size of a transcript_segment table holding the segments with their text or with offsets only
+def measure_segments(path, segments, with_text):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE transcript_segment (id INTEGER PRIMARY KEY, video_id VARCHAR(100) NOT NULL, start_ms INTEGER NOT NULL, "
+        "duration_ms INTEGER NOT NULL, text TEXT NOT NULL, text_start INTEGER, text_end INTEGER)"
+    )
+    connection.execute("CREATE INDEX ix_transcript_segment_video_start ON transcript_segment (video_id, start_ms)")
+
+    def rows():
+        for video, texts in enumerate(segments):
+            offset = 0
+            for index, text in enumerate(texts):
+                if with_text:
+                    yield f'video{video:06d}', index * 3000, 3000, text, None, None
+                else:
+                    yield f'video{video:06d}', index * 3000, 3000, '', offset, offset + len(text)
+                offset += len(text) + 1
+
+    with connection:
+        connection.executemany(
+            "INSERT INTO transcript_segment (video_id, start_ms, duration_ms, text, text_start, text_end) VALUES (?, ?, ?, ?, ?, ?)",
+            rows()
+        )
+    connection.execute("VACUUM")
+    connection.close()
+    return os.path.getsize(path)
+
+
+# name -> encode, decode (None = stored as plain text)
+def codecs(directory, training_samples):
+    yield 'none', None
+    zlib_codec = TextCodec(use_zstd=False)
+    yield 'zlib', zlib_codec
+    if compression.zstandard is None:
+        print("zstandard is not installed; skipping the zstd codecs")
+        return
+    yield 'zstd', TextCodec()
+    dictionary_codec = TextCodec()
+    dictionary_codec.configure(os.path.join(directory, 'dictionaries'))
+    if dictionary_codec.train(training_samples):
+        yield 'zstd+dict', dictionary_codec
+    else:
+        print(f"Too few documents to train a dictionary (need {compression.MIN_TRAINING_SAMPLES})")
+
+
+def measure(path, documents, codec, reads):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE document (id INTEGER PRIMARY KEY, body TEXT NOT NULL)")
+    with connection:
+        connection.executemany(
+            "INSERT INTO document (id, body) VALUES (?, ?)",
+            ((i, codec.compress(document) if codec else document) for i, document in enumerate(documents))
+        )
+    connection.execute("VACUUM")
+    size = os.path.getsize(path)
+
+    latencies = []
+    for _ in range(reads):
+        row_id = random.randrange(len(documents))
+        started = time.perf_counter()
+        (value,) = connection.execute("SELECT body FROM document WHERE id = ?", (row_id,)).fetchone()
+        text = codec.decompress(value) if codec else value
+        latencies.append(time.perf_counter() - started)
+        assert text == documents[row_id]
+    connection.close()
+    latencies.sort()
+    return size, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=os.path.join('..', 'instance', 'youtube_videos.db'))
+    parser.add_argument('--transcripts', help='Directory of .txt files to use instead of the database')
+    parser.add_argument('--reads', type=int, default=2000)
+    args = parser.parse_args()
+
+    documents = load_corpus(args)
+    if not documents:
+        sys.exit("No documents to benchmark")
+    segments = load_segments(args)
+    raw_bytes = sum(len(document.encode('utf-8')) for document in documents)
+    print(f"{len(documents)} documents, {raw_bytes / 1024 ** 2:.2f} MB of text")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The dictionary is trained on half of the documents, as the migration trains on a sample
+        results = [
+            (name, measure(os.path.join(directory, f'{name}.db'), documents, codec, args.reads))
+            for name, codec in codecs(directory, documents[::2])
+        ]
+        if segments:
+            segments_with_text = measure_segments(os.path.join(directory, 'segments-text.db'), segments, True)
+            segments_offsets = measure_segments(os.path.join(directory, 'segments-offsets.db'), segments, False)
+
+    print(f"{'codec':<12}{'db MB':>10}{'ratio':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    baseline = results[0][1][0]
+    for name, (size, p50, p95) in results:
+        print(f"{name:<12}{size / 1024 ** 2:>10.2f}{baseline / size:>8.2f}{p50 * 1000:>10.3f}{p95 * 1000:>10.3f}")
+
+    if segments:
+        # Before: plain transcripts and segments with their own text; after: the best codec and offsets
+        best_name, (best_size, _, _) = min(results, key=lambda result: result[1][0])
+        before, after = baseline + segments_with_text, best_size + segments_offsets
+        print(f"\n{sum(len(texts) for texts in segments)} transcript segments: "
+              f"{segments_with_text / 1024 ** 2:.2f} MB with text, {segments_offsets / 1024 ** 2:.2f} MB as offsets")
+        print(f"Transcripts + segments: {before / 1024 ** 2:.2f} MB (none, segment text) -> "
+              f"{after / 1024 ** 2:.2f} MB ({best_name}, offsets), ratio {before / after:.2f}")
@@ -0,0 +1,102 @@
+# Benchmark: memory and time per history page load with many stored videos.
+# Fills a scratch SQLite database (the app's models, not youtube_videos.db) with --videos videos
+# and one chat session per video, then measures the peak Python allocation (tracemalloc) of:
+#   full rows    - loading every video and session with all columns (the old /history pattern)
+#   deferred     - loading the same model objects with the large text columns deferred
+#   history page - the column-only keyset query behind /get-chat-history (one page)
+#
+# Run from the project directory:
+#   python benchmarks/bench_history_memory.py [--videos 10000] [--transcript-kb 20]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, undefer
+
+import project
+from project import ChatSession, User, YouTubeVideo
+
+WORDS = ("the model learns a representation of each frame and then the decoder predicts the next token "
+         "so that attention over long inputs stays cheap while gradients flow through every layer").split()
+
+
+def fill(session, videos, transcript_kb):
+    # Transcripts are drawn from a pool of sentences, so building them stays fast
+    sentences = [' '.join(random.choices(WORDS, k=random.randint(8, 20))) + '.' for _ in range(500)]
+    sentence_count = transcript_kb * 1024 // 90
+    user = User(email='bench@example.com', nickname='bench', password='-')
+    session.add(user)
+    session.flush()
+    started = datetime(2024, 1, 1)
+    for start in range(0, videos, 500):
+        for i in range(start, min(start + 500, videos)):
+            session.add(YouTubeVideo(
+                video_id=f'video{i:07d}', title=f'Video {i}',
+                description=' '.join(random.choices(sentences, k=20)),
+                transcript=' '.join(random.choices(sentences, k=sentence_count)),
+            ))
+            session.add(ChatSession(
+                user_id=user.id, date=started + timedelta(minutes=i), title=f'Video {i}',
+                description=f'Questions about video {i}', video_id=f'video{i:07d}',
+            ))
+        session.commit()
+    return user.id
+
+
+def full_rows(session, user_id):
+    videos = session.query(YouTubeVideo).options(undefer(YouTubeVideo.description), undefer(YouTubeVideo.transcript)).all()
+    sessions = session.query(ChatSession).options(undefer(ChatSession.description)).filter_by(user_id=user_id).all()
+    return [video.title for video in videos] + [chat_session.title for chat_session in sessions]
+
+
+def deferred(session, user_id):
+    videos = session.query(YouTubeVideo).all()
+    sessions = session.query(ChatSession).filter_by(user_id=user_id).all()
+    return [video.title for video in videos] + [chat_session.title for chat_session in sessions]
+
+
+def history_page(session, user_id):
+    return session.query(ChatSession.id, ChatSession.date, ChatSession.title, ChatSession.description).filter(
+        ChatSession.user_id == user_id
+    ).order_by(ChatSession.date.desc(), ChatSession.id.desc()).limit(project.HISTORY_PAGE_SIZE + 1).all()
+
+
+def measure(engine, load, user_id):
+    # A fresh session per load, so nothing is served from the identity map of an earlier one
+    with Session(engine) as session:
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = load(session, user_id)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return len(rows), peak, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--videos', type=int, default=10000)
+    parser.add_argument('--transcript-kb', type=int, default=20, help='Approximate transcript size per video')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'history.db')}")
+        project.db.metadata.create_all(engine)
+        with Session(engine) as session:
+            user_id = fill(session, args.videos, args.transcript_kb)
+        size = os.path.getsize(os.path.join(directory, 'history.db'))
+        print(f"{args.videos} videos, ~{args.transcript_kb} KB transcripts, database {size / 1024 ** 2:.1f} MB")
+
+        print(f"{'load':<14}{'rows':>8}{'peak MB':>10}{'seconds':>10}")
+        for name, load in (('full rows', full_rows), ('deferred', deferred), ('history page', history_page)):
+            rows, peak, elapsed = measure(engine, load, user_id)
+            print(f"{name:<14}{rows:>8}{peak / 1024 ** 2:>10.1f}{elapsed:>10.3f}")
+        engine.dispose()
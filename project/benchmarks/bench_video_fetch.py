@@ -0,0 +1,65 @@
+# Benchmark: cold-video fetch latency with stubbed YouTube Data API and transcript upstreams.
+# Compares fetching metadata then transcript one after the other against
+# get_video_info_and_transcript, which runs both at once.
+#
+# Run from the project directory:  python benchmarks/bench_video_fetch.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project
+
+METADATA_LATENCY = 0.4
+TRANSCRIPT_LATENCY = 0.7
+RUNS = 5
+
+
+class StubRequest:
+    def execute(self, **kwargs):
+        time.sleep(METADATA_LATENCY)
+        return {'items': [{'snippet': {'title': 'Stub title', 'description': 'Stub description'}}]}
+
+
+class StubVideos:
+    def list(self, **kwargs):
+        return StubRequest()
+
+
+class StubYouTube:
+    def videos(self):
+        return StubVideos()
+
+
+class StubTranscriptApi:
+    @staticmethod
+    def get_transcript(video_id):
+        time.sleep(TRANSCRIPT_LATENCY)
+        return [{'text': 'hello', 'start': 0.0, 'duration': 1.0}, {'text': 'world', 'start': 1.0, 'duration': 1.0}]
+
+
+def sequential_fetch(video_id):
+    title, description = project.fetch_video_metadata(video_id)
+    return title, description, project.fetch_transcript(video_id)
+
+
+def timed(function):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        function('dQw4w9WgXcQ')
+        timings.append(time.perf_counter() - started)
+    return sum(timings) / len(timings)
+
+
+if __name__ == '__main__':
+    project.youtube = StubYouTube()
+    project.YouTubeTranscriptApi = StubTranscriptApi
+
+    sequential = timed(sequential_fetch)
+    concurrent = timed(project.get_video_info_and_transcript)
+
+    print(f"upstream latency: metadata {METADATA_LATENCY:.2f}s, transcript {TRANSCRIPT_LATENCY:.2f}s")
+    print(f"sequential: {sequential:.3f}s per video")
+    print(f"concurrent: {concurrent:.3f}s per video ({sequential / concurrent:.2f}x faster)")
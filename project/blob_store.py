@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; only in-process locking is used there
+    fcntl = None
+
+READ_BLOCK_BYTES = 1024 * 1024
+# Unattached uploads and temporary files older than this are left over from a crashed request
+STALE_SECONDS = 24 * 60 * 60
+
+# A saved upload: its content hash, size and a path to read it from (a reference of its own)
+Upload = namedtuple('Upload', ['sha256', 'size', 'path'])
+
+
+# Content-addressed store for uploaded files. Each distinct content is stored once, as
+# blobs/<aa>/<sha256><ext>; everything that uses it holds a hard link to that file:
+#   pending/<uuid>-<sha256><ext> an upload still being processed
+#   sessions/<id>/<sha256><ext>  an upload that belongs to a chat session
+# A blob's link count is therefore its reference count, and a blob whose only link is its own
+# is an orphan and is deleted. Linking and unlinking happen under a lock (a thread lock plus a
+# file lock across worker processes) so a blob is never deleted while a new reference is made.
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.pending_dir = os.path.join(root, 'pending')
+        self.session_dir = os.path.join(root, 'sessions')
+        self.temp_dir = os.path.join(root, 'tmp')
+        self.lock = threading.Lock()
+        for directory in (self.blob_dir, self.pending_dir, self.session_dir, self.temp_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self.lock, open(os.path.join(self.root, '.lock'), 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def blob_path(self, sha256, extension):
+        return os.path.join(self.blob_dir, sha256[:2], sha256 + extension)
+
+    def _blob_for(self, name):
+        return self.blob_path(name[:64], name[64:])
+
+    # Stream an upload to disk, hashing it on the way, and store it unless the same content is
+    # already stored. Returns an Upload holding a pending reference: attach() it to a session or
+    # discard() it when done.
+    def save(self, stream, extension):
+        digest, size = hashlib.sha256(), 0
+        handle, temp_path = tempfile.mkstemp(suffix=extension, dir=self.temp_dir)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                for block in iter(lambda: stream.read(READ_BLOCK_BYTES), b''):
+                    digest.update(block)
+                    size += len(block)
+                    f.write(block)
+            sha256 = digest.hexdigest()
+            blob = self.blob_path(sha256, extension)
+            pending = os.path.join(self.pending_dir, f'{uuid.uuid4().hex}-{sha256}{extension}')
+            with self._locked():
+                if os.path.exists(blob):
+                    logging.info(f"Upload {sha256[:12]} is already stored ({os.stat(blob).st_nlink - 1} references)")
+                else:
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    os.replace(temp_path, blob)
+                os.link(blob, pending)
+                os.utime(pending)  # Links share the blob's mtime; a new reference must not look stale
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return Upload(sha256, size, pending)
+
+    # Make a pending upload part of a chat session; returns its path there
+    def attach(self, upload, session_id):
+        directory = os.path.join(self.session_dir, str(session_id))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, upload.sha256 + os.path.splitext(upload.path)[1])
+        with self._locked():
+            if os.path.exists(path):  # Same content attached twice
+                self._unlink(upload.path)
+            else:
+                os.replace(upload.path, path)
+        return path
+
+    # Drop a pending upload that is not kept (a failed upload, or an image only read once)
+    def discard(self, upload):
+        with self._locked():
+            self._unlink(upload.path)
+
+    # Remove a deleted session's references, and the blobs nothing else refers to
+    def release_session(self, session_id):
+        directory = os.path.join(self.session_dir, str(session_id))
+        if not os.path.isdir(directory):
+            return
+        with self._locked():
+            for name in os.listdir(directory):
+                self._unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    # Unlink a reference; deletes its blob when that was the last one. Caller holds the lock.
+    def _unlink(self, path):
+        name = os.path.basename(path)
+        if os.path.dirname(path) == self.pending_dir:
+            name = name.split('-', 1)[1]
+        blob = self._blob_for(name)
+        os.remove(path)
+        if os.path.exists(blob) and os.stat(blob).st_nlink == 1:
+            os.remove(blob)
+
+    # Full sweep: remove stale pending references and temporary files, the references of sessions
+    # that no longer exist (when `live_session_ids` is given) and every orphaned blob.
+    # Returns the number of blobs and bytes freed.
+    def reap(self, live_session_ids=None, stale_seconds=STALE_SECONDS):
+        cutoff = time.time() - stale_seconds
+        with self._locked():
+            for directory in (self.pending_dir, self.temp_dir):
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+            if live_session_ids is not None:
+                live = {str(session_id) for session_id in live_session_ids}
+                for name in os.listdir(self.session_dir):
+                    if name not in live:
+                        shutil.rmtree(os.path.join(self.session_dir, name))
+
+            blobs, freed = 0, 0
+            for directory, _, names in os.walk(self.blob_dir):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    if stat.st_nlink == 1:
+                        os.remove(path)
+                        blobs, freed = blobs + 1, freed + stat.st_size
+        return blobs, freed
+
+    def stats(self):
+        blobs, stored, referenced = 0, 0, 0
+        for directory, _, names in os.walk(self.blob_dir):
+            for name in names:
+                stat = os.stat(os.path.join(directory, name))
+                blobs, stored = blobs + 1, stored + stat.st_size
+                referenced += stat.st_size * (stat.st_nlink - 1)
+        # referenced_bytes is what the uploads would take without deduplication
+        return {'blobs': blobs, 'stored_bytes': stored, 'referenced_bytes': referenced}
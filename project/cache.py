@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def value_size(value):
+    # Array-backed values report their own size
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    return len(json.dumps(value).encode('utf-8'))
+
+
+# In-process LRU cache bounded by the total size of its values in bytes, not the number of entries.
+# Entries can also expire after `ttl` seconds so that workers pick up changes made by other processes.
+class ByteLRUCache:
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, size, stored_at)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and self.ttl and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = value_size(value)
+        with self.lock:
+            self._remove(key)
+            # A value larger than the whole cache is not stored at all
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, size, time.monotonic())
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[1]
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.total_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared cache tier: one JSON file per key in a local directory, usable by several worker processes
+class DiskCache:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        # Write to a temporary file and rename it so readers never see a partial entry
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(temp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+# Memory tier in front of an optional shared disk tier
+class TieredCache:
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk:
+            self.disk.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk:
+            self.disk.delete(key)
+
+
+def normalize_prompt(text):
+    return re.sub(r'\s+', ' ', (text or '').lower()).strip().rstrip('?.!').strip()
+
+
+def content_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+# Cache of model responses in its own SQLite file, keyed on (model, context hash, normalized prompt).
+# Entries expire after `ttl` seconds; once the stored responses exceed `max_bytes`
+# the least recently used ones are evicted.
+class ResponseCache:
+    def __init__(self, path, ttl, max_bytes):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, '
+                'size INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_last_used ON response_cache (last_used)')
+
+    # One connection per thread; sqlite3 connections cannot be shared between threads
+    def _connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = sqlite3.connect(self.path, timeout=5)
+        return self.local.connection
+
+    @staticmethod
+    def make_key(model, context, prompt):
+        return content_hash(model, content_hash(context), normalize_prompt(prompt))
+
+    def get(self, key):
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT response FROM response_cache WHERE key = ? AND created_at > ?', (key, now - self.ttl)
+            ).fetchone()
+            if row:
+                connection.execute('UPDATE response_cache SET last_used = ? WHERE key = ?', (now, key))
+        if row:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def set(self, key, model, response):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO response_cache (key, model, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict(connection, now)
+
+    def _evict(self, connection, now):
+        connection.execute('DELETE FROM response_cache WHERE created_at <= ?', (now - self.ttl,))
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM response_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries from least recently used, deleting until back under the limit
+        evict_keys = []
+        for key, size in connection.execute('SELECT key, size FROM response_cache ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            evict_keys.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM response_cache WHERE key = ?', evict_keys)
+
+    def stats(self):
+        with self._connection() as connection:
+            entries, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache').fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,175 @@
+import os
+import struct
+import threading
+import zlib
+
+from sqlalchemy import types
+
+try:
+    import zstandard
+except ImportError:  # zlib is used instead
+    zstandard = None
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+# Values shorter than this are stored uncompressed (still with a header)
+MIN_COMPRESS_BYTES = 256
+DICTIONARY_BYTES = 112 * 1024
+MIN_TRAINING_SAMPLES = 20
+
+# Stored values start with a two-byte tag; a leading NUL never occurs in stored text.
+# zstd values carry the id of the dictionary they were compressed with (0 = none).
+RAW, ZLIB, ZSTD = b'\x00r', b'\x00z', b'\x00Z'
+DICTIONARY_ID = struct.Struct('>I')
+
+
+# Compresses text for storage with zstd (using the newest trained dictionary, if any) or
+# zlib when zstandard is not installed. Values written by either codec, and plain text from
+# before compression was enabled, can always be read back. Dictionaries are kept as
+# <id>.dict files so that every process can decode values written by the others.
+class TextCodec:
+    def __init__(self, use_zstd=True):
+        self.use_zstd = use_zstd and zstandard is not None
+        self.dictionary_dir = None
+        self.dictionaries = {}
+        self.current_dictionary = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()  # zstd (de)compressor objects are not thread-safe
+
+    def configure(self, dictionary_dir):
+        self.dictionary_dir = dictionary_dir
+        os.makedirs(dictionary_dir, exist_ok=True)
+        ids = [int(name[:-5]) for name in os.listdir(dictionary_dir) if name.endswith('.dict') and name[:-5].isdigit()]
+        self.current_dictionary = max(ids, default=0)
+
+    def _dictionary(self, dictionary_id):
+        if dictionary_id not in self.dictionaries:
+            with self.lock:
+                if dictionary_id not in self.dictionaries:
+                    path = os.path.join(self.dictionary_dir or '', f'{dictionary_id}.dict')
+                    with open(path, 'rb') as f:
+                        self.dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(f.read())
+        return self.dictionaries[dictionary_id]
+
+    def _compressor(self, dictionary_id):
+        compressors = self.local.__dict__.setdefault('compressors', {})
+        if dictionary_id not in compressors:
+            dictionary = self._dictionary(dictionary_id) if dictionary_id else None
+            compressors[dictionary_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+        return compressors[dictionary_id]
+
+    def _decompressor(self, dictionary_id):
+        decompressors = self.local.__dict__.setdefault('decompressors', {})
+        if dictionary_id not in decompressors:
+            dictionary = self._dictionary(dictionary_id) if dictionary_id else None
+            decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return decompressors[dictionary_id]
+
+    def compress(self, text):
+        data = text.encode('utf-8')
+        if len(data) < MIN_COMPRESS_BYTES:
+            return RAW + data
+        if not self.use_zstd:
+            return ZLIB + zlib.compress(data, ZLIB_LEVEL)
+        dictionary_id = self.current_dictionary
+        return ZSTD + DICTIONARY_ID.pack(dictionary_id) + self._compressor(dictionary_id).compress(data)
+
+    def decompress(self, value):
+        if value is None or isinstance(value, str):
+            return value  # Rows written before compression
+        value = bytes(value)
+        tag, body = value[:2], value[2:]
+        if tag == RAW:
+            return body.decode('utf-8')
+        if tag == ZLIB:
+            return zlib.decompress(body).decode('utf-8')
+        if tag == ZSTD:
+            if zstandard is None:
+                raise RuntimeError("This value is zstd-compressed; install zstandard to read it.")
+            (dictionary_id,) = DICTIONARY_ID.unpack_from(body)
+            # A decompressobj also reads frames written by StreamCompressor, which carry no content size
+            return self._decompressor(dictionary_id).decompressobj().decompress(body[DICTIONARY_ID.size:]).decode('utf-8')
+        return value.decode('utf-8')
+
+    def stream_compressor(self):
+        return StreamCompressor(self)
+
+    # Train a dictionary on sample texts and make it the one used for new values.
+    # Returns its id, or None when zstandard is missing or there are too few samples.
+    def train(self, samples):
+        samples = [sample.encode('utf-8') for sample in samples if sample]
+        if not self.use_zstd or len(samples) < MIN_TRAINING_SAMPLES:
+            return None
+        dictionary = zstandard.train_dictionary(DICTIONARY_BYTES, samples, level=ZSTD_LEVEL)
+        with self.lock:
+            dictionary_id = self.current_dictionary + 1
+            path = os.path.join(self.dictionary_dir, f'{dictionary_id}.dict')
+            with open(f'{path}.tmp', 'wb') as f:
+                f.write(dictionary.as_bytes())
+            os.replace(f'{path}.tmp', path)
+            self.dictionaries[dictionary_id] = dictionary
+            self.current_dictionary = dictionary_id
+        return dictionary_id
+
+
+# compress() for text written in pieces: only the compressed form is kept, so a long text never
+# has to be held (or joined) in memory. value() gives what compress() of the whole text would
+# store, and can be assigned to a CompressedText column as is.
+class StreamCompressor:
+    def __init__(self, codec):
+        self.codec = codec
+        self.head = []  # Buffered until there is enough to be worth compressing
+        self.head_bytes = 0
+        self.encoder = None
+        self.parts = []
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        if self.encoder is None:
+            self.head.append(data)
+            self.head_bytes += len(data)
+            if self.head_bytes < MIN_COMPRESS_BYTES:
+                return
+            self._start()
+            data, self.head = b''.join(self.head), []
+        self.parts.append(self.encoder.compress(data))
+
+    def _start(self):
+        if not self.codec.use_zstd:
+            self.parts.append(ZLIB)
+            self.encoder = zlib.compressobj(ZLIB_LEVEL)
+            return
+        dictionary_id = self.codec.current_dictionary
+        dictionary = self.codec._dictionary(dictionary_id) if dictionary_id else None
+        self.parts.append(ZSTD + DICTIONARY_ID.pack(dictionary_id))
+        # A compressor of its own: the codec's per-thread ones may be used while this one is open
+        self.encoder = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary).compressobj()
+
+    def value(self):
+        if self.encoder is None:
+            return RAW + b''.join(self.head)
+        return b''.join(self.parts) + self.encoder.flush()
+
+
+text_codec = TextCodec()
+
+
+# SQL function form of text_codec.decompress, registered on each SQLite connection so that
+# triggers and views (e.g. the full-text indexes) can read compressed columns
+def register_sqlite_functions(dbapi_connection):
+    dbapi_connection.create_function('decompress_text', 1, text_codec.decompress, deterministic=True)
+
+
+# Text column stored compressed. The column keeps its TEXT declaration (no schema change):
+# SQLite stores the compressed bytes as a BLOB, and uncompressed rows still read back as-is.
+class CompressedText(types.TypeDecorator):
+    impl = types.Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value  # Already encoded (StreamCompressor.value())
+        return text_codec.compress(value)
+
+    def process_result_value(self, value, dialect):
+        return text_codec.decompress(value)
@@ -0,0 +1,198 @@
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from multiprocessing import context as mp_context
+
+import docx
+from PyPDF2 import PdfReader
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", min(os.cpu_count() or 1, 4)))
+# PDF pages are extracted in tasks of this many pages, at most 2 tasks per worker in flight
+PAGES_PER_TASK = 8
+# Smaller PDFs are extracted in-process; handing them to the pool costs more than it saves
+MIN_PARALLEL_PAGES = 16
+DOCX_PARAGRAPHS_PER_PIECE = 200
+READ_BLOCK_BYTES = 1024 * 1024
+# Part of the cache key: bump when extraction output changes so cached results are not reused
+EXTRACTION_VERSION = 1
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Worker side: a pool process keeps the last PDFs it opened, so the tasks of one document parse
+# its cross-reference table once per worker. Size and mtime guard against a replaced file.
+@lru_cache(maxsize=2)
+def _open_pdf(path, size, mtime_ns):
+    return PdfReader(path)
+
+
+def extract_pdf_pages(path, start, end):
+    stat = os.stat(path)
+    reader = _open_pdf(path, stat.st_size, stat.st_mtime_ns)
+    return ''.join((reader.pages[index].extract_text() or '') + '\n' for index in range(start, end))
+
+
+# A spawned or fork-server child normally runs the parent's main module again (as __mp_main__)
+# before its task, which for `python project.py` means the whole Flask app: engine, migrations,
+# executors, heartbeat and signal hooks. Pool workers only need this module, so their processes
+# are started with the main module hidden; the task functions are imported from here by name.
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _main_module_hidden():
+    main = sys.modules['__main__']
+    with _main_lock:
+        spec, path = main.__spec__, getattr(main, '__file__', None)
+        main.__spec__ = None
+        if path is not None:
+            del main.__file__
+        try:
+            yield
+        finally:
+            main.__spec__ = spec
+            if path is not None:
+                main.__file__ = path
+
+
+class _WorkerStart:
+    def start(self):
+        with _main_module_hidden():
+            super().start()
+
+
+class _SpawnWorker(_WorkerStart, mp_context.SpawnProcess):
+    pass
+
+
+class _SpawnContext(mp_context.SpawnContext):
+    Process = _SpawnWorker
+
+
+if hasattr(mp_context, 'ForkServerProcess'):
+    class _ForkServerWorker(_WorkerStart, mp_context.ForkServerProcess):
+        pass
+
+    class _ForkServerContext(mp_context.ForkServerContext):
+        Process = _ForkServerWorker
+
+
+# Extracts text from uploaded documents as a stream of pieces (one or more pages, a block of
+# paragraphs, ...) whose concatenation is the full text, so callers can store and index it while
+# later pages are still being read. PDF pages are extracted in a process pool, off the request
+# thread's GIL. Results are cached by the SHA-256 of the file: the same document uploaded again
+# is streamed back from the cache without being parsed.
+class TextExtractor:
+    def __init__(self, cache_dir=None, max_workers=EXTRACTION_WORKERS):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self._executor = None
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # Workers come from a fork server: forking the (multithreaded) application process itself can
+    # leave a child stuck on a lock that another thread held at the time. The server is a fresh,
+    # single-threaded process that preloads this module. Spawn is used where there is no fork server.
+    @property
+    def executor(self):
+        with self.lock:
+            if self._executor is None:
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = _ForkServerContext()
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = _SpawnContext()
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+            return self._executor
+
+    def shutdown(self):
+        with self.lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    @staticmethod
+    def extension(path):
+        return os.path.splitext(path)[1].lower().lstrip('.')
+
+    def _cache_path(self, sha256, extension):
+        return os.path.join(self.cache_dir, f'{sha256}-{extension}-v{EXTRACTION_VERSION}.txt')
+
+    # Pieces of the text of `path`, or None for an unsupported file type.
+    # `sha256` can be passed when the caller already hashed the file (e.g. while saving it).
+    def extract(self, path, sha256=None):
+        extension = self.extension(path)
+        readers = {'txt': self._text_pieces, 'pdf': self._pdf_pieces, 'docx': self._docx_pieces}
+        if extension not in readers:
+            return None
+        if not self.cache_dir:
+            return readers[extension](path)
+        cache_path = self._cache_path(sha256 or file_sha256(path), extension)
+        if os.path.exists(cache_path):
+            return self._text_pieces(cache_path)
+        return self._caching(readers[extension](path), cache_path)
+
+    # Pass pieces through while writing them to the cache; the entry only appears (atomically)
+    # once the whole document was extracted
+    @staticmethod
+    def _caching(pieces, cache_path):
+        temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for piece in pieces:
+                    f.write(piece)
+                    yield piece
+            os.replace(temp_path, cache_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _text_pieces(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for block in iter(lambda: f.read(READ_BLOCK_BYTES), ''):
+                yield block
+
+    @staticmethod
+    def _docx_pieces(path):
+        paragraphs = docx.Document(path).paragraphs
+        for start in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PIECE):
+            yield ''.join(paragraph.text + '\n' for paragraph in paragraphs[start:start + DOCX_PARAGRAPHS_PER_PIECE])
+
+    # Page ranges go to the pool with a bounded number in flight and come back in page order
+    def _pdf_pieces(self, path):
+        reader = PdfReader(path)
+        page_count = len(reader.pages)
+        if page_count <= MIN_PARALLEL_PAGES:
+            for page in reader.pages:
+                yield (page.extract_text() or '') + '\n'
+            return
+        del reader
+
+        ranges = ((start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK))
+        executor = self.executor
+        pending = deque()
+        try:
+            for start, end in ranges:
+                pending.append(executor.submit(extract_pdf_pages, path, start, end))
+                if len(pending) >= self.max_workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # The consumer stopped early (or a page failed): drop the work that is still queued
+            for future in pending:
+                future.cancel()
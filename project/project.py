@@ -1,10 +1,16 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_file, Response, stream_with_context
 from flask_login import login_required, LoginManager, UserMixin, logout_user, current_user
 from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi
 from PIL import Image
 import openai
 import uuid
+import json
+import bisect
+import base64
+import click
+import time
+import httplib2
 import asyncio
 import pytesseract
 import pyttsx3
@@ -13,10 +19,24 @@ from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
 import os
 import re
+import socket
+import threading
 import logging 
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
+from retrieval import CHUNK_WORDS, CHUNK_OVERLAP, chunk_text_stream, chunk_postings, bm25_rank, reciprocal_rank_fusion
+from vector_index import VectorIndex
+from cache import ByteLRUCache, DiskCache, TieredCache, ResponseCache, content_hash
+from semantic_cache import SemanticCache
+from transcript_segments import TranscriptSegments, format_timestamp
+from search import FTS_INDEXES, create_search_schema, rebuild_search_index, search
+from write_behind import WriteBehindQueue, flush_on_shutdown
+from compression import CompressedText, text_codec, register_sqlite_functions
+from extraction import TextExtractor
+from blob_store import BlobStore
 
 
 load_dotenv()
@@ -30,7 +50,7 @@ AUDIO_FILE_PATH = 'static/audio_output.mp3'
 
 # Initialize Flask and the database
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///youtube_videos.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", 'sqlite:///youtube_videos.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
@@ -48,8 +68,70 @@ login_manager.login_message_category = 'info'  # Optional: Sets flash message ca
 # Configuration for file uploads
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx'}
+# Characters of an uploaded document's text returned with the upload response
+UPLOAD_PREVIEW_CHARS = 2000
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads are stored once per distinct content and shared by the sessions that use them
+blob_store = BlobStore(UPLOAD_FOLDER)
+
+# Chat model used to answer questions and analyze code/images
+CHAT_MODEL = "gpt-4o"
+
+# Number of chunks of a transcript/file sent to the model with each question
+RETRIEVAL_TOP_K = 5
+# Embedding model used for the chunk vector index
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+EMBEDDING_BATCH_SIZE = 100
+
+# Background video ingestion
+INGEST_WORKERS = 4
+INGEST_ACTIVE_STATUSES = ('queued', 'running')
+# A process bumps updated_at of the jobs it has queued or is running this often; an active job
+# not bumped for INGEST_STALE_SECONDS belongs to a process that stopped, and is taken over by the
+# next heartbeat of a live one
+INGEST_HEARTBEAT_SECONDS = 30
+INGEST_STALE_SECONDS = 5 * 60
+# Identifies this process as the owner of the jobs it claims
+INGEST_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Upstream fetches for a video run concurrently on a shared pool, each with its own deadline (seconds)
+FETCH_WORKERS = 8
+YOUTUBE_API_TIMEOUT = 10
+TRANSCRIPT_TIMEOUT = 20
+
+# Bulk (playlist / URL list) ingestion
+YOUTUBE_API_BATCH_SIZE = 50  # Maximum ids per videos().list / results per playlistItems().list call
+BATCH_TRANSCRIPT_CONCURRENCY = 4
+BATCH_MAX_VIDEOS = 500
+
+# Video cache: in-process LRU bounded by bytes, plus an optional on-disk tier shared by all workers
+VIDEO_CACHE_BYTES = int(os.getenv("VIDEO_CACHE_BYTES", 64 * 1024 * 1024))
+VIDEO_CACHE_TTL = 300  # Seconds before a worker re-checks the shared tier / database
+VIDEO_CACHE_DIR = os.getenv("VIDEO_CACHE_DIR")
+# Timestamped transcript segments kept in memory (array form) for citing times in answers
+SEGMENT_CACHE_BYTES = int(os.getenv("SEGMENT_CACHE_BYTES", 32 * 1024 * 1024))
+# Segment texts are also stored compressed in blocks of about this many characters, so that a
+# time-range load decompresses only the blocks it covers
+TRANSCRIPT_BLOCK_CHARS = 4096
+TRANSCRIPT_UNAVAILABLE = "Transcript not available."
+
+# Chat history pages (keyset pagination)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+# SQLite: wait this long for a lock held by another connection before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = 5000
+# Chat turns are written behind the request, in batches of up to this many rows or after this delay
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", 200))
+CHAT_WRITE_DELAY = float(os.getenv("CHAT_WRITE_DELAY_MS", 200)) / 1000
+
+# Model response cache
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 60 * 60))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Semantic answer cache: reuse an answer when a new question's embedding is this similar (cosine)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
 
 # Model to store video information
 # Updated YouTubeVideo model (optional; no foreign keys required for this example)
@@ -57,35 +139,64 @@ class YouTubeVideo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     video_id = db.Column(db.String(100), unique=True, nullable=False)
     title = db.Column(db.String(255), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    transcript = db.Column(db.Text, nullable=False)
+    # Large text columns are deferred: they are only read (and decompressed) when accessed,
+    # or up front for queries that ask for the 'content' group
+    description = db.deferred(db.Column(db.Text, nullable=False), group='content')
+    transcript = db.deferred(db.Column(CompressedText, nullable=False), group='content')
+    # Title and description are placeholders (the metadata call failed); fetched again on next ingest
+    metadata_pending = db.Column(db.Boolean, nullable=False, default=False)
+
+# TranscriptSegment keeps the caption timing that the joined transcript text loses.
+# Rows are read in start order, either whole or for one time range. The transcript is the
+# segment texts joined, so a segment only stores where its text is in it: the text is
+# transcript[text_start:text_end] of its video, read from the TranscriptBlock holding it.
+class TranscriptSegment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.String(100), nullable=False)
+    start_ms = db.Column(db.Integer, nullable=False)
+    duration_ms = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)  # Empty, except in rows stored before the offsets
+    text_start = db.Column(db.Integer, nullable=True)
+    text_end = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (db.Index('ix_transcript_segment_video_start', 'video_id', 'start_ms'),)
+
+# A run of consecutive segments' text: transcript[text_start:text_end], compressed on its own
+class TranscriptBlock(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    video_id = db.Column(db.String(100), nullable=False)
+    text_start = db.Column(db.Integer, nullable=False)
+    text_end = db.Column(db.Integer, nullable=False)
+    text = db.Column(CompressedText, nullable=False)
+
+    __table_args__ = (db.Index('ix_transcript_block_video_start', 'video_id', 'text_start'),)
 
 class ImageSummary(db.Model):
     __tablename__ = 'image_summaries'
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String, nullable=False)
-    summary = db.Column(db.Text, nullable=False)
+    summary = db.deferred(db.Column(db.Text, nullable=False))
 
     def __repr__(self):
         return f"<ImageSummary session_id={self.session_id}>"
 class FileSummary(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
-    summary = db.Column(db.Text, nullable=False)
+    summary = db.deferred(db.Column(CompressedText, nullable=False))
 
 # CodeSummary model to store summarized code analysis
 class CodeSummary(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
-    summary = db.Column(db.Text, nullable=False)
+    summary = db.deferred(db.Column(CompressedText, nullable=False))
     chat_session = db.relationship('ChatSession', backref='code_summary')
 
 # ImageAnalysis model to store analyzed image results
 class ImageAnalysis(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
-    analysis = db.Column(db.Text, nullable=False)
+    analysis = db.deferred(db.Column(db.Text, nullable=False))
     chat_session = db.relationship('ChatSession', backref='image_analysis')
 
 
@@ -104,10 +215,13 @@ class ChatSession(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # Foreign key to User table
     date = db.Column(db.DateTime, nullable=False)
     title = db.Column(db.String(255), nullable=False)
-    description = db.Column(db.Text, nullable=False)
+    description = db.deferred(db.Column(db.Text, nullable=False))  # History pages select it explicitly
     file_summary = db.relationship('FileSummary', backref='session', lazy=True)
     video_id = db.Column(db.String(100), nullable=True) 
 
+    # Serves the per-user, newest-first history pages
+    __table_args__ = (db.Index('ix_chat_session_user_date', 'user_id', 'date'),)
+
 # ChatMessage references ChatSession via foreign key
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -116,9 +230,87 @@ class ChatMessage(db.Model):
     is_user = db.Column(db.Boolean, nullable=False)  # True for user message, False for AI response
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+# ContentChunk stores retrieval chunks of ingested content with their term postings.
+# Videos are keyed by video_id (shared by every session on that video); files and code by session_id.
+class ContentChunk(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content_type = db.Column(db.String(20), nullable=False)
+    content_key = db.Column(db.String(100), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    terms = db.Column(db.Text, nullable=False)  # JSON {term: frequency}
+    length = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.Index('ix_content_chunk_content', 'content_type', 'content_key'),)
+
+# IngestJob is a SQLite-backed queue entry for fetching and storing one video.
+# The partial unique index allows only one queued/running job per video_id, across processes.
+class IngestJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    video_id = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    error = db.Column(db.Text, nullable=True)
+    batch_id = db.Column(db.String(32), nullable=True, index=True)  # Set for jobs created by a bulk ingest
+    stage = db.Column(db.String(50), nullable=True)  # Progress within a running job
+    worker_id = db.Column(db.String(100), nullable=True)  # INGEST_WORKER_ID of the process queueing/running the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('uq_ingest_job_active', 'video_id', unique=True, sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+# IngestBatch records the videos requested by one bulk ingest, in order
+class IngestBatch(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    video_ids = db.Column(db.Text, nullable=False)  # JSON list
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# WAL lets readers run while a write is in progress, and with synchronous=NORMAL a commit is
+# an append to the WAL file; fsync happens at checkpoints instead of on every commit
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+    # decompress_text() for the triggers and views that read compressed columns
+    register_sqlite_functions(dbapi_connection)
+
 # Create the database
 with app.app_context():
+    db.event.listen(db.engine, 'connect', configure_sqlite_connection)
+    # The chunk embedding index, caches and compression dictionaries live next to youtube_videos.db
+    DATA_DIR = os.path.dirname(os.path.abspath(db.engine.url.database))
+    text_codec.configure(os.path.join(DATA_DIR, 'compression_dictionaries'))
     db.create_all()
+    # create_all only builds indexes for new tables; add the ones introduced on existing tables
+    for index in ChatSession.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    # ... and the columns
+    added_columns = {
+        'ingest_job': ('worker_id VARCHAR(100)',),
+        'transcript_segment': ('text_start INTEGER', 'text_end INTEGER'),
+        'you_tube_video': ('metadata_pending BOOLEAN NOT NULL DEFAULT 0',),
+    }
+    for table, columns in added_columns.items():
+        existing = {column['name'] for column in db.inspect(db.engine).get_columns(table)}
+        with db.engine.begin() as connection:
+            for column in columns:
+                if column.split()[0] not in existing:
+                    connection.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {column}"))
+    # FTS5 search indexes and the triggers that keep them in sync with their source tables
+    with db.engine.begin() as connection:
+        create_search_schema(connection)
+
+vector_index = VectorIndex(os.path.join(DATA_DIR, 'vector_index'), EMBEDDING_DIM)
+response_cache = ResponseCache(os.path.join(DATA_DIR, 'response_cache.db'), RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+semantic_cache = SemanticCache(os.path.join(DATA_DIR, 'semantic_cache'), SEMANTIC_CACHE_THRESHOLD)
+# Text extracted from uploads, cached by file content hash
+text_extractor = TextExtractor(os.path.join(DATA_DIR, 'extraction_cache'))
+# Text read from uploaded images by OCR, keyed by image content hash
+ocr_cache = DiskCache(os.path.join(DATA_DIR, 'ocr_cache'))
     
 def generate_image(prompt, size="1024x1024"):
     response = openai.Image.create(
@@ -137,7 +329,9 @@ def save_image_from_url(image_url, save_path):
         image_file.write(image_data)
     
 
-def create_chat_session(user_id, title, description, video_id = None):
+# With commit=False the session is only flushed (to get its id) and is committed together
+# with whatever the caller adds next
+def create_chat_session(user_id, title, description, video_id = None, commit=True):
     chat_session = ChatSession(
         user_id=user_id,  # Associate the session with the user
         date=datetime.utcnow(),
@@ -146,35 +340,143 @@ def create_chat_session(user_id, title, description, video_id = None):
         video_id = video_id
     )
     db.session.add(chat_session)
-    db.session.commit()
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
     return chat_session.id
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Full text of an uploaded file (None for unsupported types). Uploads are normally streamed
+# into the index with text_extractor.extract() instead of being read whole like this.
 def extract_text_from_file(filepath):
-    if filepath.endswith('.txt'):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return f.read()
-    elif filepath.endswith('.pdf'):
-        from PyPDF2 import PdfReader
-        reader = PdfReader(filepath)
-        return ''.join([page.extract_text() for page in reader.pages])
-    elif filepath.endswith('.docx'):
-        import docx
-        doc = docx.Document(filepath)
-        return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-    else:
+    pieces = text_extractor.extract(filepath)
+    return None if pieces is None else ''.join(pieces)
+
+def embed_texts(texts):
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        response = openai.Embedding.create(model=EMBEDDING_MODEL, input=texts[start:start + EMBEDDING_BATCH_SIZE])
+        vectors.extend(item['embedding'] for item in response['data'])
+    return vectors
+
+# Delete the chunks matching a ContentChunk query and return their ids. Their vectors are removed
+# by the caller with vector_index.delete(ids) once the deletion is committed, so a failed
+# transaction leaves rows and vectors in place together.
+def delete_chunks(chunk_query):
+    chunk_ids = [chunk_id for (chunk_id,) in chunk_query.with_entities(ContentChunk.id)]
+    chunk_query.delete(synchronize_session=False)
+    return chunk_ids
+
+# Split ingested content into chunks, store their BM25 postings and embed them (run once per document)
+def index_content(content_type, content_key, text):
+    index_content_stream(content_type, content_key, [text])
+
+# index_content for text that arrives in pieces (e.g. pages of an upload being extracted).
+# Chunks are committed and embedded a batch at a time while later pieces are still produced.
+# Returns the number of chunks (0 when the text has no words).
+def index_content_stream(content_type, content_key, pieces):
+    content_key = str(content_key)
+    stale_ids = delete_chunks(ContentChunk.query.filter_by(content_type=content_type, content_key=content_key))
+    db.session.commit()
+    vector_index.delete(stale_ids)
+
+    batch, position = [], -1
+    for position, chunk in enumerate(chunk_text_stream(pieces)):
+        terms = chunk_postings(chunk)
+        batch.append(ContentChunk(
+            content_type=content_type,
+            content_key=content_key,
+            position=position,
+            text=chunk,
+            terms=json.dumps(terms),
+            length=sum(terms.values())
+        ))
+        if len(batch) == EMBEDDING_BATCH_SIZE:
+            store_chunks(batch)
+            batch = []
+    store_chunks(batch)
+    return position + 1
+
+def store_chunks(chunks):
+    db.session.add_all(chunks)
+    db.session.commit()
+    if not chunks:
+        return
+
+    # BM25 still works if embedding fails, so a failure here does not fail the ingest
+    try:
+        vector_index.add([chunk.id for chunk in chunks], embed_texts([chunk.text for chunk in chunks]))
+    except Exception as e:
+        logging.warning(f"Could not embed chunks for {chunks[0].content_type} {chunks[0].content_key}: {e}")
+
+# Return the chunks of a document most relevant to the question as (position, text), in document order.
+# BM25 and embedding similarity rankings are merged with reciprocal rank fusion.
+def get_relevant_chunks(content_type, content_key, text, question, top_k=RETRIEVAL_TOP_K, question_vector=None):
+    content_key = str(content_key)
+    chunks = ContentChunk.query.filter_by(content_type=content_type, content_key=content_key).order_by(ContentChunk.position).all()
+    if not chunks:
+        # Content stored before indexing existed is indexed on first use
+        index_content(content_type, content_key, text)
+        chunks = ContentChunk.query.filter_by(content_type=content_type, content_key=content_key).order_by(ContentChunk.position).all()
+
+    if len(chunks) <= top_k or not question:
+        return [(chunk.position, chunk.text) for chunk in chunks[:top_k]]
+
+    rankings = [bm25_rank(question, [(json.loads(chunk.terms), chunk.length) for chunk in chunks], top_k * 2)]
+    try:
+        position_by_id = {chunk.id: index for index, chunk in enumerate(chunks)}
+        if question_vector is None:
+            question_vector = embed_texts([question])[0]
+        matches = vector_index.search(question_vector, top_k * 2, allowed_ids=list(position_by_id))[0]
+        rankings.append([position_by_id[chunk_id] for chunk_id, _ in matches])
+    except Exception as e:
+        logging.warning(f"Vector search unavailable, using BM25 only: {e}")
+
+    ranked = reciprocal_rank_fusion(rankings, top_k)
+    return [(chunks[index].position, chunks[index].text) for index in sorted(ranked)]
+
+# Insert one batch of buffered chat messages in a single transaction (runs on the writer thread)
+def flush_chat_messages(rows):
+    with app.app_context():
+        try:
+            db.session.execute(ChatMessage.__table__.insert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+chat_message_writer = WriteBehindQueue(flush_chat_messages, CHAT_WRITE_BATCH, CHAT_WRITE_DELAY, name='chat-message-writer')
+flush_on_shutdown(chat_message_writer)
+
+# Queue a chat message for the next batched write; the request does not wait for the commit
+def save_message(session_id, message, is_user, timestamp=None):
+    chat_message_writer.add({
+        'session_id': session_id,
+        'message': message,
+        'is_user': is_user,
+        'timestamp': timestamp or datetime.utcnow()
+    })
+
+# The current user's chat session with this id, or None (also for ids that are not chat session ids)
+def get_owned_chat_session(session_id):
+    try:
+        session_id = int(session_id)
+    except (TypeError, ValueError):
         return None
+    chat_session = db.session.get(ChatSession, session_id)
+    return chat_session if chat_session and chat_session.user_id == current_user.id else None
 
-def save_message(session_id, message, is_user):
-    chat_message = ChatMessage(
-        session_id=session_id,
-        message=message,
-        is_user=is_user
-    )
-    db.session.add(chat_message)
-    db.session.commit()
+# Persist a question/answer turn, only into a chat session of the current user
+def save_chat_turn(session_id, question, answer, asked_at):
+    if get_owned_chat_session(session_id) is None:
+        return
+    save_message(int(session_id), question, True, asked_at)
+    save_message(int(session_id), answer, False)
 
 
     
@@ -184,41 +486,472 @@ def extract_video_id(youtube_link):
     return video_id_match.group(1) if video_id_match else None
 
 
-# Function to extract video info and transcript
-def get_video_info_and_transcript(video_id):
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch')
+
+def fetch_video_metadata(video_id):
+    # A fresh Http per call: the shared client's connection is not thread-safe
     video_response = youtube.videos().list(
         part='snippet',
         id=video_id
-    ).execute()
+    ).execute(http=httplib2.Http(timeout=YOUTUBE_API_TIMEOUT))
 
     if not video_response['items']:
         raise ValueError("Video not found.")
-    
+
     video_info = video_response['items'][0]['snippet']
-    video_title = video_info['title']
-    video_description = video_info['description']
+    return video_info['title'], video_info['description']
+
+def fetch_transcript(video_id):
+    return TranscriptSegments.from_api(YouTubeTranscriptApi.get_transcript(video_id))
+
+# Function to extract video info and transcript.
+# Metadata and transcript are fetched at the same time, so a cold video costs the slower
+# of the two calls. If only one of them fails, the other result is still used; without
+# metadata, the title and description are None.
+def get_video_info_and_transcript(video_id):
+    started = time.monotonic()
+    metadata_future = fetch_executor.submit(fetch_video_metadata, video_id)
+    transcript_future = fetch_executor.submit(fetch_transcript, video_id)
+
+    metadata_error = None
+    try:
+        video_title, video_description = metadata_future.result(timeout=YOUTUBE_API_TIMEOUT)
+    except ValueError:
+        transcript_future.cancel()
+        raise
+    except Exception as e:
+        metadata_error = e
+        logging.warning(f"Could not fetch metadata for video {video_id}: {e!r}")
+        video_title, video_description = None, None
 
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript_text = ' '.join([item['text'] for item in transcript_list])
-    except Exception:
-        transcript_text = "Transcript not available."
+        remaining = max(TRANSCRIPT_TIMEOUT - (time.monotonic() - started), 0)
+        segments = transcript_future.result(timeout=remaining)
+    except Exception as e:
+        if metadata_error:
+            raise ValueError(f"Could not fetch video details or transcript: {metadata_error!r}")
+        logging.warning(f"Could not fetch transcript for video {video_id}: {e!r}")
+        segments = TranscriptSegments([], [], [])
 
-    return video_title, video_description, transcript_text
+    return video_title, video_description, segments
 
-# Save the video info to the database
-def save_video_to_db(video_id, title, description, transcript):
-    video = YouTubeVideo(video_id=video_id, title=title, description=description, transcript=transcript)
+# Save the video info to the database. With segments, `transcript` is segments.text.
+def save_video_to_db(video_id, title, description, transcript, segments=None, metadata_pending=False):
+    video = YouTubeVideo(video_id=video_id, title=title, description=description, transcript=transcript,
+                         metadata_pending=metadata_pending)
     db.session.add(video)
+    if segments:
+        add_transcript_segments(video_id, segments)
     db.session.commit()
 
-# Retrieve video data from the database
-def get_video_data(video_id):
-    video = YouTubeVideo.query.filter_by(video_id=video_id).first()
+# Queue a bulk (executemany) insert of a video's segments in the current transaction.
+# The video's transcript must be segments.text: rows store offsets into it, not the text,
+# which goes into blocks cut at segment boundaries.
+def add_transcript_segments(video_id, segments):
+    rows = [
+        {'video_id': video_id, 'start_ms': int(segments.start_ms[index]), 'duration_ms': int(segments.duration_ms[index]),
+         'text': '', 'text_start': int(segments.offsets[index]), 'text_end': int(segments.offsets[index + 1]) - 1}
+        for index in range(len(segments))
+    ]
+    if not rows:
+        return
+    db.session.execute(TranscriptSegment.__table__.insert(), rows)
+
+    blocks, block_start = [], 0
+    for row in rows:
+        if row['text_end'] - block_start >= TRANSCRIPT_BLOCK_CHARS or row is rows[-1]:
+            blocks.append({'video_id': video_id, 'text_start': block_start, 'text_end': row['text_end'],
+                           'text': segments.text[block_start:row['text_end']]})
+            block_start = row['text_end'] + 1
+    db.session.execute(TranscriptBlock.__table__.insert(), blocks)
+
+# Load a video's segments, optionally only those overlapping [start_ms, end_ms).
+# The (video_id, start_ms) index finds a time range's segments, and their text is read from
+# the blocks they fall in, so a range load does not decompress the whole transcript.
+def load_transcript_segments(video_id, start_ms=None, end_ms=None):
+    query = db.session.query(
+        TranscriptSegment.start_ms, TranscriptSegment.duration_ms, TranscriptSegment.text,
+        TranscriptSegment.text_start, TranscriptSegment.text_end
+    ).filter(TranscriptSegment.video_id == video_id)
+    if end_ms is not None:
+        query = query.filter(TranscriptSegment.start_ms < end_ms)
+    if start_ms is not None:
+        query = query.filter(TranscriptSegment.start_ms + TranscriptSegment.duration_ms > start_ms)
+    rows = query.order_by(TranscriptSegment.start_ms).all()
+
+    offsets = [(row.text_start, row.text_end) for row in rows if row.text_start is not None]
+    if not offsets:
+        return TranscriptSegments.from_rows((row.start_ms, row.duration_ms, row.text) for row in rows)
+    first, last = min(start for start, _ in offsets), max(end for _, end in offsets)
+    if start_ms is None and end_ms is None:
+        # All of it: the whole transcript, which usually comes from the video cache
+        video_data = get_video_data(video_id)
+        blocks = [(0, video_data[2] if video_data else '')]
+    else:
+        blocks = db.session.query(TranscriptBlock.text_start, TranscriptBlock.text).filter(
+            TranscriptBlock.video_id == video_id, TranscriptBlock.text_start <= last, TranscriptBlock.text_end >= first
+        ).order_by(TranscriptBlock.text_start).all()
+        if not blocks:
+            # Segments stored before blocks were: slice the whole transcript
+            video_data = get_video_data(video_id)
+            blocks = [(0, video_data[2] if video_data else '')]
+
+    block_starts = [block_start for block_start, _ in blocks]
+
+    def segment_text(row):
+        if row.text_start is None:
+            return row.text
+        block_start, text = blocks[bisect.bisect_right(block_starts, row.text_start) - 1]
+        return text[row.text_start - block_start:row.text_end - block_start]
+
+    return TranscriptSegments.from_rows((row.start_ms, row.duration_ms, segment_text(row)) for row in rows)
+
+video_cache = TieredCache(
+    ByteLRUCache(VIDEO_CACHE_BYTES, ttl=VIDEO_CACHE_TTL if VIDEO_CACHE_DIR else None),
+    DiskCache(VIDEO_CACHE_DIR) if VIDEO_CACHE_DIR else None
+)
+
+segment_cache = ByteLRUCache(SEGMENT_CACHE_BYTES)
+
+def video_cache_key(video_id):
+    return f"video:{video_id}"
+
+# Drop a video from every cache tier whenever its row is written or deleted
+@db.event.listens_for(YouTubeVideo, 'after_insert')
+@db.event.listens_for(YouTubeVideo, 'after_update')
+@db.event.listens_for(YouTubeVideo, 'after_delete')
+def invalidate_video_cache(mapper, connection, video):
+    video_cache.delete(video_cache_key(video.video_id))
+    segment_cache.delete(video.video_id)
+
+# Retrieve video data from the cache, falling back to the database.
+# With refresh_metadata, a video stored with placeholder metadata gets another metadata fetch.
+def get_video_data(video_id, refresh_metadata=False):
+    cached = video_cache.get(video_cache_key(video_id))
+    if cached is not None:
+        return tuple(cached)
+
+    video = YouTubeVideo.query.options(db.undefer_group('content')).filter_by(video_id=video_id).first()
     if video:
+        if video.metadata_pending and refresh_metadata:
+            refresh_video_metadata(video)
+        # Placeholders are not cached, so the next ingest of the video sees the flag
+        if not video.metadata_pending:
+            video_cache.set(video_cache_key(video_id), [video.title, video.description, video.transcript])
         return video.title, video.description, video.transcript  # Return as a tuple
     return None
 
+def refresh_video_metadata(video):
+    try:
+        video.title, video.description = fetch_executor.submit(fetch_video_metadata, video.video_id).result(timeout=YOUTUBE_API_TIMEOUT)
+    except ValueError as e:
+        logging.warning(f"Keeping placeholder metadata for video {video.video_id}: {e}")  # Removed from YouTube
+    except Exception as e:
+        logging.warning(f"Could not fetch metadata for video {video.video_id} again: {e!r}")
+        return
+    video.metadata_pending = False
+    db.session.commit()
+
+# All segments of a video, cached in memory; empty for videos stored before segments were kept
+def get_transcript_segments(video_id):
+    segments = segment_cache.get(video_id)
+    if segments is None:
+        segments = load_transcript_segments(video_id)
+        # Not cached while empty: the segments may be written just after the video row
+        if len(segments):
+            segment_cache.set(video_id, segments)
+    return segments
+
+# Return the stored video, fetching, saving and indexing it first if it is new
+def ingest_video(video_id):
+    video_data = get_video_data(video_id, refresh_metadata=True)
+    if video_data:
+        return video_data
+
+    title, description, segments = get_video_info_and_transcript(video_id)
+    transcript = segments.text or TRANSCRIPT_UNAVAILABLE
+    # The transcript is kept, but placeholder metadata is flagged so that it is fetched again
+    metadata_pending = title is None
+    if metadata_pending:
+        title, description = f"YouTube video {video_id}", "Description not available."
+
+    # Save video to the database and index its transcript for retrieval
+    save_video_to_db(video_id, title, description, transcript, segments, metadata_pending)
+    index_content('video', video_id, transcript)
+    return title, description, transcript
+
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix='ingest')
+
+def job_to_dict(job):
+    return {
+        'job_id': job.id,
+        'video_id': job.video_id,
+        'status': job.status,
+        'stage': job.stage,
+        'error': job.error
+    }
+
+# Queue an ingestion job, or return the queued/running job already ingesting this video
+def submit_ingest_job(video_id):
+    active_job = IngestJob.query.filter(IngestJob.video_id == video_id, IngestJob.status.in_(INGEST_ACTIVE_STATUSES)).first()
+    if active_job:
+        return active_job
+
+    job = IngestJob(id=uuid.uuid4().hex, video_id=video_id, status='queued', worker_id=INGEST_WORKER_ID)
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request queued the same video between our check and insert
+        db.session.rollback()
+        return IngestJob.query.filter_by(video_id=video_id).order_by(IngestJob.created_at.desc()).first()
+
+    ingest_executor.submit(run_ingest_job, job.id)
+    return job
+
+# Worker: claim a queued job and ingest its video
+def run_ingest_job(job_id):
+    with app.app_context():
+        # Only one worker (in any process) can move the job from queued to running
+        claimed = IngestJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'worker_id': INGEST_WORKER_ID, 'updated_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(IngestJob, job_id)
+        try:
+            ingest_video(job.video_id)
+            job.status = 'done'
+        except Exception as e:
+            logging.error(f"Ingest job {job_id} for video {job.video_id} failed: {e}")
+            db.session.rollback()
+            job = db.session.get(IngestJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        db.session.remove()
+
+# Take over the queued and running jobs of processes that stopped heartbeating, and run them here.
+# Each job is claimed with a conditional update, so only one live process takes it over.
+# At startup, queued jobs without an owner (from before jobs recorded one) are run too.
+def resume_ingest_jobs(unowned=False):
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(seconds=INGEST_STALE_SECONDS)
+        stale = IngestJob.updated_at < cutoff
+        if unowned:
+            stale = db.or_(stale, db.and_(IngestJob.status == 'queued', IngestJob.worker_id.is_(None)))
+        job_ids = [job_id for (job_id,) in db.session.query(IngestJob.id).filter(IngestJob.status.in_(INGEST_ACTIVE_STATUSES), stale)]
+        reclaimed = []
+        for job_id in job_ids:
+            claimed = IngestJob.query.filter(IngestJob.id == job_id, IngestJob.status.in_(INGEST_ACTIVE_STATUSES), stale).update(
+                {'status': 'queued', 'stage': None, 'worker_id': INGEST_WORKER_ID, 'updated_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.session.commit()
+            if claimed:
+                reclaimed.append(job_id)
+        for job_id in reclaimed:
+            ingest_executor.submit(run_ingest_job, job_id)
+        return reclaimed
+
+# Mark the jobs this process has queued or is running as alive
+def touch_ingest_jobs():
+    with app.app_context():
+        IngestJob.query.filter(IngestJob.status.in_(INGEST_ACTIVE_STATUSES), IngestJob.worker_id == INGEST_WORKER_ID).update(
+            {'updated_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+
+def run_ingest_heartbeat():
+    while True:
+        time.sleep(INGEST_HEARTBEAT_SECONDS)
+        try:
+            touch_ingest_jobs()
+            resume_ingest_jobs()
+        except Exception as e:
+            logging.warning(f"Ingest heartbeat failed: {e}")
+
+def extract_playlist_id(url):
+    playlist_id_match = re.search(r"[?&]list=([a-zA-Z0-9_-]+)", url)
+    return playlist_id_match.group(1) if playlist_id_match else None
+
+# List the video ids of a playlist, or of a channel's uploads playlist, 50 per API call
+def get_playlist_video_ids(url, limit=BATCH_MAX_VIDEOS):
+    playlist_id = extract_playlist_id(url)
+    if not playlist_id:
+        channel_match = re.search(r"youtube\.com/(?:channel/([a-zA-Z0-9_-]+)|@([a-zA-Z0-9_.-]+))", url)
+        if not channel_match:
+            return []
+        channel_id, handle = channel_match.groups()
+        channel_filter = {'id': channel_id} if channel_id else {'forHandle': handle}
+        channel_response = youtube.channels().list(part='contentDetails', **channel_filter).execute(
+            http=httplib2.Http(timeout=YOUTUBE_API_TIMEOUT)
+        )
+        if not channel_response.get('items'):
+            raise ValueError("Channel not found.")
+        playlist_id = channel_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+    video_ids = []
+    page_token = None
+    while len(video_ids) < limit:
+        playlist_response = youtube.playlistItems().list(
+            part='contentDetails',
+            playlistId=playlist_id,
+            maxResults=YOUTUBE_API_BATCH_SIZE,
+            pageToken=page_token
+        ).execute(http=httplib2.Http(timeout=YOUTUBE_API_TIMEOUT))
+        video_ids.extend(item['contentDetails']['videoId'] for item in playlist_response['items'])
+        page_token = playlist_response.get('nextPageToken')
+        if not page_token:
+            break
+    return video_ids[:limit]
+
+# Fetch metadata for many videos with one videos().list call per 50 ids
+def fetch_video_metadata_batch(video_ids):
+    metadata = {}
+    for start in range(0, len(video_ids), YOUTUBE_API_BATCH_SIZE):
+        video_response = youtube.videos().list(
+            part='snippet',
+            id=','.join(video_ids[start:start + YOUTUBE_API_BATCH_SIZE]),
+            maxResults=YOUTUBE_API_BATCH_SIZE
+        ).execute(http=httplib2.Http(timeout=YOUTUBE_API_TIMEOUT))
+        for item in video_response['items']:
+            metadata[item['id']] = (item['snippet']['title'], item['snippet']['description'])
+    return metadata
+
+# Queue one job per new video and run them all as a single background batch
+def submit_ingest_batch(user_id, video_ids):
+    batch = IngestBatch(id=uuid.uuid4().hex, user_id=user_id, video_ids=json.dumps(video_ids))
+    db.session.add(batch)
+    db.session.commit()
+
+    stored = {video_id for (video_id,) in db.session.query(YouTubeVideo.video_id).filter(YouTubeVideo.video_id.in_(video_ids))}
+    active = {video_id for (video_id,) in db.session.query(IngestJob.video_id).filter(
+        IngestJob.video_id.in_(video_ids), IngestJob.status.in_(INGEST_ACTIVE_STATUSES)
+    )}
+    # Videos that are stored or already being ingested by another job are not queued again
+    for video_id in video_ids:
+        if video_id in stored or video_id in active:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(IngestJob(id=uuid.uuid4().hex, video_id=video_id, status='queued', batch_id=batch.id,
+                                         worker_id=INGEST_WORKER_ID))
+        except IntegrityError:
+            pass  # Another request queued this video meanwhile
+    db.session.commit()
+
+    ingest_executor.submit(run_ingest_batch, batch.id)
+    return batch
+
+def set_job_stage(job, stage, status=None):
+    job.stage = stage
+    if status:
+        job.status = status
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+
+# Worker: batched metadata fetch, parallel transcripts, then one insert transaction for all videos
+def run_ingest_batch(batch_id):
+    with app.app_context():
+        IngestJob.query.filter_by(batch_id=batch_id, status='queued').update(
+            {'status': 'running', 'stage': 'fetching metadata', 'worker_id': INGEST_WORKER_ID, 'updated_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        jobs = {job.video_id: job for job in IngestJob.query.filter_by(batch_id=batch_id, status='running', worker_id=INGEST_WORKER_ID)}
+        if not jobs:
+            return
+
+        try:
+            metadata = fetch_video_metadata_batch(list(jobs))
+        except Exception as e:
+            logging.error(f"Ingest batch {batch_id}: metadata fetch failed: {e}")
+            for job in jobs.values():
+                job.error = str(e)
+                set_job_stage(job, None, status='failed')
+            return
+
+        for video_id, job in jobs.items():
+            if video_id in metadata:
+                set_job_stage(job, 'fetching transcript')
+            else:
+                job.error = "Video not found."
+                set_job_stage(job, None, status='failed')
+
+        transcripts = {}
+        with ThreadPoolExecutor(max_workers=BATCH_TRANSCRIPT_CONCURRENCY) as transcript_pool:
+            futures = {transcript_pool.submit(fetch_transcript, video_id): video_id for video_id in metadata if video_id in jobs}
+            # Only this thread touches the database, as each transcript arrives
+            for future in as_completed(futures):
+                video_id = futures[future]
+                try:
+                    transcripts[video_id] = future.result()
+                except Exception as e:
+                    logging.warning(f"Could not fetch transcript for video {video_id}: {e!r}")
+                    transcripts[video_id] = TranscriptSegments([], [], [])
+                set_job_stage(jobs[video_id], 'transcript fetched')
+
+        # Bulk insert the videos and mark their jobs done in one transaction
+        stored = {video_id for (video_id,) in db.session.query(YouTubeVideo.video_id).filter(YouTubeVideo.video_id.in_(list(transcripts)))}
+        transcripts = {video_id: transcript for video_id, transcript in transcripts.items() if video_id not in stored}
+        for video_id in stored:
+            set_job_stage(jobs[video_id], None, status='done')
+        try:
+            db.session.add_all([
+                YouTubeVideo(video_id=video_id, title=metadata[video_id][0], description=metadata[video_id][1],
+                             transcript=segments.text or TRANSCRIPT_UNAVAILABLE)
+                for video_id, segments in transcripts.items()
+            ])
+            for video_id, segments in transcripts.items():
+                add_transcript_segments(video_id, segments)
+            for video_id in transcripts:
+                jobs[video_id].status = 'done'
+                jobs[video_id].stage = 'indexing'
+                jobs[video_id].updated_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Ingest batch {batch_id}: saving videos failed: {e}")
+            db.session.rollback()
+            for video_id in transcripts:
+                job = db.session.get(IngestJob, jobs[video_id].id)
+                job.error = str(e)
+                set_job_stage(job, None, status='failed')
+            return
+
+        for video_id, segments in transcripts.items():
+            index_content('video', video_id, segments.text or TRANSCRIPT_UNAVAILABLE)
+            set_job_stage(jobs[video_id], None)
+        db.session.remove()
+
+# Per-video progress of a bulk ingest, with a fixed number of queries whatever the batch size
+def batch_progress(batch):
+    video_ids = json.loads(batch.video_ids)
+    stored = {video_id for (video_id,) in db.session.query(YouTubeVideo.video_id).filter(YouTubeVideo.video_id.in_(video_ids))}
+    jobs = {job.video_id: job for job in IngestJob.query.filter_by(batch_id=batch.id)}
+    # Videos that were already being ingested when the batch was submitted have no job of their
+    # own; they follow the latest job of that video
+    others = [video_id for video_id in video_ids if video_id not in jobs and video_id not in stored]
+    if others:
+        for job in IngestJob.query.filter(IngestJob.video_id.in_(others)).order_by(IngestJob.created_at):
+            jobs[job.video_id] = job
+
+    videos, counts = [], dict.fromkeys(('queued', 'running', 'done', 'failed'), 0)
+    for video_id in video_ids:
+        job = jobs.get(video_id)
+        if job:
+            entry = job_to_dict(job)
+        else:
+            entry = {'job_id': None, 'video_id': video_id, 'status': 'queued', 'stage': None, 'error': None}
+        if video_id in stored and entry['status'] != 'done':
+            entry.update(status='done', stage=None, error=None)
+        videos.append(entry)
+        counts[entry['status']] += 1
+
+    return {'batch_id': batch.id, 'total': len(videos), 'counts': counts, 'videos': videos}
+
 # Function to interact with OpenAI and get both a response and a session summary
 def get_openai_response(prompt, video_data, generate_summary=False):
     video_title, video_description, video_transcript = video_data
@@ -301,16 +1034,8 @@ def process_youtube_link():
         if not video_id:
             return jsonify({'error': 'Invalid YouTube URL provided.'}), 400
 
-        # Check if video is in the database
-        video_data = get_video_data(video_id)
-        if video_data:
-            title, description, transcript = video_data
-        else:
-            # If video is not found in the database, fetch the video info and transcript
-            title, description, transcript = get_video_info_and_transcript(video_id)
-
-            # Save video to the database
-            save_video_to_db(video_id, title, description, transcript)
+        # Use the stored video, or fetch and store it if it is new
+        title, description, transcript = ingest_video(video_id)
 
         # Create a chat session with the video_id
         session_id = create_chat_session(user_id=current_user.id, title=title, description=description, video_id=video_id)
@@ -330,75 +1055,306 @@ def process_youtube_link():
         return jsonify({'error': str(e)}), 400
 
     
-@app.route('/ask_question', methods=['POST'])
+# Submit a video for background ingestion; returns a job id to poll immediately
+@app.route('/ingest/video', methods=['POST'])
 @login_required
-def ask_question():
+def submit_video_ingest():
+    data = request.get_json()
+    video_id = extract_video_id(data.get('youtube_url', ''))
+    if not video_id:
+        return jsonify({'error': 'Invalid YouTube URL provided.'}), 400
+
+    # Videos that are already stored need no job
+    if db.session.query(YouTubeVideo.id).filter_by(video_id=video_id).first():
+        return jsonify({'job_id': None, 'video_id': video_id, 'status': 'done', 'error': None})
+
+    job = submit_ingest_job(video_id)
+    return jsonify(job_to_dict(job)), 202
+
+@app.route('/ingest/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_ingest_job(job_id):
+    job = db.session.get(IngestJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_to_dict(job))
+
+# Timestamped transcript of a stored video; ?start=&end= (seconds) loads only that time range
+@app.route('/video/<video_id>/transcript', methods=['GET'])
+@login_required
+def get_video_transcript(video_id):
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    if start is None and end is None:
+        segments = get_transcript_segments(video_id)
+    else:
+        segments = load_transcript_segments(
+            video_id,
+            start_ms=int(start * 1000) if start is not None else None,
+            end_ms=int(end * 1000) if end is not None else None
+        )
+    if not len(segments) and not get_video_data(video_id):
+        return jsonify({'error': 'Video not found'}), 404
+
+    return jsonify({
+        'video_id': video_id,
+        'segments': [dict(segment, timestamp=format_timestamp(segment['start_ms'])) for segment in segments.to_dicts()]
+    })
+
+# Submit a playlist/channel URL or a list of video URLs for bulk ingestion
+@app.route('/ingest/batch', methods=['POST'])
+@login_required
+def submit_batch_ingest():
+    data = request.get_json()
     try:
-        data = request.get_json()
-        question = data.get('question')
-        content_type = data.get('content_type')  # 'code', 'file', 'video', 'image', etc.
-        session_id = data.get('session_id')  # Retrieve session_id for follow-up question
+        if data.get('playlist_url'):
+            video_ids = get_playlist_video_ids(data['playlist_url'])
+        else:
+            video_ids = [extract_video_id(url) for url in data.get('youtube_urls', [])]
+    except Exception as e:
+        logging.error(f"Error resolving batch ingest: {e}")
+        return jsonify({'error': str(e)}), 400
 
-        error_message = f"No analyzed {content_type} found in the session."
+    # Drop invalid URLs and duplicates, keeping the requested order
+    video_ids = list(dict.fromkeys(video_id for video_id in video_ids if video_id))[:BATCH_MAX_VIDEOS]
+    if not video_ids:
+        return jsonify({'error': 'No valid YouTube videos found.'}), 400
 
-        if content_type == 'code':
-            code_summary = CodeSummary.query.filter_by(session_id=session_id).first()
-            if not code_summary:
-                return jsonify({'error': error_message}), 400
-            content_context = code_summary.summary
+    batch = submit_ingest_batch(current_user.id, video_ids)
+    return jsonify(batch_progress(batch)), 202
 
-        elif content_type == 'file':
-            file_summary = FileSummary.query.filter_by(session_id=session_id).first()
-            if not file_summary:
-                return jsonify({'error': error_message}), 400
-            content_context = file_summary.summary
+@app.route('/ingest/batches/<batch_id>', methods=['GET'])
+@login_required
+def get_ingest_batch(batch_id):
+    batch = db.session.get(IngestBatch, batch_id)
+    if not batch or batch.user_id != current_user.id:
+        return jsonify({'error': 'Batch not found'}), 404
+    return jsonify(batch_progress(batch))
+
+# Look up the stored content that follow-up questions for a session are answered from.
+# Returns ((chunk_type, chunk_key, header, text), error); chunk_type is None for content that is not chunked.
+def load_session_content(content_type, session_id):
+    error_message = f"No analyzed {content_type} found in the session."
+
+    if content_type == 'code':
+        code_summary = CodeSummary.query.options(db.undefer(CodeSummary.summary)).filter_by(session_id=session_id).first()
+        if not code_summary:
+            return None, error_message
+        return ('code', session_id, '', code_summary.summary), None
+
+    elif content_type == 'file':
+        file_summary = FileSummary.query.options(db.undefer(FileSummary.summary)).filter_by(session_id=session_id).first()
+        if not file_summary:
+            return None, error_message
+        return ('file', session_id, '', file_summary.summary), None
+
+    elif content_type == 'video':
+        chat_session = db.session.get(ChatSession, session_id)
+        if not chat_session or not chat_session.video_id:
+            return None, 'No associated video found for this session.'
+
+        video_data = get_video_data(chat_session.video_id)
+        if not video_data:
+            return None, error_message
+        title, description, transcript = video_data
+        return ('video', chat_session.video_id, f"Title: {title}\nDescription: {description}\n", transcript), None
+
+    elif content_type == 'image':
+        image_data = ImageSummary.query.options(db.undefer(ImageSummary.summary)).filter_by(session_id=session_id).first()
+        if not image_data:
+            return None, error_message
+        return (None, None, '', image_data.summary), None
+
+    return None, 'Invalid content type provided.'
+
+# Long content is narrowed down to the chunks most relevant to the question
+def build_content_context(content, question, question_vector=None):
+    chunk_type, chunk_key, header, text = content
+    if chunk_type is None:
+        return text
+
+    chunks = get_relevant_chunks(chunk_type, chunk_key, text, question, question_vector=question_vector)
+    if chunk_type == 'video':
+        # Label each excerpt with the time its first word is spoken, so answers can cite it
+        segments = get_transcript_segments(chunk_key)
+        if len(segments):
+            step = max(CHUNK_WORDS - CHUNK_OVERLAP, 1)
+            chunks = [
+                (position, f"[{format_timestamp(segments.start_ms_at_word(position * step))}] {chunk}")
+                for position, chunk in chunks
+            ]
+        excerpts = '\n...\n'.join(chunk for _, chunk in chunks)
+        # Combine title, description, and the relevant transcript excerpts into a single content context
+        return f"{header}Transcript excerpts: {excerpts}"
+    return '\n...\n'.join(chunk for _, chunk in chunks)
+
+# Cache key for a question: the whole source content is hashed, so a repeat question
+# is answered from the cache before any retrieval or model call
+def question_cache_key(content, question):
+    _, _, header, text = content
+    return ResponseCache.make_key(CHAT_MODEL, header + text, question)
+
+# Semantic cache entries are grouped per content item; hashing the content also
+# separates them from answers about an earlier version of the same video or file
+def semantic_cache_scope(content):
+    _, _, header, text = content
+    return content_hash(CHAT_MODEL, header + text)[:32]
+
+# Look for a cached answer: exact match first, then a semantically similar question.
+# Returns (answer, cache_info, question_vector); question_vector is reused for retrieval on a miss.
+def lookup_cached_answer(content, question, cache_key):
+    cached_response = response_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response, {'type': 'exact'}, None
 
-        elif content_type == 'video':
-            chat_session = db.session.get(ChatSession, session_id)
-            if not chat_session or not chat_session.video_id:
-                return jsonify({'error': 'No associated video found for this session.'}), 400
+    try:
+        question_vector = embed_texts([question])[0]
+    except Exception as e:
+        logging.warning(f"Could not embed question, skipping semantic cache: {e}")
+        return None, None, None
+
+    entry = semantic_cache.lookup(semantic_cache_scope(content), question_vector)
+    if entry is None:
+        return None, None, question_vector
+
+    # Entries are shared by every user who asks about the same content, so neither the log nor the
+    # response carries the question that produced the answer; the entry id is enough to audit a hit
+    logging.info(f"Semantic cache hit {entry['id']} (similarity {entry['similarity']:.3f})")
+    cache_info = {'type': 'semantic', 'entry_id': entry['id'], 'similarity': entry['similarity']}
+    return entry['answer'], cache_info, question_vector
+
+def store_answer(content, question, cache_key, question_vector, answer):
+    response_cache.set(cache_key, CHAT_MODEL, answer)
+    if question_vector is not None:
+        semantic_cache.add(semantic_cache_scope(content), question_vector, question, answer)
+
+# Build the chat messages sent to OpenAI for a question about stored content
+def build_question_messages(content_context, question):
+    conversation_prompt = f"Content: {content_context}\nUser's question: {question}\nAI's answer:"
+    return [
+        {"role": "system", "content": "You are an AI assistant that answers questions based on the provided content. "
+                                      "When transcript excerpts start with a [mm:ss] timestamp, cite the timestamps your answer relies on."},
+        {"role": "user", "content": conversation_prompt}
+    ]
 
-            video_data = YouTubeVideo.query.filter_by(video_id=chat_session.video_id).first()
-            if not video_data:
-                return jsonify({'error': error_message}), 400
-            
-            # Extract title, description, and transcript
-            title = video_data.title
-            description = video_data.description
-            transcript = video_data.transcript
+# Format one Server-Sent Events message carrying a JSON payload
+def sse_event(payload, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(payload)}\n\n"
 
-            # Combine all three into a single content context
-            content_context = f"Title: {title}\nDescription: {description}\nTranscript: {transcript}"
+@app.route('/ask_question', methods=['POST'])
+@login_required
+def ask_question():
+    asked_at = datetime.utcnow()
+    try:
+        data = request.get_json()
+        question = data.get('question')
+        content_type = data.get('content_type')  # 'code', 'file', 'video', 'image', etc.
+        session_id = data.get('session_id')  # Retrieve session_id for follow-up question
 
+        # Questions can only be asked about the user's own sessions
+        if content_type != 'image' and get_owned_chat_session(session_id) is None:
+            return jsonify({'error': 'Session not found'}), 404
 
-        elif content_type == 'image':
-            image_data = ImageSummary.query.filter_by(session_id=session_id).first()
-            if not image_data:
-                return jsonify({'error': error_message}), 400
-            content_context = image_data.summary
+        content, error = load_session_content(content_type, session_id)
+        if error:
+            return jsonify({'error': error}), 400
 
-        else:
-            return jsonify({'error': 'Invalid content type provided.'}), 400
+        cache_key = question_cache_key(content, question)
+        cached_response, cache_info, question_vector = lookup_cached_answer(content, question, cache_key)
+        if cached_response is not None:
+            save_chat_turn(session_id, question, cached_response, asked_at)
+            return jsonify({'response': cached_response, 'session_id': session_id, 'cached': cache_info})
 
         # Generate the AI response based on the content context
-        conversation_prompt = f"Content: {content_context}\nUser's question: {question}\nAI's answer:"
-
         response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an AI assistant that answers questions based on the provided content."},
-                {"role": "user", "content": conversation_prompt}
-            ],
+            model=CHAT_MODEL,
+            messages=build_question_messages(build_content_context(content, question, question_vector), question),
             temperature=0.7
         )
 
         ai_response = response['choices'][0]['message']['content']
+        store_answer(content, question, cache_key, question_vector, ai_response)
+        save_chat_turn(session_id, question, ai_response, asked_at)
         return jsonify({'response': ai_response, 'session_id': session_id})
 
     except Exception as e:
         logging.error(f"Error in ask_question: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Streaming variant of /ask_question: forwards tokens to the browser as Server-Sent Events
+# as soon as OpenAI produces them instead of waiting for the whole answer
+@app.route('/ask_question/stream', methods=['POST'])
+@login_required
+def ask_question_stream():
+    asked_at = datetime.utcnow()
+    data = request.get_json()
+    question = data.get('question')
+    content_type = data.get('content_type')
+    session_id = data.get('session_id')
+
+    try:
+        # Questions can only be asked about the user's own sessions
+        if content_type != 'image' and get_owned_chat_session(session_id) is None:
+            return jsonify({'error': 'Session not found'}), 404
+
+        content, error = load_session_content(content_type, session_id)
+        if error:
+            return jsonify({'error': error}), 400
+
+        cache_key = question_cache_key(content, question)
+        cached_response, cache_info, question_vector = lookup_cached_answer(content, question, cache_key)
+        if cached_response is None:
+            messages = build_question_messages(build_content_context(content, question, question_vector), question)
+    except Exception as e:
+        logging.error(f"Error in ask_question_stream: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        try:
+            # A cached answer is sent as a single token
+            if cached_response is not None:
+                save_chat_turn(session_id, question, cached_response, asked_at)
+                yield sse_event({'token': cached_response})
+                yield sse_event({'session_id': session_id, 'cached': cache_info}, event='done')
+                return
+
+            response = openai.ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=0.7,
+                stream=True
+            )
+            tokens = []
+            for chunk in response:
+                token = chunk['choices'][0]['delta'].get('content')
+                if token:
+                    tokens.append(token)
+                    yield sse_event({'token': token})
+            # Only complete answers are cached
+            answer = ''.join(tokens)
+            store_answer(content, question, cache_key, question_vector, answer)
+            save_chat_turn(session_id, question, answer, asked_at)
+            yield sse_event({'session_id': session_id}, event='done')
+        except Exception as e:
+            logging.error(f"Error streaming answer: {e}")
+            yield sse_event({'error': str(e)}, event='error')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Hit/miss counters (for this worker process) and sizes of the caches
+@app.route('/cache-stats', methods=['GET'])
+@login_required
+def cache_stats():
+    return jsonify({
+        'responses': response_cache.stats(),
+        'videos': video_cache.memory.stats()
+    })
 
 # Main route to render the interface
 @app.route('/')
@@ -482,14 +1438,113 @@ def chatAI():
 def summarizer():
     return render_template('summarizer.html', nickname=current_user.nickname, email=current_user.email)
 
+# Full-text search over video transcripts, file summaries and the user's chat messages.
+# ?q=<text>&type=video|file|message (default all)&page=1&per_page=20; results are BM25-ranked.
+@app.route('/search', methods=['GET'])
+@login_required
+def search_content():
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 50)
+    if kind and kind not in FTS_INDEXES:
+        return jsonify({'error': f"type must be one of {', '.join(FTS_INDEXES)}"}), 400
+
+    with db.engine.connect() as connection:
+        results, total = search(connection, query, current_user.id, [kind] if kind else None,
+                                limit=per_page, offset=(page - 1) * per_page)
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page,
+        'results': results
+    })
+
+# Columns stored with CompressedText: (model, column)
+COMPRESSED_COLUMNS = [(YouTubeVideo, 'transcript'), (TranscriptBlock, 'text'), (FileSummary, 'summary'), (CodeSummary, 'summary')]
+COMPRESSION_TRAINING_SAMPLES = 2000
+
+# Rewrite existing rows of the compressed columns: flask --app project compress-text
+# Plain-text rows (from before compression) and rows compressed with an older dictionary are
+# re-encoded with the current codec; a new zstd dictionary is trained from a sample first.
+@app.cli.command('compress-text')
+@click.option('--train/--no-train', default=True, help='Train a new zstd dictionary from the stored text first.')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--vacuum/--no-vacuum', default=True, help='VACUUM afterwards to return the freed pages to the OS.')
+def compress_text_command(train, batch_size, vacuum):
+    database_path = db.engine.url.database
+    size_before = os.path.getsize(database_path)
+
+    if train:
+        samples = []
+        for model, column in COMPRESSED_COLUMNS:
+            rows = db.session.execute(
+                db.text(f"SELECT {column} FROM {model.__tablename__} ORDER BY RANDOM() LIMIT :limit"),
+                {'limit': COMPRESSION_TRAINING_SAMPLES}
+            )
+            samples.extend(text_codec.decompress(value) for (value,) in rows)
+        dictionary_id = text_codec.train(samples)
+        print(f"Trained zstd dictionary {dictionary_id} on {len(samples)} samples" if dictionary_id
+              else "No dictionary trained (zstandard not installed or too few rows)")
+
+    for model, column in COMPRESSED_COLUMNS:
+        table = model.__table__
+        update = table.update().where(table.c.id == db.bindparam('row_id')).values(
+            {column: db.bindparam('value', type_=CompressedText())}
+        )
+        last_id, rewritten = 0, 0
+        while True:
+            # Raw values, so that rows are read without decoding them through the column type
+            rows = db.session.execute(
+                db.text(f"SELECT id, {column} FROM {table.name} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': batch_size}
+            ).all()
+            if not rows:
+                break
+            db.session.execute(update, [{'row_id': row_id, 'value': text_codec.decompress(value)} for row_id, value in rows])
+            db.session.commit()
+            last_id, rewritten = rows[-1][0], rewritten + len(rows)
+        print(f"{table.name}.{column}: rewrote {rewritten} rows")
+
+    if vacuum:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('VACUUM')
+    print(f"Database size: {size_before / 1024 ** 2:.1f} MB -> {os.path.getsize(database_path) / 1024 ** 2:.1f} MB")
+
+# Remove uploads left behind by deleted sessions and crashed requests: flask --app project reap-uploads
+@app.cli.command('reap-uploads')
+def reap_uploads_command():
+    live_session_ids = [session_id for (session_id,) in db.session.query(ChatSession.id)]
+    blobs, freed = blob_store.reap(live_session_ids)
+    stats = blob_store.stats()
+    print(f"Removed {blobs} unreferenced uploads ({freed / 1024 ** 2:.1f} MB)")
+    print(f"{stats['blobs']} uploads stored: {stats['stored_bytes'] / 1024 ** 2:.1f} MB "
+          f"for {stats['referenced_bytes'] / 1024 ** 2:.1f} MB referenced")
+
+# Rebuild the search indexes from their source tables: flask --app project rebuild-search-index
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+    print(f"Rebuilt search indexes: {', '.join(FTS_INDEXES)}")
+
+# (Re)train the coarse quantizer of the chunk vector index: flask --app project train-vector-index
+# The app also trains it in the background once the index reaches IVF_MIN_ROWS chunks.
+@app.cli.command('train-vector-index')
+def train_vector_index_command():
+    started = time.perf_counter()
+    if vector_index.train_ivf():
+        print(f"Trained {len(vector_index.centroids)} lists over {len(vector_index)} vectors in {time.perf_counter() - started:.1f} s")
+    else:
+        print("Nothing trained (the index is empty or was compacted meanwhile)")
+
 @app.route('/history')
 @login_required
 def history():
-    # Query the database for all videos
-    videos = YouTubeVideo.query.all()
-    
-    # Pass the videos to the template
-    return render_template('history.html', videos=videos, nickname=current_user.nickname, email=current_user.email)
+    # The page loads the user's sessions itself, a page at a time, from /get-chat-history
+    return render_template('history.html', nickname=current_user.nickname, email=current_user.email)
 
 @app.route('/help')
 @login_required
@@ -578,38 +1633,96 @@ def save_chat_session():
     return jsonify({"success": True})
 
 
+# Opaque keyset cursor: the (date, id) of the last session on a page
+def encode_history_cursor(date, session_id):
+    return base64.urlsafe_b64encode(f"{date.isoformat()}|{session_id}".encode()).decode()
+
+def decode_history_cursor(cursor):
+    date, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(date), int(session_id)
+
+# One page of the current user's chat sessions, newest first, streamed as JSON.
+# Pages are found with the (user_id, date) index instead of OFFSET, so every page costs the same:
+# ?cursor=<next_cursor from the previous page>&limit=<n>. The response is
+# {"sessions": [...], "next_cursor": "..." or null}, written row by row.
+def stream_chat_sessions(fields):
+    limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+    query = db.session.query(ChatSession.id, ChatSession.date, *[getattr(ChatSession, field) for field in fields]).filter(
+        ChatSession.user_id == current_user.id
+    )
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_history_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(db.tuple_(ChatSession.date, ChatSession.id) < (cursor_date, cursor_id))
+    rows = query.order_by(ChatSession.date.desc(), ChatSession.id.desc()).limit(limit + 1).yield_per(HISTORY_PAGE_SIZE)
+
+    def generate():
+        yield '{"sessions": ['
+        last, has_more = None, False
+        for count, row in enumerate(rows):
+            # One row past the limit means there is another page
+            if count == limit:
+                has_more = True
+                break
+            session_data = {'id': row.id, 'date': row.date.strftime('%Y-%m-%d %H:%M:%S')}
+            session_data.update((field, getattr(row, field)) for field in fields)
+            yield (', ' if last else '') + json.dumps(session_data)
+            last = row
+        next_cursor = encode_history_cursor(last.date, last.id) if has_more else None
+        yield f'], "next_cursor": {json.dumps(next_cursor)}}}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 @app.route('/chat-sessions', methods=['GET'])
+@login_required
 def get_chat_sessions():
-    sessions = ChatSession.query.all()
-    return jsonify([
-        {
-            'date': session.date.strftime('%Y-%m-%d %H:%M:%S'),
-            'title': session.title,
-            'description': session.description
-        } for session in sessions
-    ])
+    return stream_chat_sessions(['title', 'description'])
+
+# Delete a chat session together with the rows that belong to it: messages, stored file/code
+# content and file/code chunks (video chunks are shared and kept). Returns the deleted chunk ids.
+def delete_chat_session_rows(chat_session):
+    for model in (ChatMessage, FileSummary, CodeSummary, ImageAnalysis):
+        model.query.filter_by(session_id=chat_session.id).delete(synchronize_session=False)
+    chunk_ids = delete_chunks(ContentChunk.query.filter(
+        ContentChunk.content_type.in_(['file', 'code']),
+        ContentChunk.content_key == str(chat_session.id)
+    ))
+    db.session.delete(chat_session)
+    return chunk_ids
+
+# Delete a chat session, then its vectors and the uploaded files no other session shares
+def delete_chat_session_and_content(chat_session):
+    session_id = chat_session.id
+    chunk_ids = delete_chat_session_rows(chat_session)
+    db.session.commit()
+    vector_index.delete(chunk_ids)
+    blob_store.release_session(session_id)
 
 @app.route('/delete-chat-session/<int:session_id>', methods=['DELETE'])
+@login_required
 def delete_chat_session(session_id):
     try:
-        # Query the session based on the session_id
-        chat_session = db.session.get(ChatSession, session_id)
-
-        
+        chat_session = get_owned_chat_session(session_id)
         if chat_session:
-            db.session.delete(chat_session)
-            db.session.commit()
+            # Buffered turns must not be written after their session is gone
+            chat_message_writer.flush()
+            delete_chat_session_and_content(chat_session)
             return jsonify({'success': True})
         else:
             return jsonify({'error': 'Session not found'}), 404
     except Exception as e:
         logging.error(f"Error deleting session: {e}")
+        db.session.rollback()
         return jsonify({'error': 'An error occurred while deleting the session.'}), 500
 
 @app.route('/chat-session/<int:session_id>', methods=['GET'])
 def get_chat_session(session_id):
     try:
-        session = ChatSession.query.get_or_404(session_id)
+        session = ChatSession.query.options(db.undefer(ChatSession.description)).get_or_404(session_id)
+        chat_message_writer.flush()  # Include turns still waiting in the write buffer
         messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
         return jsonify({
             'id': session.id,
@@ -626,7 +1739,8 @@ def get_chat_session(session_id):
 
 @app.route('/chat-session/<int:session_id>', methods=['GET'])
 def get_chat_session_with_messages(session_id):
-    session = ChatSession.query.get_or_404(session_id)
+    session = ChatSession.query.options(db.undefer(ChatSession.description)).get_or_404(session_id)
+    chat_message_writer.flush()  # Include turns still waiting in the write buffer
     messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
     return jsonify({
         'title': session.title,
@@ -640,22 +1754,13 @@ def get_chat_session_with_messages(session_id):
 @app.route('/get-chat-history', methods=['GET'])
 @login_required
 def get_chat_history():
-    sessions = ChatSession.query.order_by(ChatSession.date.desc()).all()  # Fetch all chat sessions
-    session_data = [
-        {
-            'id': session.id,
-            'title': session.title,
-            'description': session.description,
-            'date': session.date.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for session in sessions
-    ]
-    return jsonify(session_data)
+    return stream_chat_sessions(['title', 'description'])
 
 @app.route('/chat-session/view/<int:session_id>', methods=['GET'])
 @login_required
 def view_chat_session(session_id):
-    session = ChatSession.query.get_or_404(session_id)
+    session = ChatSession.query.options(db.undefer(ChatSession.description)).get_or_404(session_id)
+    chat_message_writer.flush()  # Include turns still waiting in the write buffer
     messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
 
     return render_template(
@@ -672,6 +1777,12 @@ def view_chat_session(session_id):
         ]
     )
 
+# Remove the session of an upload that failed part-way; its first chunk batches may already be committed
+def discard_file_session(session_id):
+    chat_session = db.session.get(ChatSession, session_id)
+    if chat_session:
+        delete_chat_session_and_content(chat_session)
+
 @app.route('/upload-file', methods=['POST'])
 @login_required
 def upload_file():
@@ -683,25 +1794,43 @@ def upload_file():
         return jsonify({'error': 'No file selected'}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # Hashed while it is written; a file with the same content as an earlier upload is not
+        # stored again, and its text comes from the extraction cache
+        upload = blob_store.save(file.stream, '.' + file.filename.rsplit('.', 1)[1].lower())
 
+        session_id = None
         try:
-            # Extract text from the uploaded file
-            text_content = extract_text_from_file(filepath)
-            if not text_content:
+            # Text is extracted page by page (PDFs in a process pool) and indexed as it arrives
+            pieces = text_extractor.extract(upload.path, upload.sha256)
+            if pieces is None:
+                blob_store.discard(upload)
+                return jsonify({'error': 'Failed to extract text from the file'}), 400
+            session_id = create_chat_session(user_id=current_user.id, title="File Upload", description="File uploaded for analysis.", commit=False)
+            # The pieces are compressed for storage as they pass through the indexer, so the
+            # full text is never held in memory; only its start is kept for the response
+            stored_text, preview = text_codec.stream_compressor(), []
+            def store(pieces):
+                preview_chars = 0
+                for piece in pieces:
+                    stored_text.write(piece)
+                    if preview_chars < UPLOAD_PREVIEW_CHARS:
+                        preview.append(piece[:UPLOAD_PREVIEW_CHARS - preview_chars])
+                        preview_chars += len(preview[-1])
+                    yield piece
+            if not index_content_stream('file', session_id, store(pieces)):
+                discard_file_session(session_id)
+                blob_store.discard(upload)
                 return jsonify({'error': 'Failed to extract text from the file'}), 400
 
             # Save the full content in the database
-            session_id = create_chat_session(user_id=current_user.id, title="File Upload", description="File uploaded for analysis.")
-            file_summary = FileSummary(session_id=session_id, summary=text_content)
+            file_summary = FileSummary(session_id=session_id, summary=stored_text.value())
             db.session.add(file_summary)
             db.session.commit()
+            blob_store.attach(upload, session_id)
 
             # Return the content type and AI message to the frontend
             return jsonify({
-                'summary': text_content,
+                'summary': ''.join(preview),
                 'content_type': 'file',
                 'aiMessage': "You can now ask questions based on the full content of the file.",
                 'session_id': session_id  # Return session_id for later use
@@ -709,6 +1838,11 @@ def upload_file():
 
         except Exception as e:
             logging.error(f"Error processing file: {e}")
+            db.session.rollback()
+            if session_id is not None:
+                discard_file_session(session_id)
+            if os.path.exists(upload.path):  # Not attached to the session yet
+                blob_store.discard(upload)
             return jsonify({'error': 'Failed to process the file.'}), 500
     else:
         return jsonify({'error': 'Invalid file type. Allowed types are txt, pdf, docx.'}), 400
@@ -734,19 +1868,24 @@ def summarize_code():
             {"role": "user", "content": code_prompt}
         ]
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.7
-        )
+        cache_key = ResponseCache.make_key(CHAT_MODEL, code_block, 'explain-code')
+        explanation = response_cache.get(cache_key)
+        if explanation is None:
+            response = openai.ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=0.7
+            )
 
-        explanation = response['choices'][0]['message']['content']
+            explanation = response['choices'][0]['message']['content']
+            response_cache.set(cache_key, CHAT_MODEL, explanation)
 
         # Save the full code in the database instead of the summarized version
-        session_id = create_chat_session(user_id=current_user.id, title="Code Analysis", description="Code uploaded and analyzed.")
+        session_id = create_chat_session(user_id=current_user.id, title="Code Analysis", description="Code uploaded and analyzed.", commit=False)
         code_summary = CodeSummary(session_id=session_id, summary=code_block)  # Save full code in the 'summary' column
         db.session.add(code_summary)
         db.session.commit()
+        index_content('code', session_id, code_block)
 
         # Respond with the explanation and content type
         return jsonify({
@@ -770,12 +1909,16 @@ def analyze_image():
         return jsonify({'error': 'No file selected.'}), 400
 
     try:
-        # Save the image temporarily
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(image.filename))
-        image.save(filepath)
-
-        # Extract text from the image using Tesseract
-        extracted_text = pytesseract.image_to_string(Image.open(filepath))
+        # The image is only kept while it is read
+        upload = blob_store.save(image.stream, os.path.splitext(secure_filename(image.filename))[1].lower())
+        try:
+            # Extract text from the image using Tesseract, unless an image with the same content was read before
+            extracted_text = ocr_cache.get(upload.sha256)
+            if extracted_text is None:
+                extracted_text = pytesseract.image_to_string(Image.open(upload.path))
+                ocr_cache.set(upload.sha256, extracted_text)
+        finally:
+            blob_store.discard(upload)
 
         # Generate analysis using OpenAI
         analysis_prompt = f"Analyze the following text extracted from an image:\n{extracted_text}\n\nAnalysis:"
@@ -784,13 +1927,17 @@ def analyze_image():
             {"role": "user", "content": analysis_prompt}
         ]
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.7
-        )
+        cache_key = ResponseCache.make_key(CHAT_MODEL, extracted_text, 'analyze-image')
+        analysis = response_cache.get(cache_key)
+        if analysis is None:
+            response = openai.ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=0.7
+            )
 
-        analysis = response['choices'][0]['message']['content']
+            analysis = response['choices'][0]['message']['content']
+            response_cache.set(cache_key, CHAT_MODEL, analysis)
 
         # Return the analysis to the frontend
         return jsonify({'analysis': analysis, 'content_type': 'image'})
@@ -835,11 +1982,13 @@ def generate_code():
         session_id = create_chat_session(
             user_id=current_user.id, 
             title="Code Generation", 
-            description="Code generated from user instructions."
+            description="Code generated from user instructions.",
+            commit=False
         )
         code_summary = CodeSummary(session_id=session_id, summary=generated_code)
         db.session.add(code_summary)
         db.session.commit()
+        index_content('code', session_id, generated_code)
 
         return jsonify({
             'generated_code': generated_code,
@@ -852,5 +2001,9 @@ def generate_code():
         return jsonify({'error': 'Failed to generate code.'}), 500
 
     
+# Extraction pool workers never import this file (see extraction._main_module_hidden)
+resume_ingest_jobs(unowned=True)
+threading.Thread(target=run_ingest_heartbeat, name='ingest-heartbeat', daemon=True).start()
+
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
\ No newline at end of file
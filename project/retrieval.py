@@ -0,0 +1,92 @@
+import math
+import re
+from collections import Counter
+
+# Chunking settings: transcripts often have no punctuation, so chunks are word windows
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'how', 'i', 'if',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'so', 'that', 'the', 'this', 'to', 'was',
+    'what', 'when', 'where', 'which', 'who', 'why', 'with', 'you', 'your',
+}
+
+
+def tokenize(text):
+    return [word for word in re.findall(r"[a-z0-9']+", text.lower()) if word not in STOPWORDS]
+
+
+# Split text into overlapping windows of words. The text can arrive in pieces (e.g. pages): each
+# chunk is yielded as soon as its words are known, and a word split across two pieces is carried
+# over to the next one, so the chunks are the same as for the joined text.
+def chunk_text_stream(pieces, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    step = max(chunk_words - overlap, 1)
+    words, carry = [], ''
+    for piece in pieces:
+        text = carry + piece
+        piece_words = text.split()
+        carry = piece_words.pop() if piece_words and not text[-1].isspace() else ''
+        words.extend(piece_words)
+        # More words than one chunk means this chunk is not the last one
+        while len(words) > chunk_words:
+            yield ' '.join(words[:chunk_words])
+            del words[:step]
+    if carry:
+        words.append(carry)
+    while len(words) > chunk_words:
+        yield ' '.join(words[:chunk_words])
+        del words[:step]
+    if words:
+        yield ' '.join(words)
+
+
+# Term frequencies ("postings") for one chunk, computed once at ingest time
+def chunk_postings(chunk):
+    return dict(Counter(tokenize(chunk)))
+
+
+# Rank chunks against a question with BM25.
+# `chunks` is a list of (term_frequencies, length) pairs; returns chunk indexes, best first.
+def bm25_rank(question, chunks, top_k):
+    if not chunks:
+        return []
+
+    query_terms = set(tokenize(question))
+    if not query_terms:
+        return list(range(min(top_k, len(chunks))))
+
+    num_chunks = len(chunks)
+    avg_length = sum(length for _, length in chunks) / num_chunks or 1
+
+    document_frequency = Counter()
+    for terms, _ in chunks:
+        document_frequency.update(term for term in query_terms if term in terms)
+
+    scores = []
+    for index, (terms, length) in enumerate(chunks):
+        score = 0.0
+        for term in query_terms:
+            frequency = terms.get(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (num_chunks - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            score += idf * frequency * (BM25_K1 + 1) / norm
+        scores.append((score, index))
+
+    scores.sort(key=lambda item: (-item[0], item[1]))
+    return [index for _, index in scores[:top_k]]
+
+
+# Merge several rankings (lists of keys, best first) with reciprocal rank fusion
+def reciprocal_rank_fusion(rankings, top_k, k=60):
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0) + 1 / (k + rank + 1)
+    return sorted(scores, key=lambda key: -scores[key])[:top_k]
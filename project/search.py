@@ -0,0 +1,178 @@
+import html
+import re
+
+from sqlalchemy import text
+
+# Full-text search over stored content with SQLite FTS5.
+# Each index is an external-content FTS5 table: it stores only the inverted index and reads
+# column values from the source table, and triggers on the source table keep it in sync.
+# Compressed columns are read through a view that applies the decompress_text() SQL function.
+# kind -> (source table, indexed columns, bm25 column weights, compressed columns)
+FTS_INDEXES = {
+    'video': ('you_tube_video', ('title', 'description', 'transcript'), (10.0, 2.0, 1.0), ('transcript',)),
+    'file': ('file_summary', ('summary',), (1.0,), ('summary',)),
+    'message': ('chat_message', ('message',), (1.0,), ()),
+}
+FTS_TOKENIZER = 'porter unicode61'
+SNIPPET_TOKENS = 16
+# Match markers that cannot appear in stored text; replaced by <mark> after HTML escaping
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+# Per kind: the matching rows the user may see, with their BM25 rank. Only rowids and ranks are
+# selected here; everything shown with a result is read for the requested page alone.
+# Videos are shared by all users; files and messages belong to the owner of their chat session.
+RANK_QUERIES = {
+    'video': "SELECT 'video' AS kind, {fts}.rowid AS id, {rank} AS score FROM {fts} WHERE {fts} MATCH :query",
+    'file': (
+        "SELECT 'file' AS kind, {fts}.rowid AS id, {rank} AS score "
+        "FROM {fts} JOIN file_summary src ON src.id = {fts}.rowid JOIN chat_session s ON s.id = src.session_id "
+        "WHERE {fts} MATCH :query AND s.user_id = :user_id"
+    ),
+    'message': (
+        "SELECT 'message' AS kind, {fts}.rowid AS id, {rank} AS score "
+        "FROM {fts} JOIN chat_message src ON src.id = {fts}.rowid JOIN chat_session s ON s.id = src.session_id "
+        "WHERE {fts} MATCH :query AND s.user_id = :user_id"
+    ),
+}
+
+# Per kind: the columns returned with each result of the page
+RESULT_QUERIES = {
+    'video': (
+        "SELECT page.kind AS kind, src.id AS id, src.video_id AS ref, src.title AS title, {snippet} AS snippet, page.score AS score, page.total AS total "
+        "FROM page JOIN {fts} ON {fts}.rowid = page.id JOIN you_tube_video src ON src.id = page.id "
+        "WHERE page.kind = 'video' AND {fts} MATCH :query"
+    ),
+    'file': (
+        "SELECT page.kind AS kind, src.id AS id, src.session_id AS ref, s.title AS title, {snippet} AS snippet, page.score AS score, page.total AS total "
+        "FROM page JOIN {fts} ON {fts}.rowid = page.id JOIN file_summary src ON src.id = page.id "
+        "JOIN chat_session s ON s.id = src.session_id WHERE page.kind = 'file' AND {fts} MATCH :query"
+    ),
+    'message': (
+        "SELECT page.kind AS kind, src.id AS id, src.session_id AS ref, s.title AS title, {snippet} AS snippet, page.score AS score, page.total AS total "
+        "FROM page JOIN {fts} ON {fts}.rowid = page.id JOIN chat_message src ON src.id = page.id "
+        "JOIN chat_session s ON s.id = src.session_id WHERE page.kind = 'message' AND {fts} MATCH :query"
+    ),
+}
+
+
+def fts_table(kind):
+    return f'{kind}_fts'
+
+
+# The table or view the FTS index reads its column values from
+def content_source(kind):
+    source, _, _, compressed = FTS_INDEXES[kind]
+    return f'{fts_table(kind)}_source' if compressed else source
+
+
+def schema_statements(kind):
+    source, columns, _, compressed = FTS_INDEXES[kind]
+    fts = fts_table(kind)
+    content = content_source(kind)
+    value = lambda row, column: f'decompress_text({row}.{column})' if column in compressed else f'{row}.{column}'
+    column_list = ', '.join(columns)
+    new_values = ', '.join(value('new', column) for column in columns)
+    old_values = ', '.join(value('old', column) for column in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});"
+    insert = f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values});"
+    statements = []
+    if compressed:
+        view_columns = ', '.join(f"{value('src', column)} AS {column}" for column in columns)
+        statements.append(f"CREATE VIEW IF NOT EXISTS {content} AS SELECT src.id AS id, {view_columns} FROM {source} src")
+    return statements + [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column_list}, content='{content}', content_rowid='id', tokenize='{FTS_TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {source} BEGIN {delete} {insert} END",
+    ]
+
+
+def drop_search_schema(connection, kind):
+    fts = fts_table(kind)
+    for trigger in ('ai', 'ad', 'au'):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{trigger}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+    connection.execute(text(f"DROP VIEW IF EXISTS {fts}_source"))
+
+
+# Create missing FTS tables and triggers. Tables created here (including ones recreated because
+# their definition changed) are filled from their source tables right away, so an existing
+# database becomes searchable on first start.
+def create_search_schema(connection):
+    existing = {
+        name: sql for name, sql in connection.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'table'"))
+    }
+    for kind in FTS_INDEXES:
+        fts = fts_table(kind)
+        if fts in existing and f"content='{content_source(kind)}'" not in existing[fts]:
+            drop_search_schema(connection, kind)
+            del existing[fts]
+        for statement in schema_statements(kind):
+            connection.execute(text(statement))
+        if fts not in existing:
+            rebuild_search_index(connection, [kind])
+
+
+# Re-read every row of the source tables into the FTS indexes
+def rebuild_search_index(connection, kinds=None):
+    for kind in kinds or FTS_INDEXES:
+        fts = fts_table(kind)
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('optimize')"))
+
+
+# Turn free text into an FTS5 query: every word must match (the last one as a prefix, for
+# search-as-you-type). Words are quoted, so FTS5 operators in the input are taken literally.
+def to_match_query(query):
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words[:-1]) + (' ' if len(words) > 1 else '') + f'"{words[-1]}"*'
+
+
+def format_snippet(snippet):
+    return html.escape(snippet or '').replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+# BM25-ranked results across the given kinds (best first), paginated with limit/offset.
+# Returns (results, total); snippets are HTML-escaped with matches wrapped in <mark>.
+# One statement: the matches of every kind are ranked on rowid and bm25() alone and counted with
+# a window function, then snippets (which read and tokenize the stored text) are made only for
+# the rows of the page.
+def search(connection, query, user_id, kinds=None, limit=20, offset=0):
+    match_query = to_match_query(query)
+    if not match_query:
+        return [], 0
+
+    kinds = kinds or list(FTS_INDEXES)
+    ranked = ' UNION ALL '.join(
+        RANK_QUERIES[kind].format(fts=fts_table(kind), rank=f"bm25({fts_table(kind)}, {', '.join(str(weight) for weight in FTS_INDEXES[kind][2])})")
+        for kind in kinds
+    )
+    results_union = ' UNION ALL '.join(
+        RESULT_QUERIES[kind].format(
+            fts=fts_table(kind),
+            snippet=f"snippet({fts_table(kind)}, -1, '{MATCH_START}', '{MATCH_END}', '…', {SNIPPET_TOKENS})",
+        )
+        for kind in kinds
+    )
+    params = {'query': match_query, 'user_id': user_id}
+    rows = connection.execute(text(
+        f"WITH page AS MATERIALIZED ("
+        f"SELECT kind, id, score, COUNT(*) OVER () AS total FROM ({ranked}) ORDER BY score, kind, id LIMIT :limit OFFSET :offset"
+        f") SELECT * FROM ({results_union}) ORDER BY score, kind, id"
+    ), dict(params, limit=limit, offset=offset)).mappings().all()
+
+    if rows:
+        total = rows[0]['total']
+    elif offset:
+        # Past the last page: there is no row to carry the count
+        total = connection.execute(text(f"SELECT COUNT(*) FROM ({ranked})"), params).scalar()
+    else:
+        total = 0
+    results = [
+        {'kind': row['kind'], 'id': row['id'], 'ref': row['ref'], 'title': row['title'],
+         'snippet': format_snippet(row['snippet']), 'score': round(-row['score'], 4)}
+        for row in rows
+    ]
+    return results, total
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+
+# Answer cache matched on question meaning rather than exact text.
+# Each content item (scope) has one small .npz file: a float32 matrix of normalized question
+# embeddings plus the matching entries (id, question, answer) as JSON.
+class SemanticCache:
+    def __init__(self, directory, threshold, max_entries=200):
+        self.directory = directory
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.scopes = {}  # scope -> (mtime, vectors, entries)
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, scope):
+        return os.path.join(self.directory, f'{scope}.npz')
+
+    # Load a scope, re-reading the file if another process has rewritten it
+    def _load(self, scope):
+        path = self._path(scope)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        cached = self.scopes.get(scope)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        if mtime is None:
+            vectors, entries = None, []
+        else:
+            with np.load(path) as data:
+                vectors = data['vectors']
+                entries = json.loads(str(data['entries']))
+        self.scopes[scope] = (mtime, vectors, entries)
+        return vectors, entries
+
+    def _save(self, scope, vectors, entries):
+        path = self._path(scope)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, vectors=vectors, entries=np.array(json.dumps(entries)))
+        os.replace(temp_path, path)
+        self.scopes[scope] = (os.path.getmtime(path), vectors, entries)
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # Return the most similar stored entry (with its similarity) if it passes the threshold
+    def lookup(self, scope, vector):
+        with self.lock:
+            vectors, entries = self._load(scope)
+        if vectors is None or not len(entries):
+            return None
+
+        similarities = vectors @ self._normalize(vector)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return dict(entries[best], similarity=float(similarities[best]))
+
+    def add(self, scope, vector, question, answer):
+        entry = {
+            'id': uuid.uuid4().hex[:12],
+            'question': question,
+            'answer': answer,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        vector = self._normalize(vector)[None, :]
+        with self.lock:
+            vectors, entries = self._load(scope)
+            vectors = vector if vectors is None else np.vstack([vectors, vector])
+            entries = entries + [entry]
+            # Keep only the newest entries per scope
+            vectors, entries = vectors[-self.max_entries:], entries[-self.max_entries:]
+            self._save(scope, vectors, entries)
+        return entry['id']
@@ -208,8 +208,6 @@ function initializeChatAI() {
 
 function askQuestion(question) {
     const submitBtn = document.getElementById('chat-submit-btn');
-    const loadingDiv = createLoadingMessage("Processing your question... Please wait.");
-    document.body.appendChild(loadingDiv);
 
     submitBtn.disabled = true;
     submitBtn.textContent = 'Processing...';
@@ -217,7 +215,11 @@ function askQuestion(question) {
     const content_type = sessionStorage.getItem('content_type');  // Get content type (file, code, video, etc.)
     const session_id = sessionStorage.getItem('currentSessionId');  // Get session ID from sessionStorage
 
-    fetch('/ask_question', {
+    // Empty AI message that is filled in token by token as the answer streams in
+    const responseElement = createStreamingAIResponse();
+    let responseText = '';
+
+    fetch('/ask_question/stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -228,27 +230,77 @@ function askQuestion(question) {
             session_id: session_id,  // Send session_id to fetch correct content
         }),
     })
-    .then(response => response.json())
-    .then(data => {
-        if (data.error) {
+    .then(async response => {
+        if (!response.ok) {
+            const data = await response.json();
             throw new Error(data.error);
         }
 
-        displayAIResponse(data.response);  // Display AI response
+        await readEventStream(response, (event, data) => {
+            if (event === 'error') {
+                throw new Error(data.error);
+            }
+            if (data.token) {
+                responseText += data.token;
+                updateStreamingAIResponse(responseElement, responseText);
+            }
+        });
     })
     .catch(error => {
         console.error('Error:', error);
+        if (!responseText) {
+            responseElement.remove();
+        }
         showError(error.message || 'An error occurred. Please try again.');
     })
     .finally(() => {
         submitBtn.disabled = false;
         submitBtn.textContent = 'Send';
-        if (document.getElementById('loading-message')) {
-            document.getElementById('loading-message').remove();
-        }
     });
 }
 
+// Read a Server-Sent Events response body and call onEvent(event, data) for every message
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        // Messages are separated by a blank line; keep any partial message in the buffer
+        const messages = buffer.split('\n\n');
+        buffer = messages.pop();
+
+        messages.forEach(message => {
+            let event = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        });
+    }
+}
+
+function createStreamingAIResponse() {
+    const chatWindow = document.getElementById("chat-window");
+    const responseElement = document.createElement("div");
+    responseElement.className = "ai-message";
+    chatWindow.appendChild(responseElement);
+    return responseElement;
+}
+
+function updateStreamingAIResponse(responseElement, responseText) {
+    const chatWindow = document.getElementById("chat-window");
+    responseElement.innerHTML = formatAIResponse(responseText);
+    chatWindow.scrollTop = chatWindow.scrollHeight;
+}
+
 function displayUserMessage(messageText) {
     const chatWindow = document.getElementById('chat-window');
     const userMessageElement = document.createElement('div');
@@ -263,17 +315,19 @@ function displayAIResponse(responseText) {
     const responseElement = document.createElement("div");
     responseElement.className = "ai-message";
     
-    const formattedText = responseText
-    .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')  // Convert bold
-    .replace(/\*(.*?)\*/g, '<em>$1</em>')  // Convert italic
-    .split("\n").join("<br>");  // Add line breaks
-    
-    responseElement.innerHTML = formattedText;
+    responseElement.innerHTML = formatAIResponse(responseText);
     
     chatWindow.appendChild(responseElement);
     chatWindow.scrollTop = chatWindow.scrollHeight;
 }
 
+function formatAIResponse(responseText) {
+    return responseText
+    .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')  // Convert bold
+    .replace(/\*(.*?)\*/g, '<em>$1</em>')  // Convert italic
+    .split("\n").join("<br>");  // Add line breaks
+}
+
 // Improve the formatting and structure of AI responses to make it more context-aware and visually pleasing
 function smartFormatResponse(text, isUserMessage = false) {
     if (isUserMessage) {
@@ -817,14 +871,26 @@ function saveCurrentChatSession() {
 function displayChatHistory() {
     const historyList = document.getElementById("chat-history");
     const noDataMessage = document.getElementById("no-data-message");
-
-    fetch('/get-chat-history')
-        .then(response => response.json())
-        .then(chatHistory => {
-            if (chatHistory.length > 0) {
-                noDataMessage.style.display = "none";
-
-                chatHistory.forEach(session => {
+    if (!historyList) return;
+
+    // Sessions are loaded a page at a time; "Load more" follows the cursor of the last page
+    const loadMoreButton = document.createElement("button");
+    loadMoreButton.type = "button";
+    loadMoreButton.className = "action-button load-more-button";
+    loadMoreButton.textContent = "Load more";
+    loadMoreButton.style.display = "none";
+    historyList.closest(".table-responsive").appendChild(loadMoreButton);
+
+    let nextCursor = null;
+
+    function loadPage() {
+        loadMoreButton.disabled = true;
+        const url = nextCursor ? `/get-chat-history?cursor=${encodeURIComponent(nextCursor)}` : '/get-chat-history';
+
+        fetch(url)
+            .then(response => response.json())
+            .then(page => {
+                page.sessions.forEach(session => {
                     const row = document.createElement("tr");
 
                     row.innerHTML = `
@@ -843,14 +909,23 @@ function displayChatHistory() {
 
                     historyList.appendChild(row);
                 });
-            } else {
-                noDataMessage.style.display = "block";
-            }
-        })
-        .catch(error => {
-            console.error("Error fetching chat history:", error);
-            noDataMessage.style.display = "block";
-        });
+
+                noDataMessage.style.display = historyList.children.length > 0 ? "none" : "block";
+                nextCursor = page.next_cursor;
+                loadMoreButton.style.display = nextCursor ? "block" : "none";
+                loadMoreButton.disabled = false;
+            })
+            .catch(error => {
+                console.error("Error fetching chat history:", error);
+                if (historyList.children.length === 0) {
+                    noDataMessage.style.display = "block";
+                }
+                loadMoreButton.disabled = false;
+            });
+    }
+
+    loadMoreButton.addEventListener("click", loadPage);
+    loadPage();
 }
 document.addEventListener("DOMContentLoaded", displayChatHistory);
 
@@ -1042,7 +1117,8 @@ function summarizeVideo(youtubeUrl) {
     submitBtn.disabled = true;
     submitBtn.textContent = 'Processing...';
 
-    fetch('/process_youtube_link', {
+    // Queue the video for ingestion, wait for the job, then open a chat session on it
+    fetch('/ingest/video', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -1050,6 +1126,20 @@ function summarizeVideo(youtubeUrl) {
         body: JSON.stringify({ youtube_url: youtubeUrl }),
     })
     .then(response => response.json())
+    .then(job => {
+        if (job.error) {
+            throw new Error(job.error);
+        }
+        return waitForIngestJob(job);
+    })
+    .then(() => fetch('/process_youtube_link', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ youtube_url: youtubeUrl }),
+    }))
+    .then(response => response.json())
     .then(data => {
         if (data.error) {
             throw new Error(data.error);
@@ -1075,4 +1165,17 @@ function summarizeVideo(youtubeUrl) {
             document.getElementById('loading-message').remove();
         }
     });
-}
\ No newline at end of file
+}
+
+// Poll an ingestion job until it has finished
+async function waitForIngestJob(job, intervalMs = 1000) {
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        const response = await fetch(`/ingest/jobs/${job.job_id}`);
+        job = await response.json();
+    }
+    if (job.status !== 'done') {
+        throw new Error(job.error || 'Failed to process the video.');
+    }
+    return job;
+}
@@ -354,14 +354,23 @@ function displayChatHistory() {
     const chatHistoryContainer = document.getElementById('chat-history');
     const noDataMessage = document.getElementById('no-data-message');
 
-    fetch('/chat-sessions')
-        .then(response => response.json())
-        .then(sessions => {
-            if (sessions.length === 0) {
-                noDataMessage.style.display = 'block';
-            } else {
-                noDataMessage.style.display = 'none';
-                sessions.forEach(session => {
+    // /chat-sessions returns one page ({sessions, next_cursor}); "Load more" fetches the next one
+    const loadMoreButton = document.createElement('button');
+    loadMoreButton.type = 'button';
+    loadMoreButton.className = 'action-button load-more-button';
+    loadMoreButton.textContent = 'Load more';
+    loadMoreButton.style.display = 'none';
+    (chatHistoryContainer.closest('.table-responsive') || chatHistoryContainer.parentNode).appendChild(loadMoreButton);
+
+    let nextCursor = null;
+
+    function loadPage() {
+        loadMoreButton.disabled = true;
+        const url = nextCursor ? `/chat-sessions?cursor=${encodeURIComponent(nextCursor)}` : '/chat-sessions';
+        fetch(url)
+            .then(response => response.json())
+            .then(page => {
+                page.sessions.forEach(session => {
                     const row = document.createElement('tr');
                     row.innerHTML = `
                         <td>${session.date}</td>
@@ -378,12 +387,22 @@ function displayChatHistory() {
                     `;
                     chatHistoryContainer.appendChild(row);
                 });
-            }
-        })
-        .catch(error => {
-            console.error('Error fetching chat history:', error);
-            noDataMessage.style.display = 'block';
-        });
+                noDataMessage.style.display = chatHistoryContainer.children.length > 0 ? 'none' : 'block';
+                nextCursor = page.next_cursor;
+                loadMoreButton.style.display = nextCursor ? 'block' : 'none';
+                loadMoreButton.disabled = false;
+            })
+            .catch(error => {
+                console.error('Error fetching chat history:', error);
+                if (chatHistoryContainer.children.length === 0) {
+                    noDataMessage.style.display = 'block';
+                }
+                loadMoreButton.disabled = false;
+            });
+    }
+
+    loadMoreButton.addEventListener('click', loadPage);
+    loadPage();
 }
 
 function reinteractSession(date) {
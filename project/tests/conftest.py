@@ -0,0 +1,109 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+# The project modules are imported as top-level modules, as when the app runs from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app is imported once, against a scratch database; uploads/ is relative to the working directory
+WORK_DIR = tempfile.mkdtemp(prefix='project-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'test.db')}"
+for name in ('YOUTUBE_API_KEY', 'OPENAI_API_KEY', 'SECRET_KEY'):
+    os.environ.setdefault(name, 'test')
+os.chdir(WORK_DIR)
+
+
+# Text-to-speech needs an eSpeak driver on the machine and no test uses it
+class SilentSpeechEngine:
+    def setProperty(self, name, value):
+        pass
+
+    def save_to_file(self, text, path):
+        pass
+
+    def runAndWait(self):
+        pass
+
+
+import pyttsx3
+pyttsx3.init = lambda *args, **kwargs: SilentSpeechEngine()
+
+import project as app_module
+from project import app, db, User
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    yield
+    app_module.chat_message_writer.flush()
+    with app.app_context():
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    # Chunk ids start again from 1, so vectors of this test's chunks must not outlive it
+    vector_index = app_module.vector_index
+    if len(vector_index):
+        vector_index.delete([int(chunk_id) for chunk_id in vector_index.ids if chunk_id >= 0])
+    app_module.video_cache.memory.entries.clear()
+    app_module.segment_cache.entries.clear()
+    # Answer caches are files next to the database
+    with app_module.response_cache._connection() as connection:
+        connection.execute('DELETE FROM response_cache')
+    for name in os.listdir(app_module.semantic_cache.directory):
+        os.remove(os.path.join(app_module.semantic_cache.directory, name))
+    app_module.semantic_cache.scopes.clear()
+
+
+# Embeddings and chat completions without the OpenAI API: every text embeds to the same vector
+# (so any two questions about the same content are a semantic cache hit) and answers are canned
+@pytest.fixture(autouse=True)
+def offline_openai(monkeypatch):
+    vector = np.ones(app_module.EMBEDDING_DIM, dtype=np.float32).tolist()
+    monkeypatch.setattr(app_module, 'embed_texts', lambda texts: [vector for _ in texts])
+    answers = []
+
+    def create(model, messages, **kwargs):
+        answers.append(messages)
+        return {'choices': [{'message': {'content': f"Answer {len(answers)}"}}]}
+
+    monkeypatch.setattr(app_module.openai.ChatCompletion, 'create', create)
+    return answers
+
+
+@pytest.fixture
+def make_user():
+    def make(email):
+        with app.app_context():
+            user = User(email=email, nickname=email.split('@')[0], password='-')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def make_chat_session(user_id, title='Session', video_id=None):
+    with app.app_context():
+        return app_module.create_chat_session(user_id, title, f'{title} description', video_id=video_id)
+
+
+def store_video(video_id='abcdefghijk', transcript='The lecture explains gradient descent step by step.'):
+    with app.app_context():
+        app_module.save_video_to_db(video_id, 'A lecture', 'About optimisation', transcript)
+    return video_id
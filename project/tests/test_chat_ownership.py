@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import project as app_module
+from conftest import login, make_chat_session, store_video
+from project import app, ChatMessage
+
+
+def messages_of(session_id):
+    app_module.chat_message_writer.flush()
+    with app.app_context():
+        return [message.message for message in ChatMessage.query.filter_by(session_id=session_id)]
+
+
+def test_question_is_saved_to_own_session(client, make_user):
+    user = make_user('owner@example.com')
+    session_id = make_chat_session(user, video_id=store_video())
+    login(client, user)
+
+    response = client.post('/ask_question', json={'question': 'What is covered?', 'content_type': 'video', 'session_id': session_id})
+
+    assert response.status_code == 200
+    assert messages_of(session_id) == ['What is covered?', response.get_json()['response']]
+
+
+def test_question_about_another_users_session_is_rejected(client, make_user):
+    owner, other = make_user('owner@example.com'), make_user('other@example.com')
+    session_id = make_chat_session(owner, video_id=store_video())
+    login(client, other)
+
+    for path in ('/ask_question', '/ask_question/stream'):
+        response = client.post(path, json={'question': 'Injected?', 'content_type': 'video', 'session_id': session_id})
+        assert response.status_code == 404
+
+    assert messages_of(session_id) == []
+
+
+def test_save_chat_turn_ignores_sessions_of_other_users(make_user):
+    owner, other = make_user('owner@example.com'), make_user('other@example.com')
+    session_id = make_chat_session(owner)
+
+    with app.test_request_context():
+        app_module.login_user(app_module.db.session.get(app_module.User, other))
+        app_module.save_chat_turn(session_id, 'Injected?', 'Answer', datetime.utcnow())
+        app_module.save_chat_turn('not-a-session', 'Question', 'Answer', datetime.utcnow())
+
+    assert messages_of(session_id) == []
@@ -0,0 +1,71 @@
+import sys
+import threading
+
+import extraction
+from extraction import TextExtractor
+
+PAGES = 40
+
+
+# A minimal PDF with one line of text per page
+def write_pdf(path, pages=PAGES):
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for page in range(pages):
+        content = f'BT /F1 12 Tf 72 720 Td (Page {page} text) Tj ET'
+        objects.append(f'<< /Length {len(content)} >>\nstream\n{content}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R '
+                       f'/Resources << /Font << /F1 3 0 R >> >> >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    data, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n{body}\nendobj\n'.encode()
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    data += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode()
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_pdf_pages_are_extracted_in_the_pool_in_page_order(tmp_path):
+    path = str(tmp_path / 'document.pdf')
+    write_pdf(path)
+    extractor = TextExtractor(max_workers=2)
+    # Another thread holds a lock while the pool starts, as request threads do in the app
+    held = threading.Lock()
+    held.acquire()
+    try:
+        text = ''.join(extractor.extract(path))
+        assert extractor.executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        held.release()
+        extractor.shutdown()
+
+    assert PAGES > extraction.MIN_PARALLEL_PAGES
+    assert [line.strip() for line in text.splitlines() if line.strip()] == [f'Page {page} text' for page in range(PAGES)]
+
+
+def test_workers_do_not_run_the_main_module(tmp_path, monkeypatch):
+    # As under `python project.py`: a worker that ran the main module again would start the app
+    marker = tmp_path / 'main-was-run'
+    main_script = tmp_path / 'app_main.py'
+    main_script.write_text(f'open({str(marker)!r}, "w").close()\n')
+    main = sys.modules['__main__']
+    monkeypatch.setattr(main, '__spec__', None)
+    monkeypatch.setattr(main, '__file__', str(main_script), raising=False)
+
+    path = str(tmp_path / 'document.pdf')
+    write_pdf(path)
+    extractor = TextExtractor(max_workers=2)
+    try:
+        text = ''.join(extractor.extract(path))
+    finally:
+        extractor.shutdown()
+
+    assert 'Page 0 text' in text
+    assert not marker.exists()
+    assert main.__file__ == str(main_script)
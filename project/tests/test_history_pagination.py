@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from conftest import login
+from project import app, db, ChatSession
+
+
+def add_sessions(user_id, count, date=None):
+    started = datetime(2024, 1, 1)
+    with app.app_context():
+        sessions = [
+            ChatSession(user_id=user_id, date=date or started + timedelta(minutes=i), title=f'Session {i}', description='')
+            for i in range(count)
+        ]
+        db.session.add_all(sessions)
+        db.session.commit()
+        return [chat_session.id for chat_session in sessions]
+
+
+def all_pages(client, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get('/get-chat-history', query_string={'limit': limit, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page['sessions']) <= limit
+        ids.extend(session['id'] for session in page['sessions'])
+        pages += 1
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids, pages
+
+
+def test_pages_cover_every_session_newest_first(client, make_user):
+    user = make_user('owner@example.com')
+    session_ids = add_sessions(user, 12)
+    login(client, user)
+
+    ids, pages = all_pages(client, limit=5)
+
+    assert ids == session_ids[::-1]
+    assert pages == 3
+
+
+def test_sessions_with_the_same_date_are_neither_skipped_nor_repeated(client, make_user):
+    user = make_user('owner@example.com')
+    session_ids = add_sessions(user, 7, date=datetime(2024, 1, 1))
+    login(client, user)
+
+    ids, _ = all_pages(client, limit=3)
+
+    assert ids == sorted(session_ids, reverse=True)
+
+
+def test_a_page_holds_only_the_users_own_sessions(client, make_user):
+    owner, other = make_user('owner@example.com'), make_user('other@example.com')
+    add_sessions(other, 4)
+    own_ids = add_sessions(owner, 2)
+    login(client, owner)
+
+    ids, pages = all_pages(client, limit=10)
+
+    assert ids == own_ids[::-1]
+    assert pages == 1
+
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    login(client, make_user('owner@example.com'))
+
+    assert client.get('/get-chat-history?cursor=not-a-cursor').status_code == 400
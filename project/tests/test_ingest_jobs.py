@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy
+
+import project as app_module
+from conftest import store_video
+from project import app, db, IngestBatch, IngestJob, INGEST_STALE_SECONDS, INGEST_WORKER_ID
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    job_ids = []
+    monkeypatch.setattr(app_module.ingest_executor, 'submit', lambda function, job_id: job_ids.append(job_id))
+    return job_ids
+
+
+def add_job(job_id, status, age_seconds=0, worker_id=None, video_id=None):
+    with app.app_context():
+        db.session.add(IngestJob(
+            id=job_id, video_id=video_id or f'video-{job_id}', status=status, worker_id=worker_id,
+            updated_at=datetime.utcnow() - timedelta(seconds=age_seconds),
+        ))
+        db.session.commit()
+
+
+def status_of(job_id):
+    with app.app_context():
+        return db.session.get(IngestJob, job_id).status
+
+
+def test_resume_requeues_only_stale_running_jobs(submitted):
+    add_job('live', 'running', age_seconds=10, worker_id='other-worker')
+    add_job('stale', 'running', age_seconds=INGEST_STALE_SECONDS + 60, worker_id='stopped-worker')
+    add_job('waiting', 'queued')
+    add_job('finished', 'done', age_seconds=INGEST_STALE_SECONDS + 60)
+
+    app_module.resume_ingest_jobs(unowned=True)
+
+    # The live job keeps running in its own worker; starting another process must not duplicate it
+    assert status_of('live') == 'running'
+    assert status_of('stale') == 'queued'
+    assert status_of('finished') == 'done'
+    assert sorted(submitted) == ['stale', 'waiting']
+
+
+class StopHeartbeat(BaseException):
+    pass
+
+
+def test_heartbeat_takes_over_jobs_of_a_stopped_process(submitted, monkeypatch):
+    old = INGEST_STALE_SECONDS + 60
+    add_job('running', 'running', age_seconds=old, worker_id='stopped-worker')
+    add_job('queued', 'queued', age_seconds=old, worker_id='stopped-worker')
+    add_job('waiting', 'queued', age_seconds=10, worker_id='other-worker')
+    ticks = []
+
+    def sleep(seconds):
+        ticks.append(seconds)
+        if len(ticks) > 1:
+            raise StopHeartbeat()
+
+    monkeypatch.setattr(app_module.time, 'sleep', sleep)
+    with pytest.raises(StopHeartbeat):
+        app_module.run_ingest_heartbeat()
+
+    assert sorted(submitted) == ['queued', 'running']
+    with app.app_context():
+        for job_id in ('running', 'queued'):
+            job = db.session.get(IngestJob, job_id)
+            assert (job.status, job.worker_id) == ('queued', INGEST_WORKER_ID)
+        # Resubmitting the video returns the job, which now runs in a live process
+        assert app_module.submit_ingest_job('video-queued').id == 'queued'
+
+    # The next tick sees the jobs heartbeating and leaves them to this process
+    submitted.clear()
+    app_module.resume_ingest_jobs()
+    assert submitted == []
+
+
+def test_heartbeat_only_touches_this_workers_jobs():
+    old = INGEST_STALE_SECONDS + 60
+    add_job('mine', 'running', age_seconds=old, worker_id=INGEST_WORKER_ID)
+    add_job('theirs', 'running', age_seconds=old, worker_id='other-worker')
+
+    app_module.touch_ingest_jobs()
+
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(seconds=INGEST_STALE_SECONDS)
+        assert db.session.get(IngestJob, 'mine').updated_at > cutoff
+        assert db.session.get(IngestJob, 'theirs').updated_at < cutoff
+
+
+def test_a_job_is_claimed_once(monkeypatch):
+    ingested = []
+    monkeypatch.setattr(app_module, 'ingest_video', ingested.append)
+    add_job('job', 'queued', video_id='abcdefghijk')
+
+    app_module.run_ingest_job('job')
+    app_module.run_ingest_job('job')
+
+    assert ingested == ['abcdefghijk']
+    with app.app_context():
+        job = db.session.get(IngestJob, 'job')
+        assert (job.status, job.worker_id) == ('done', INGEST_WORKER_ID)
+
+
+def test_batch_progress_uses_a_fixed_number_of_queries():
+    video_ids = [f'video{i:06d}' for i in range(40)]
+    store_video(video_ids[0])
+    with app.app_context():
+        batch = IngestBatch(id='batch', user_id=1, video_ids=json.dumps(video_ids))
+        db.session.add(batch)
+        db.session.commit()
+    for i, video_id in enumerate(video_ids[2:], 2):
+        add_job(f'job{i}', ('queued', 'running', 'done', 'failed')[i % 4], video_id=video_id)
+    with app.app_context():
+        IngestJob.query.filter(IngestJob.id != 'job2').update({'batch_id': 'batch'})
+        db.session.commit()
+
+    statements = []
+    with app.app_context():
+        batch = db.session.get(IngestBatch, 'batch')
+        listener = lambda *args: statements.append(args[2])
+        sqlalchemy.event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            progress = app_module.batch_progress(batch)
+        finally:
+            sqlalchemy.event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert len(statements) <= 3
+    by_video = {video['video_id']: video for video in progress['videos']}
+    assert by_video[video_ids[0]]['status'] == 'done'  # Stored before the batch
+    assert by_video[video_ids[1]] == {'job_id': None, 'video_id': video_ids[1], 'status': 'queued', 'stage': None, 'error': None}
+    assert by_video[video_ids[2]]['job_id'] == 'job2'  # Ingested by a job of its own, outside the batch
+    assert progress['counts'] == {'queued': 10, 'running': 9, 'done': 11, 'failed': 10}
@@ -0,0 +1,17 @@
+from retrieval import chunk_text_stream
+
+
+def test_chunks_do_not_depend_on_how_the_text_is_split():
+    text = ' '.join(f'word{i}' for i in range(500))
+    whole = list(chunk_text_stream([text], chunk_words=200, overlap=40))
+    # Pieces that end mid-word, on a space and with runs of whitespace
+    pieces = [text[start:start + 37] for start in range(0, len(text), 37)] + ['  \n']
+
+    assert list(chunk_text_stream(pieces, chunk_words=200, overlap=40)) == whole
+    assert [chunk.split()[0] for chunk in whole] == ['word0', 'word160', 'word320']
+    assert whole[-1].split()[-1] == 'word499'
+
+
+def test_short_and_empty_texts():
+    assert list(chunk_text_stream(['a few words'])) == ['a few words']
+    assert list(chunk_text_stream(['', '   '])) == []
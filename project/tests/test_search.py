@@ -0,0 +1,49 @@
+from compression import text_codec
+from conftest import store_video
+from project import app, db
+from search import search
+
+VIDEOS = 30
+
+
+def store_videos():
+    # Video i mentions "gradient" i + 1 times, so BM25 ranks the later videos first
+    for i in range(VIDEOS):
+        store_video(f'video{i:06d}', ' '.join(['gradient descent'] * (i + 1) + ['filler words'] * 40))
+
+
+def run_search(query, **kwargs):
+    with app.app_context(), db.engine.connect() as connection:
+        return search(connection, query, user_id=1, kinds=['video'], **kwargs)
+
+
+def test_pages_are_ranked_and_counted():
+    store_videos()
+
+    first, total = run_search('gradient', limit=5)
+    second, _ = run_search('gradient', limit=5, offset=5)
+
+    assert total == VIDEOS
+    refs = [result['ref'] for result in first + second]
+    assert refs == [f'video{i:06d}' for i in range(VIDEOS - 1, VIDEOS - 11, -1)]
+    assert all('<mark>gradient</mark>' in result['snippet'] for result in first)
+    assert run_search('gradient', limit=5, offset=VIDEOS) == ([], VIDEOS)
+    assert run_search('nowhere', limit=5) == ([], 0)
+
+
+def test_snippets_are_made_for_the_page_only():
+    store_videos()
+    calls = []
+
+    def counting_decompress(value):
+        calls.append(value)
+        return text_codec.decompress(value)
+
+    with app.app_context(), db.engine.connect() as connection:
+        # The FTS view reads transcripts through decompress_text(), once per snippet
+        connection.connection.driver_connection.create_function('decompress_text', 1, counting_decompress, deterministic=True)
+        results, total = search(connection, 'gradient', user_id=1, kinds=['video'], limit=5)
+        connection.connection.driver_connection.create_function('decompress_text', 1, text_codec.decompress, deterministic=True)
+
+    assert (len(results), total) == (5, VIDEOS)
+    assert 0 < len(calls) <= len(results)
@@ -0,0 +1,28 @@
+from conftest import login, make_chat_session, store_video
+
+
+def ask(client, session_id, question):
+    response = client.post('/ask_question', json={'question': question, 'content_type': 'video', 'session_id': session_id})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_semantic_hit_does_not_reveal_another_users_question(client, make_user, caplog):
+    video_id = store_video()
+    first_user, second_user = make_user('first@example.com'), make_user('second@example.com')
+    first_session = make_chat_session(first_user, video_id=video_id)
+    second_session = make_chat_session(second_user, video_id=video_id)
+
+    login(client, first_user)
+    first = ask(client, first_session, 'my private question about gradient descent')
+    assert 'cached' not in first
+
+    login(client, second_user)
+    with caplog.at_level('INFO'):
+        second = ask(client, second_session, 'what is this lecture about?')
+
+    assert second['cached']['type'] == 'semantic'
+    assert second['response'] == first['response']
+    assert 'question' not in second['cached']
+    assert 'private question' not in str(second)
+    assert 'private question' not in caplog.text
@@ -0,0 +1,65 @@
+import io
+
+from conftest import login, make_chat_session
+from project import app, db, ChatMessage, ChatSession, ContentChunk, FileSummary, vector_index
+
+DOCUMENT = ' '.join(f'word{i % 50} sentence {i}.' for i in range(2000)).encode()
+
+
+def upload(client, data=DOCUMENT, filename='notes.txt'):
+    response = client.post('/upload-file', data={'file': (io.BytesIO(data), filename)}, content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['session_id']
+
+
+def count(model, **filters):
+    with app.app_context():
+        return model.query.filter_by(**filters).count()
+
+
+def test_deleting_a_file_session_removes_its_rows_and_vectors(client, make_user):
+    user = make_user('owner@example.com')
+    login(client, user)
+    vectors_before = len(vector_index)
+    session_id = upload(client)
+    client.post('/ask_question', json={'question': 'What is word7?', 'content_type': 'file', 'session_id': session_id})
+    chunks = count(ContentChunk, content_type='file', content_key=str(session_id))
+    assert chunks > 1
+    assert len(vector_index) == vectors_before + chunks
+
+    response = client.delete(f'/delete-chat-session/{session_id}')
+
+    assert response.status_code == 200
+    assert count(ChatSession, id=session_id) == 0
+    assert count(FileSummary, session_id=session_id) == 0
+    assert count(ChatMessage, session_id=session_id) == 0
+    assert count(ContentChunk, content_type='file', content_key=str(session_id)) == 0
+    assert len(vector_index) == vectors_before
+
+
+def test_failed_delete_keeps_rows_and_vectors(client, make_user, monkeypatch):
+    user = make_user('owner@example.com')
+    login(client, user)
+    session_id = upload(client)
+    chunks = count(ContentChunk, content_type='file', content_key=str(session_id))
+    vectors = len(vector_index)
+
+    def fail():
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(db.session, 'commit', fail)
+    response = client.delete(f'/delete-chat-session/{session_id}')
+    monkeypatch.undo()
+
+    assert response.status_code == 500
+    assert count(ChatSession, id=session_id) == 1
+    assert count(ContentChunk, content_type='file', content_key=str(session_id)) == chunks
+    assert len(vector_index) == vectors
+
+
+def test_cannot_delete_another_users_session(client, make_user):
+    owner, other = make_user('owner@example.com'), make_user('other@example.com')
+    session_id = make_chat_session(owner)
+    login(client, other)
+
+    assert client.delete(f'/delete-chat-session/{session_id}').status_code == 404
+    assert count(ChatSession, id=session_id) == 1
@@ -0,0 +1,58 @@
+import project as app_module
+from compression import text_codec
+from project import app, db, TranscriptSegment
+from transcript_segments import TranscriptSegments
+
+SEGMENTS = TranscriptSegments(
+    [0, 4000, 9000, 15000],
+    [4000, 5000, 6000, 3000],
+    ['Welcome to the  lecture.', 'Today: gradient descent', 'and its   learning rate', 'Thanks for watching!'],
+)
+
+
+def store_segments(video_id='abcdefghijk'):
+    with app.app_context():
+        app_module.save_video_to_db(video_id, 'A lecture', 'About optimisation', SEGMENTS.text, SEGMENTS)
+
+
+def test_segments_store_offsets_into_the_transcript():
+    store_segments()
+
+    with app.app_context():
+        rows = TranscriptSegment.query.order_by(TranscriptSegment.start_ms).all()
+        assert [row.text for row in rows] == [''] * len(SEGMENTS)
+        assert [SEGMENTS.text[row.text_start:row.text_end] for row in rows] == [text for _, _, text in SEGMENTS]
+
+        assert list(app_module.load_transcript_segments('abcdefghijk')) == list(SEGMENTS)
+        assert list(app_module.load_transcript_segments('abcdefghijk', 5000, 10000)) == list(SEGMENTS)[1:3]
+
+
+def test_rows_stored_with_their_text_still_load():
+    with app.app_context():
+        db.session.add(TranscriptSegment(video_id='abcdefghijk', start_ms=0, duration_ms=1000, text='Old row'))
+        db.session.commit()
+
+        assert list(app_module.load_transcript_segments('abcdefghijk')) == [(0, 1000, 'Old row')]
+
+
+def test_a_range_load_decompresses_only_the_blocks_it_covers(monkeypatch):
+    # An hour of captions, five seconds each: far more text than one block
+    segments = TranscriptSegments(
+        range(0, 3600000, 5000), [5000] * 720, [f'Segment {i} talks about gradient descent' for i in range(720)]
+    )
+    with app.app_context():
+        app_module.save_video_to_db('abcdefghijk', 'A lecture', 'About optimisation', segments.text, segments)
+    decompressed, decompress = [], text_codec.decompress
+
+    def counting_decompress(value):
+        text = decompress(value)
+        decompressed.append(len(text))
+        return text
+
+    monkeypatch.setattr(text_codec, 'decompress', counting_decompress)
+    monkeypatch.setattr(app_module, 'get_video_data', None)  # Would read the whole transcript
+    with app.app_context():
+        loaded = app_module.load_transcript_segments('abcdefghijk', 1800000, 1830000)
+
+    assert list(loaded) == list(segments)[360:366]
+    assert 0 < sum(decompressed) <= 2 * app_module.TRANSCRIPT_BLOCK_CHARS < len(segments.text)
@@ -0,0 +1,62 @@
+import hashlib
+import io
+import os
+
+import project as app_module
+from conftest import login
+from project import app, db, ChatSession, FileSummary, UPLOAD_PREVIEW_CHARS, blob_store
+from test_session_delete import DOCUMENT, upload
+
+
+def blob_exists(data=DOCUMENT, extension='.txt'):
+    return os.path.exists(blob_store.blob_path(hashlib.sha256(data).hexdigest(), extension))
+
+
+def test_upload_is_stored_once_and_deleted_with_its_session(client, make_user):
+    login(client, make_user('owner@example.com'))
+    session_id = upload(client)
+    assert blob_exists()
+
+    assert client.delete(f'/delete-chat-session/{session_id}').status_code == 200
+
+    # The session held the only reference, so the blob went with it
+    assert not blob_exists()
+    assert blob_store.reap([]) == (0, 0)
+
+
+def test_blob_shared_by_two_sessions_survives_until_both_are_deleted(client, make_user):
+    user = make_user('owner@example.com')
+    login(client, user)
+    first, second = upload(client), upload(client, filename='copy.txt')
+    assert blob_store.stats()['referenced_bytes'] == 2 * len(DOCUMENT)
+
+    client.delete(f'/delete-chat-session/{first}')
+    assert blob_exists()
+    client.delete(f'/delete-chat-session/{second}')
+    assert not blob_exists()
+
+
+def test_reap_removes_blobs_of_sessions_deleted_elsewhere(client, make_user):
+    user = make_user('owner@example.com')
+    login(client, user)
+    session_id = upload(client)
+    # The row is gone but its upload directory was left behind (e.g. deleted with SQL)
+    with app.app_context():
+        app_module.delete_chat_session_rows(db.session.get(ChatSession, session_id))
+        db.session.commit()
+        live_ids = [session.id for session in ChatSession.query]
+
+    blobs, freed = blob_store.reap(live_ids)
+
+    assert (blobs, freed) == (1, len(DOCUMENT))
+    assert not blob_exists()
+
+
+def test_upload_stores_the_full_text_and_returns_its_start(client, make_user):
+    login(client, make_user('owner@example.com'))
+    response = client.post('/upload-file', data={'file': (io.BytesIO(DOCUMENT), 'notes.txt')}, content_type='multipart/form-data')
+
+    data = response.get_json()
+    assert data['summary'] == DOCUMENT.decode()[:UPLOAD_PREVIEW_CHARS]
+    with app.app_context():
+        assert FileSummary.query.filter_by(session_id=data['session_id']).one().summary == DOCUMENT.decode()
@@ -0,0 +1,93 @@
+import multiprocessing
+import time
+
+import numpy as np
+
+import vector_index as vector_index_module
+from vector_index import VectorIndex
+
+DIM = 8
+
+
+def append_rows(directory, first_id, rows, start):
+    index = VectorIndex(directory, DIM)
+    vectors = np.random.default_rng(first_id).normal(size=(rows, DIM))
+    start.wait()
+    for row in range(rows):
+        index.add([first_id + row], vectors[row])
+
+
+def test_appends_from_several_processes_keep_ids_and_vectors_paired(tmp_path):
+    VectorIndex(str(tmp_path), DIM)
+    context = multiprocessing.get_context('spawn')
+    start = context.Barrier(4)
+    processes = [context.Process(target=append_rows, args=(str(tmp_path), worker * 100000, 500, start)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    index = VectorIndex(str(tmp_path), DIM)
+    assert len(index) == 4 * 500
+    # Every row holds the vector that was added with its id
+    expected = {}
+    for worker in range(4):
+        vectors = VectorIndex._normalize(np.random.default_rng(worker * 100000).normal(size=(500, DIM)))
+        expected.update(zip(range(worker * 100000, worker * 100000 + 500), vectors))
+    mismatched = [row for row, row_id in enumerate(index.ids) if not np.allclose(index.vectors[row], expected[int(row_id)])]
+    assert mismatched == []
+
+
+def wait_for_training(index, timeout=10):
+    deadline = time.time() + timeout
+    while index.training and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_ivf_is_trained_in_the_background_and_dropped_on_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index_module, 'IVF_MIN_ROWS', 200)
+    index = VectorIndex(str(tmp_path), DIM)
+    rng = np.random.default_rng(0)
+    index.add(list(range(300)), rng.normal(size=(300, DIM)))
+    wait_for_training(index)
+    assert index.centroids is not None
+    assert len(index.assignments) == 300
+
+    # Compaction renumbers the rows, so the trained layer is discarded and trained again
+    index.delete(range(200))
+    wait_for_training(index)
+    assert len(index.ids) == 100
+    assert index.centroids is None
+
+
+def test_an_append_cut_short_is_truncated_before_the_next_one(tmp_path):
+    index = VectorIndex(str(tmp_path), DIM)
+    rng = np.random.default_rng(0)
+    index.add([1, 2], rng.normal(size=(2, DIM)))
+    # A crash after writing the vectors of an append, before its ids
+    with open(index.vectors_path, 'ab') as f:
+        f.write(np.ones((3, DIM), dtype=np.float32).tobytes()[:-5])
+
+    reopened = VectorIndex(str(tmp_path), DIM)
+    assert len(reopened) == 2
+    # ... and another one while the index is open
+    with open(index.vectors_path, 'ab') as f:
+        f.write(np.ones(DIM, dtype=np.float32).tobytes())
+    vector = rng.normal(size=DIM)
+    reopened.add([3], vector)
+
+    assert list(reopened.ids) == [1, 2, 3]
+    assert np.allclose(reopened.vectors[2], VectorIndex._normalize(vector)[0])
+
+
+def test_a_compaction_by_another_process_is_seen_at_the_same_size(tmp_path):
+    reader, writer = VectorIndex(str(tmp_path), DIM), VectorIndex(str(tmp_path), DIM)
+    rng = np.random.default_rng(0)
+    writer.add(list(range(10)), rng.normal(size=(10, DIM)))
+    assert len(reader) == 10
+
+    # Compacted to 5 rows, then back to 10: the ids file has its old size but is a new file
+    writer.delete(range(5))
+    writer.add(list(range(100, 105)), rng.normal(size=(5, DIM)))
+
+    assert sorted(int(row_id) for row_id, _ in reader.search(rng.normal(size=DIM), top_k=10)[0]) == [5, 6, 7, 8, 9, 100, 101, 102, 103, 104]
@@ -0,0 +1,60 @@
+import pytest
+
+import project as app_module
+from project import app, db, YouTubeVideo
+from transcript_segments import TranscriptSegments
+
+VIDEO_ID = 'abcdefghijk'
+SEGMENTS = TranscriptSegments([0, 5000], [5000, 5000], ['Welcome to the lecture.', 'Today: gradient descent.'])
+
+
+@pytest.fixture
+def youtube(monkeypatch):
+    calls = {'metadata': 0}
+    state = {'metadata_fails': True}
+
+    def fetch_video_metadata(video_id):
+        calls['metadata'] += 1
+        if state['metadata_fails']:
+            raise TimeoutError('timed out')
+        return 'Gradient descent', 'A lecture on optimisation'
+    monkeypatch.setattr(app_module, 'fetch_video_metadata', fetch_video_metadata)
+    monkeypatch.setattr(app_module, 'fetch_transcript', lambda video_id: SEGMENTS)
+    return calls, state
+
+
+def stored_video():
+    with app.app_context():
+        video = YouTubeVideo.query.filter_by(video_id=VIDEO_ID).one()
+        return video.title, video.metadata_pending
+
+
+def test_placeholder_metadata_is_fetched_again(youtube):
+    calls, state = youtube
+    with app.app_context():
+        title, _, transcript = app_module.ingest_video(VIDEO_ID)
+    # The transcript is stored; the placeholder title is served but flagged, not cached
+    assert title == f'YouTube video {VIDEO_ID}'
+    assert transcript == SEGMENTS.text
+    assert stored_video() == (title, True)
+
+    state['metadata_fails'] = False
+    with app.app_context():
+        title, description, _ = app_module.ingest_video(VIDEO_ID)
+    assert (title, description) == ('Gradient descent', 'A lecture on optimisation')
+    assert stored_video() == ('Gradient descent', False)
+
+    # Complete rows are cached and not fetched again
+    with app.app_context():
+        app_module.ingest_video(VIDEO_ID)
+    assert calls['metadata'] == 2
+
+
+def test_placeholder_is_kept_while_metadata_keeps_failing(youtube):
+    calls, _ = youtube
+    with app.app_context():
+        app_module.ingest_video(VIDEO_ID)
+        app_module.ingest_video(VIDEO_ID)
+
+    assert stored_video() == (f'YouTube video {VIDEO_ID}', True)
+    assert calls['metadata'] == 2
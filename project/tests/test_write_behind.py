@@ -0,0 +1,29 @@
+import os
+import signal
+
+from write_behind import WriteBehindQueue, flush_on_shutdown
+
+
+def test_sigterm_during_a_flush_writes_the_rest_and_exits(monkeypatch):
+    monkeypatch.setattr('atexit.register', lambda function: None)
+    batches, terminated = [], []
+
+    def flush(rows):
+        batches.append(rows)
+        if len(batches) == 1:
+            queue.add('added during the flush')
+            # Delivered on this (main) thread while it holds the flush lock
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: terminated.append(signum))
+    try:
+        queue = WriteBehindQueue(flush, max_batch=1000, max_delay=60)
+        flush_on_shutdown(queue)
+        queue.add('first')
+        queue.flush()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    assert batches == [['first'], ['added during the flush']]
+    assert terminated == [signal.SIGTERM]
+    assert queue.closed
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def format_timestamp(ms):
+    seconds = int(ms) // 1000
+    hours, minutes, seconds = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+# Timestamped transcript held as parallel arrays instead of one Python object per segment:
+# int32 start/duration in milliseconds, the segment texts joined by single spaces into one
+# string (so `text` is the full transcript), and int64 offsets of each segment in that string.
+# `word_starts` is the index of each segment's first word, which maps retrieval chunks
+# (fixed word windows over the transcript) back to a time.
+class TranscriptSegments:
+    __slots__ = ('start_ms', 'duration_ms', 'offsets', 'word_starts', 'text')
+
+    def __init__(self, start_ms, duration_ms, texts):
+        texts = [' '.join(text.split()) for text in texts]
+        self.start_ms = np.asarray(start_ms, dtype=np.int32)
+        self.duration_ms = np.asarray(duration_ms, dtype=np.int32)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        # Each segment is followed by one joining space (one past the end for the last segment)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths + 1)))
+        word_counts = np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=len(texts))
+        self.word_starts = np.concatenate(([0], np.cumsum(word_counts)[:-1])) if len(texts) else np.zeros(0, np.int64)
+        self.text = ' '.join(texts)
+
+    # From YouTubeTranscriptApi items: {'text', 'start', 'duration'} with times in seconds
+    @classmethod
+    def from_api(cls, items):
+        return cls(
+            [round(item['start'] * 1000) for item in items],
+            [round(item.get('duration', 0) * 1000) for item in items],
+            [item['text'] for item in items]
+        )
+
+    # From (start_ms, duration_ms, text) rows, ordered by start
+    @classmethod
+    def from_rows(cls, rows):
+        rows = list(rows)
+        return cls([row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows])
+
+    def __len__(self):
+        return len(self.start_ms)
+
+    def segment_text(self, index):
+        return self.text[self.offsets[index]:self.offsets[index + 1] - 1]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield int(self.start_ms[index]), int(self.duration_ms[index]), self.segment_text(index)
+
+    @property
+    def nbytes(self):
+        return (self.start_ms.nbytes + self.duration_ms.nbytes + self.offsets.nbytes
+                + self.word_starts.nbytes + len(self.text.encode('utf-8')))
+
+    # Index range of the segments overlapping [start_ms, end_ms). Starts are sorted, but
+    # caption segments can overlap, so ends are not and are checked with a mask instead.
+    def window_indexes(self, start_ms, end_ms):
+        last = int(np.searchsorted(self.start_ms, end_ms, side='left'))
+        overlapping = np.flatnonzero(self.start_ms[:last].astype(np.int64) + self.duration_ms[:last] > start_ms)
+        return (int(overlapping[0]), last) if len(overlapping) else (last, last)
+
+    def window(self, start_ms, end_ms):
+        first, last = self.window_indexes(start_ms, end_ms)
+        return TranscriptSegments(
+            self.start_ms[first:last], self.duration_ms[first:last],
+            [self.segment_text(index) for index in range(first, last)]
+        )
+
+    # Start time of the segment containing the given word of the transcript
+    def start_ms_at_word(self, word_index):
+        if not len(self):
+            return 0
+        return int(self.start_ms[max(int(np.searchsorted(self.word_starts, word_index, side='right')) - 1, 0)])
+
+    def to_dicts(self):
+        return [{'start_ms': start, 'duration_ms': duration, 'text': text} for start, duration, text in self]
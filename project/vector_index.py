@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; only in-process locking is used there
+    fcntl = None
+
+# Build the IVF (coarse quantizer) layer once the index holds this many live rows. Training runs
+# in a background thread (or with train_ivf(), e.g. from a CLI command); until it finishes,
+# searches are brute force.
+IVF_MIN_ROWS = 20000
+IVF_PROBES = 8
+IVF_TRAIN_ITERATIONS = 10
+# Compact the files once this fraction of rows has been deleted
+COMPACT_RATIO = 0.25
+
+
+# On-disk vector index: a memory-mapped float32 matrix (one normalized row per vector)
+# plus an int64 id map. Appends write to the end of both files, deletes are tombstones
+# (id set to -1) that are reclaimed by compact(). Writes hold a file lock, so worker processes
+# sharing the index never interleave their appends. The ids file is the source of truth for
+# the row count: vectors past it (from an append cut short by a crash) are truncated away.
+class VectorIndex:
+    def __init__(self, directory, dim, name='chunks'):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, f'{name}.f32')
+        self.ids_path = os.path.join(directory, f'{name}.ids')
+        self.meta_path = os.path.join(directory, f'{name}.json')
+        self.ivf_path = os.path.join(directory, f'{name}.ivf.npz')
+        self.lock_path = os.path.join(directory, f'{name}.lock')
+        self.lock = threading.Lock()
+        self.training = False
+        self.loaded_state = None
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.centroids = None
+        self.assignments = None
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                stored_dim = json.load(f)['dim']
+            if stored_dim != dim:
+                raise ValueError(f"Vector index at {directory} has dimension {stored_dim}, expected {dim}.")
+        else:
+            with open(self.meta_path, 'w') as f:
+                json.dump({'dim': dim}, f)
+            open(self.vectors_path, 'ab').close()
+            open(self.ids_path, 'ab').close()
+        with self._locked():
+            self._reconcile()
+
+    # The thread lock plus, across processes, an exclusive lock on the sidecar lock file
+    @contextmanager
+    def _locked(self):
+        with self.lock, open(self.lock_path, 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    # Cut both files back to the rows written completely to both. Caller holds the lock.
+    def _reconcile(self):
+        rows = min(os.path.getsize(self.ids_path) // 8, os.path.getsize(self.vectors_path) // (4 * self.dim))
+        for path, size in ((self.ids_path, rows * 8), (self.vectors_path, rows * 4 * self.dim)):
+            if os.path.getsize(path) != size:
+                logging.warning(f"Truncating {path} to {rows} rows after an incomplete append")
+                os.truncate(path, size)
+
+    def __len__(self):
+        self._refresh()
+        return int(np.count_nonzero(self.ids >= 0))
+
+    # Re-map the files if another process (or this one) has appended to or compacted them.
+    # Compaction replaces the files, so it shows as a new inode even when the size is unchanged.
+    def _refresh(self):
+        ids_stat, vectors_stat = os.stat(self.ids_path), os.stat(self.vectors_path)
+        state = (ids_stat.st_size, ids_stat.st_ino, vectors_stat.st_ino)
+        if state == self.loaded_state:
+            return
+        rows = min(ids_stat.st_size // 8, vectors_stat.st_size // (4 * self.dim))
+        if rows:
+            self.ids = np.memmap(self.ids_path, dtype=np.int64, mode='r', shape=(rows,))
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        else:
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self.loaded_state = state
+        self._load_ivf()
+
+    def _load_ivf(self):
+        self.centroids = None
+        self.assignments = None
+        if not os.path.exists(self.ivf_path):
+            return
+        data = np.load(self.ivf_path)
+        assignments = data['assignments']
+        # Trained before the files were compacted: its row numbers no longer match
+        if ('ids_inode' in data.files and int(data['ids_inode']) != os.stat(self.ids_path).st_ino) or len(assignments) > len(self.ids):
+            return
+        # Rows appended since training are assigned to their nearest centroid on load
+        if len(assignments) < len(self.ids):
+            extra = np.argmax(self.vectors[len(assignments):] @ data['centroids'].T, axis=1)
+            assignments = np.concatenate([assignments, extra])
+        self.centroids = data['centroids']
+        self.assignments = assignments
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    # Append vectors for the given ids
+    def add(self, ids, vectors):
+        vectors = self._normalize(vectors)
+        ids = np.asarray(ids, dtype=np.int64)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected {len(ids)} vectors of dimension {self.dim}, got {vectors.shape}.")
+
+        with self._locked():
+            self._reconcile()
+            # Vectors first: a reader only sees rows once their id has been written
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self.ids_path, 'ab') as f:
+                f.write(ids.tobytes())
+            self._refresh()
+        self._train_when_needed()
+
+    # Tombstone the rows for the given ids
+    def delete(self, ids):
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not len(ids):
+            return
+        with self._locked():
+            self._refresh()
+            rows = np.flatnonzero(np.isin(self.ids, ids))
+            if not len(rows):
+                return
+            writable = np.memmap(self.ids_path, dtype=np.int64, mode='r+', shape=self.ids.shape)
+            writable[rows] = -1
+            writable.flush()
+            del writable
+            if np.count_nonzero(self.ids < 0) > COMPACT_RATIO * len(self.ids):
+                self._compact()
+        self._train_when_needed()
+
+    # Rewrite both files without deleted rows. Caller holds the lock.
+    def _compact(self):
+        live = np.flatnonzero(self.ids >= 0)
+        vectors = np.array(self.vectors[live])
+        ids = np.array(self.ids[live])
+        for path, data in ((self.vectors_path, vectors), (self.ids_path, ids)):
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data.tobytes())
+            os.replace(path + '.tmp', path)
+        if os.path.exists(self.ivf_path):
+            os.remove(self.ivf_path)
+        self.loaded_state = None
+        self._refresh()
+
+    # Start training in the background once the index is large enough and has no IVF layer yet
+    def _train_when_needed(self):
+        with self.lock:
+            if self.training or self.centroids is not None or np.count_nonzero(self.ids >= 0) < IVF_MIN_ROWS:
+                return
+            self.training = True
+        threading.Thread(target=self._train_in_background, name='vector-index-train', daemon=True).start()
+
+    def _train_in_background(self):
+        try:
+            self.train_ivf()
+        except Exception as e:
+            logging.error(f"Training the IVF layer of {self.ids_path} failed: {e}")
+        finally:
+            self.training = False
+
+    # Train the coarse quantizer with a few rounds of spherical k-means, on a snapshot of the
+    # rows so adds and searches go on meanwhile. Returns False when the files were compacted
+    # before training finished; the result is then dropped.
+    def train_ivf(self):
+        with self.lock:
+            self._refresh()
+            ids, vectors = self.ids, self.vectors
+            ids_inode = os.stat(self.ids_path).st_ino
+        live = np.flatnonzero(ids >= 0)
+        if not len(live):
+            return False
+        num_lists = max(int(np.sqrt(len(live))), 1)
+        rng = np.random.default_rng(0)
+        sample = np.array(vectors[rng.choice(live, size=min(len(live), num_lists * 50), replace=False)])
+        centroids = sample[rng.choice(len(sample), size=num_lists, replace=False)]
+
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=num_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = self._normalize(sums)
+
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        with self._locked():
+            if os.stat(self.ids_path).st_ino != ids_inode:
+                return False
+            with open(self.ivf_path + '.tmp', 'wb') as f:
+                np.savez(f, centroids=centroids, assignments=assignments, ids_inode=ids_inode)
+            os.replace(self.ivf_path + '.tmp', self.ivf_path)
+            self._load_ivf()
+        return True
+
+    # Return the top_k (id, score) pairs for each query vector.
+    # allowed_ids restricts the search to those ids (e.g. the chunks of one document).
+    def search(self, queries, top_k=5, allowed_ids=None, probes=IVF_PROBES):
+        queries = self._normalize(queries)
+        with self.lock:
+            self._refresh()
+            ids, vectors, assignments, centroids = self.ids, self.vectors, self.assignments, self.centroids
+
+        if allowed_ids is not None:
+            candidates = np.flatnonzero(np.isin(ids, np.asarray(list(allowed_ids), dtype=np.int64)))
+            return [self._top_k(ids, vectors, candidates, query, top_k) for query in queries]
+
+        live = ids >= 0
+        if centroids is None:
+            # Brute force: one matrix product for the whole batch of queries
+            candidates = np.flatnonzero(live)
+            scores = queries @ vectors[candidates].T
+            return [self._best(ids[candidates], row, top_k) for row in scores]
+
+        results = []
+        nearest_lists = np.argsort(-(queries @ centroids.T), axis=1)[:, :probes]
+        for query, lists in zip(queries, nearest_lists):
+            candidates = np.flatnonzero(np.isin(assignments, lists) & live)
+            results.append(self._top_k(ids, vectors, candidates, query, top_k))
+        return results
+
+    def _top_k(self, ids, vectors, candidates, query, top_k):
+        candidates = candidates[ids[candidates] >= 0]
+        return self._best(ids[candidates], vectors[candidates] @ query, top_k)
+
+    @staticmethod
+    def _best(ids, scores, top_k):
+        if not len(ids):
+            return []
+        top_k = min(top_k, len(ids))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(ids[i]), float(scores[i])) for i in best]
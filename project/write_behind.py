@@ -0,0 +1,118 @@
+import atexit
+import logging
+import signal
+import threading
+import time
+
+# Default batching limits: flush once this many rows are pending or the oldest has waited this long
+MAX_BATCH = 200
+MAX_DELAY_SECONDS = 0.2
+FLUSH_RETRIES = 3
+
+
+# Write-behind buffer: callers add rows and return immediately; a background thread hands them
+# to flush(rows) in batches, so many rows share one transaction (and one fsync) instead of one
+# commit each. A batch that fails is retried; after FLUSH_RETRIES failures it is logged and dropped.
+class WriteBehindQueue:
+    def __init__(self, flush, max_batch=MAX_BATCH, max_delay=MAX_DELAY_SECONDS, name='write-behind'):
+        self.flush_rows = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.name = name
+        self.pending = []
+        self.oldest = None
+        self.condition = threading.Condition()
+        # One batch is written at a time. Reentrant: the SIGTERM handler flushes on the main thread,
+        # possibly while that thread is already inside flush()
+        self.flush_lock = threading.RLock()
+        self.closed = False
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+        self.failed_rows = 0
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def add(self, row):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError(f"{self.name} queue is closed")
+            if not self.pending:
+                # Wake the worker to start the max_delay timer
+                self.oldest = time.monotonic()
+                self.condition.notify()
+            self.pending.append(row)
+            if len(self.pending) >= self.max_batch:
+                self.condition.notify()
+
+    def _take(self):
+        rows, self.pending, self.oldest = self.pending, [], None
+        return rows
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.pending or (
+                        len(self.pending) < self.max_batch and time.monotonic() - self.oldest < self.max_delay)):
+                    timeout = None if not self.pending else self.max_delay - (time.monotonic() - self.oldest)
+                    self.condition.wait(timeout)
+                if self.closed:
+                    return
+            self.flush()
+
+    def _write(self, rows):
+        for attempt in range(FLUSH_RETRIES):
+            try:
+                self.flush_rows(rows)
+                self.flushed_rows += len(rows)
+                self.flushed_batches += 1
+                return
+            except Exception as e:
+                logging.warning(f"{self.name}: flushing {len(rows)} rows failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.1 * 2 ** attempt)
+        self.failed_rows += len(rows)
+        logging.error(f"{self.name}: dropped {len(rows)} rows after {FLUSH_RETRIES} failed flushes")
+
+    # Write everything pending now (e.g. before reading the rows back). Rows are taken and
+    # written under one lock, so batches reach the database in the order they were added.
+    def flush(self):
+        with self.flush_lock:
+            with self.condition:
+                rows = self._take()
+            if rows:
+                self._write(rows)
+
+    # Stop the worker and write what is left; further add() calls fail
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        self._worker.join()
+        self.flush()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'flushed_rows': self.flushed_rows,
+            'flushed_batches': self.flushed_batches,
+            'failed_rows': self.failed_rows,
+        }
+
+
+# Flush the queue at interpreter exit and on SIGTERM (before any previously installed handler runs)
+def flush_on_shutdown(queue):
+    atexit.register(queue.close)
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(signum, frame):
+        queue.close()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; only in-process locking is used there
+    fcntl = None
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join("output", "audio_cache"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+# Entries used more recently than this are never evicted, since a request may still be reading them.
+# This makes the size cap soft: it is exceeded by at most the audio used within this window.
+EVICT_MIN_AGE_SECONDS = 3600
+
+
+# Downloaded/transcoded audio keyed by (video id, format). A miss runs produce(work_dir) in a
+# private working directory and renames its result into the cache, so readers never see a
+# partial file. A per-key lock (thread lock plus a file lock across worker processes) makes
+# concurrent requests for the same video wait for one download instead of repeating it.
+# The directory is kept under max_bytes by evicting the least recently used files, except
+# those used within EVICT_MIN_AGE_SECONDS (so max_bytes is a soft cap).
+class AudioCache:
+    def __init__(self, directory=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.work_root = os.path.join(directory, "tmp")
+        self.locks = {}  # key -> [lock, number of requests holding or waiting for it]
+        self.locks_lock = threading.Lock()
+        os.makedirs(self.work_root, exist_ok=True)
+
+    @staticmethod
+    def key(video_id, audio_format):
+        return hashlib.sha256(f"{video_id}:{audio_format}".encode("utf-8")).hexdigest()
+
+    def path(self, video_id, audio_format, extension):
+        return os.path.join(self.directory, self.key(video_id, audio_format) + extension)
+
+    # The per-key thread lock, dropped once no request holds or waits for it
+    @contextmanager
+    def _thread_lock(self, key):
+        with self.locks_lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
+
+    def get(self, video_id, audio_format, extension):
+        path = self.path(video_id, audio_format, extension)
+        try:
+            os.utime(path)  # mtime is the LRU clock
+            return path
+        except FileNotFoundError:
+            return None
+
+    def get_or_create(self, video_id, audio_format, extension, produce):
+        cached = self.get(video_id, audio_format, extension)
+        if cached:
+            logging.info(f"Audio cache hit for {video_id} ({audio_format})")
+            return cached
+
+        key = self.key(video_id, audio_format)
+        with self._thread_lock(key), open(os.path.join(self.directory, key + ".lock"), "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Another request may have finished the download while we waited
+            cached = self.get(video_id, audio_format, extension)
+            if cached:
+                return cached
+
+            path = self.path(video_id, audio_format, extension)
+            work_dir = tempfile.mkdtemp(prefix=f"{key[:12]}-", dir=self.work_root)
+            try:
+                os.replace(produce(work_dir), path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        logging.info(f"Cached audio for {video_id} ({audio_format}): {os.path.getsize(path)} bytes")
+        self.evict(keep=path)
+        return path
+
+    # Remove least recently used files until the cache fits in max_bytes
+    def evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".lock") or not os.path.isfile(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # Evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - EVICT_MIN_AGE_SECONDS
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep or mtime > cutoff:
+                continue
+            try:
+                # Lock files are left in place: another process may be waiting on them
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            logging.info(f"Evicted {path} from the audio cache")
+        if total > self.max_bytes:
+            logging.info(f"Audio cache holds {total} bytes, over its {self.max_bytes} byte cap, in recently used files")
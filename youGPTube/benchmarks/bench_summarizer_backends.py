@@ -0,0 +1,109 @@
+# Benchmark: local summarization backends on CPU.
+# Runs the same fixed transcripts through each backend and reports throughput, plus ROUGE-1 /
+# ROUGE-L F1 of each backend's summaries against the fp32 pipeline (drift from quantization).
+#
+# Run from the youGPTube directory:
+#   python benchmarks/bench_summarizer_backends.py [--backends fp32 torch-int8 onnx-int8] [--transcripts DIR]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_server import BACKENDS, SUMMARIZATION_MODEL, load_pipeline
+from summarization import chunk_text_by_tokens
+
+# Fixed lecture-style transcripts used when no directory is given
+TRANSCRIPTS = [
+    "Today we are going to talk about how neural networks learn. A network is made of layers of simple units. "
+    "Each unit takes a weighted sum of its inputs and passes it through a nonlinearity. During training we show "
+    "the network an example, compare its output to the correct answer, and measure the error with a loss function. "
+    "Backpropagation tells us how much each weight contributed to that error, and gradient descent nudges every "
+    "weight a little in the direction that reduces it. Repeating this over millions of examples slowly shapes the "
+    "weights into something useful. The learning rate controls the size of each step: too large and training "
+    "diverges, too small and it takes forever. Modern optimizers such as Adam adapt the step size for each weight.",
+    "In this video I will show you how to make sourdough bread at home. First you need an active starter, which is "
+    "just flour and water that has been fermented by wild yeast and bacteria. Feed it the night before so that it is "
+    "bubbly in the morning. Mix the starter with flour, water and salt, then let the dough rest for thirty minutes. "
+    "Over the next few hours perform a series of stretch and folds to build strength in the gluten. Once the dough "
+    "has grown by about half, shape it into a tight ball and place it in a floured basket. Proof it overnight in the "
+    "fridge, then bake it in a very hot Dutch oven, first with the lid on and then with the lid off to brown the crust.",
+    "The French Revolution began in 1789 when a financial crisis forced King Louis the Sixteenth to call the Estates "
+    "General for the first time in more than a century. The Third Estate, representing commoners, declared itself a "
+    "National Assembly and swore not to disband until France had a constitution. In July, crowds in Paris stormed the "
+    "Bastille, a symbol of royal authority. Over the following years feudal privileges were abolished, the Declaration "
+    "of the Rights of Man was adopted, and the monarchy was eventually overthrown. The revolution then turned violent "
+    "during the Terror, before Napoleon Bonaparte seized power in 1799 and ended the revolutionary decade.",
+]
+
+
+def load_transcripts(directory):
+    if not directory:
+        return TRANSCRIPTS
+    transcripts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.txt'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                transcripts.append(f.read())
+    return transcripts
+
+
+def lcs_length(a, b):
+    previous = [0] * (len(b) + 1)
+    for token_a in a:
+        current = [0]
+        for j, token_b in enumerate(b):
+            current.append(previous[j] + 1 if token_a == token_b else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def f1(overlap, candidate_length, reference_length):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate_length, overlap / reference_length
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge(candidate, reference):
+    candidate, reference = candidate.lower().split(), reference.lower().split()
+    unigram_overlap = sum(min(candidate.count(word), reference.count(word)) for word in set(candidate))
+    return (
+        f1(unigram_overlap, len(candidate), len(reference)),
+        f1(lcs_length(candidate, reference), len(candidate), len(reference)),
+    )
+
+
+def run_backend(backend, chunks, batch_size):
+    summarizer = load_pipeline(SUMMARIZATION_MODEL, backend)
+    # Warm-up run so one-off initialization is not timed
+    summarizer(chunks[:1], max_length=150, min_length=50, do_sample=False)
+
+    started = time.perf_counter()
+    outputs = summarizer(chunks, max_length=150, min_length=50, do_sample=False, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    return [output['summary_text'] for output in outputs], elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--transcripts', help='Directory of .txt transcripts (defaults to a built-in set)')
+    parser.add_argument('--batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    chunks = [chunk for transcript in load_transcripts(args.transcripts) for chunk in chunk_text_by_tokens(transcript, 700)]
+    backends = ['fp32'] + [backend for backend in args.backends if backend != 'fp32']
+
+    reference = None
+    print(f"{len(chunks)} chunks, batch size {args.batch_size}")
+    print(f"{'backend':<12}{'seconds':>10}{'chunks/s':>10}{'speedup':>10}{'ROUGE-1':>10}{'ROUGE-L':>10}")
+    for backend in backends:
+        summaries, elapsed = run_backend(backend, chunks, args.batch_size)
+        if reference is None:
+            reference, reference_elapsed = summaries, elapsed
+        scores = [rouge(summary, expected) for summary, expected in zip(summaries, reference)]
+        rouge_1 = sum(score[0] for score in scores) / len(scores)
+        rouge_l = sum(score[1] for score in scores) / len(scores)
+        print(f"{backend:<12}{elapsed:>10.2f}{len(chunks) / elapsed:>10.2f}{reference_elapsed / elapsed:>9.2f}x{rouge_1:>10.3f}{rouge_l:>10.3f}")
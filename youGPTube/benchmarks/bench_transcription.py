@@ -0,0 +1,53 @@
+# Benchmark: sequential vs. parallel segment transcription.
+# Uses a stubbed transcriber (fixed latency per segment, occasional transient failures) so it
+# runs offline and measures only the scheduling, retry and reassembly overhead.
+#
+# Run from the youGPTube directory:
+#   python benchmarks/bench_transcription.py [--segments 24] [--latency 0.5] [--failure-rate 0.1]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcription import transcribe_segments
+
+
+def stub_transcriber(latency, failure_rate):
+    def transcribe(audio_file):
+        time.sleep(latency * random.uniform(0.8, 1.2))
+        if random.random() < failure_rate:
+            raise ConnectionError("stubbed transient API error")
+        return f"text of {audio_file}"
+    return transcribe
+
+
+def run(segments, transcribe, workers):
+    started = time.perf_counter()
+    transcripts = transcribe_segments(segments, transcribe=transcribe, max_workers=workers, backoff=0.05)
+    elapsed = time.perf_counter() - started
+    assert [t["timestamp"] for t in transcripts] == sorted(start for _, start in segments)
+    return elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segments', type=int, default=24)
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds per stubbed API call')
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    random.seed(0)
+    segments = [(f"segment_{i:03d}.webm", i * 600) for i in range(args.segments)]
+    transcribe = stub_transcriber(args.latency, args.failure_rate)
+
+    print(f"{args.segments} segments, {args.latency}s per call, {args.failure_rate:.0%} transient failures")
+    print(f"{'workers':<10}{'seconds':>10}{'speedup':>10}")
+    baseline = None
+    for workers in args.workers:
+        elapsed = run(segments, transcribe, workers)
+        baseline = baseline or elapsed
+        print(f"{workers:<10}{elapsed:>10.2f}{baseline / elapsed:>9.2f}x")
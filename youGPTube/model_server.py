@@ -0,0 +1,204 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+SUMMARIZATION_MODEL = "facebook/bart-large-cnn"
+BATCH_SIZE = int(os.getenv("SUMMARIZER_BATCH_SIZE", 8))
+MAX_WAIT_SECONDS = float(os.getenv("SUMMARIZER_MAX_WAIT_MS", 50)) / 1000
+STATS_HISTORY = 100
+
+# Inference backend: "fp32" (plain transformers), "torch-int8" (torch dynamic quantization)
+# or "onnx-int8" (ONNX Runtime export with dynamic int8 quantization, needs optimum[onnxruntime])
+BACKEND = os.getenv("SUMMARIZER_BACKEND", "fp32")
+BACKENDS = ("fp32", "torch-int8", "onnx-int8")
+# Exported/quantized ONNX models are kept here so the export runs only once
+ONNX_MODEL_DIR = os.getenv("SUMMARIZER_ONNX_DIR", os.path.join("models", "onnx"))
+ONNX_COMPONENTS = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+
+def load_pipeline(model_name, backend=BACKEND):
+    from transformers import AutoTokenizer, pipeline
+
+    if backend == "fp32":
+        return pipeline("summarization", model=model_name)
+
+    if backend == "torch-int8":
+        import torch
+        from transformers import AutoModelForSeq2SeqLM
+
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        # Linear layers get int8 weights; activations are quantized on the fly
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+    if backend == "onnx-int8":
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        quantized_dir = export_quantized_onnx(model_name)
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            quantized_dir,
+            encoder_file_name="encoder_model_quantized.onnx",
+            decoder_file_name="decoder_model_quantized.onnx",
+            decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+        )
+        return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(quantized_dir))
+
+    raise ValueError(f"Unknown summarizer backend {backend!r}; expected one of {', '.join(BACKENDS)}.")
+
+
+# Export the model to ONNX and quantize each component with dynamic int8 quantization.
+# Returns the directory of the quantized model; existing exports are reused.
+def export_quantized_onnx(model_name, output_dir=ONNX_MODEL_DIR):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoConfig, AutoTokenizer
+
+    model_dir = os.path.join(output_dir, model_name.replace("/", "--"))
+    export_dir = os.path.join(model_dir, "fp32")
+    quantized_dir = os.path.join(model_dir, "int8")
+    if os.path.exists(os.path.join(quantized_dir, "decoder_with_past_model_quantized.onnx")):
+        return quantized_dir
+
+    logging.info(f"Exporting {model_name} to ONNX in {export_dir}")
+    ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+    quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for component in ONNX_COMPONENTS:
+        quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=f"{component}.onnx")
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=quantization_config)
+    # The tokenizer and model config are needed to load the quantized components
+    AutoTokenizer.from_pretrained(export_dir).save_pretrained(quantized_dir)
+    AutoConfig.from_pretrained(export_dir).save_pretrained(quantized_dir)
+    return quantized_dir
+
+
+# Process-wide summarization model server. The pipeline is loaded once, on first use, and a
+# single worker thread runs it: chunks submitted by concurrent requests are collected for up to
+# max_wait seconds (or until batch_size is reached) and summarized in one batched call.
+class BatchingSummarizer:
+    def __init__(self, model_name=SUMMARIZATION_MODEL, batch_size=BATCH_SIZE, max_wait=MAX_WAIT_SECONDS, backend=BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown summarizer backend {backend!r}; expected one of {', '.join(BACKENDS)}.")
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.batch_stats = deque(maxlen=STATS_HISTORY)
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+        self._worker = None
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            with self._load_lock:
+                if self._pipeline is None:
+                    started = time.perf_counter()
+                    self._pipeline = load_pipeline(self.model_name, self.backend)
+                    logging.info(f"Loaded {self.model_name} ({self.backend}) in {time.perf_counter() - started:.1f}s")
+        return self._pipeline
+
+    @property
+    def tokenizer(self):
+        return self.pipeline.tokenizer
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._load_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='summarizer-batcher', daemon=True)
+                    self._worker.start()
+
+    # Summarize texts; blocks until all of them are done. Safe to call from many threads.
+    def summarize(self, texts, max_length=150, min_length=50):
+        self._ensure_worker()
+        futures = []
+        for text in texts:
+            future = Future()
+            self.requests.put((text, (max_length, min_length), future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    # Collect one batch: block for the first item, then wait up to max_wait for more
+    def _next_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Only items with the same generation settings can share a pipeline call
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for (max_length, min_length), items in groups.items():
+                self._run_batch(items, max_length, min_length)
+
+    def _run_batch(self, items, max_length, min_length):
+        texts = [text for text, _, _ in items]
+        # thread_time() is this worker thread's CPU time, so it counts this batch only, but not
+        # the model's own intra-op threads; process_time() counts those and every other thread too
+        wall_started, thread_cpu_started, process_cpu_started = time.perf_counter(), time.thread_time(), time.process_time()
+        try:
+            outputs = self.pipeline(texts, max_length=max_length, min_length=min_length, do_sample=False, batch_size=len(texts))
+        except Exception as e:
+            logging.error(f"Summarization batch of {len(texts)} failed: {e}")
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+
+        wall_seconds = time.perf_counter() - wall_started
+        thread_cpu_seconds = time.thread_time() - thread_cpu_started
+        process_cpu_seconds = time.process_time() - process_cpu_started
+        self.batch_stats.append({
+            'batch_size': len(texts),
+            'wall_seconds': round(wall_seconds, 4),
+            'thread_cpu_seconds': round(thread_cpu_seconds, 4),
+            'process_cpu_seconds': round(process_cpu_seconds, 4),
+            'finished_at': time.time(),
+        })
+        logging.info(f"Summarized batch of {len(texts)} in {wall_seconds:.2f}s wall, {thread_cpu_seconds:.2f}s CPU on the "
+                     f"batching thread, {process_cpu_seconds:.2f}s CPU process-wide")
+        for (_, _, future), output in zip(items, outputs):
+            future.set_result(output['summary_text'])
+
+    def stats(self):
+        batches = list(self.batch_stats)
+        return {
+            'model': self.model_name,
+            'backend': self.backend,
+            'loaded': self._pipeline is not None,
+            'queued': self.requests.qsize(),
+            'batch_size': self.batch_size,
+            'max_wait_seconds': self.max_wait,
+            'batches': batches,
+        }
+
+
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+
+# The shared summarizer for this process
+def get_summarizer():
+    global _summarizer
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = BatchingSummarizer()
+    return _summarizer
@@ -0,0 +1,100 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to an estimate
+    tiktoken = None
+
+# Defaults for the map-reduce summarizer
+CHUNK_TOKENS = 2000
+TARGET_TOKENS = 600
+MAX_WORKERS = 8
+MAX_REDUCE_ROUNDS = 5
+
+_encodings = {}
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    if tiktoken is None:
+        # Roughly four characters per token for English text
+        return max(len(text) // 4, 1) if text else 0
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return len(_encodings[model].encode(text))
+
+
+def split_sentences(text):
+    return [sentence for sentence in re.split(r'(?<=[.!?])\s+', text.strip()) if sentence]
+
+
+# Split text into chunks of at most max_tokens, breaking only between sentences.
+# Sentences longer than max_tokens (e.g. unpunctuated auto-captions) are split between words.
+def chunk_text_by_tokens(text, max_tokens=CHUNK_TOKENS, count=count_tokens):
+    pieces = []
+    for sentence in split_sentences(text):
+        if count(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        # Word windows sized from the sentence's average tokens per word
+        words_per_piece = max(int(len(words) * max_tokens / count(sentence) * 0.9), 1)
+        pieces.extend(' '.join(words[i:i + words_per_piece]) for i in range(0, len(words), words_per_piece))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for piece in pieces:
+        piece_tokens = count(piece) + 1  # One more for the joining space
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+# Group consecutive texts so that each group stays within max_tokens
+def group_by_tokens(texts, max_tokens, count=count_tokens):
+    groups = []
+    current, current_tokens = [], 0
+    for text in texts:
+        tokens = count(text) + 1  # One more for the joining separator
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+# Run fn over items with at most max_workers calls in flight; results keep the input order
+def parallel_map(fn, items, max_workers=MAX_WORKERS):
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(fn, items))
+
+
+# Merge summaries hierarchically: groups of summaries that fit in one request are combined
+# in parallel, round after round, until a single summary within target_tokens remains.
+def reduce_summaries(summaries, combine, target_tokens=TARGET_TOKENS, chunk_tokens=CHUNK_TOKENS,
+                     max_workers=MAX_WORKERS, count=count_tokens):
+    done = lambda: len(summaries) == 1 and count(summaries[0]) <= target_tokens
+    for round_number in range(MAX_REDUCE_ROUNDS):
+        if done():
+            break
+        groups = group_by_tokens(summaries, chunk_tokens, count=count)
+        logging.debug(f"Reduce round {round_number + 1}: {len(summaries)} summaries in {len(groups)} groups")
+        summaries = parallel_map(lambda group: combine('\n\n'.join(group)), groups, max_workers)
+    if not done():
+        logging.warning(f"Summary still above {target_tokens} tokens after {MAX_REDUCE_ROUNDS} reduce rounds")
+    return summaries[0] if len(summaries) == 1 else '\n\n'.join(summaries)
+
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The youGPTube modules are imported as top-level modules, as when the app runs from that directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,77 @@
+import io
+import os
+
+import pytest
+
+import youGPTube
+
+
+class FakeFfmpeg:
+    def __init__(self, segment_list, returncode=0, stderr=''):
+        self.stdout = io.StringIO(segment_list)
+        self.stderr = io.StringIO(stderr)
+        self.returncode = None
+        self.final_returncode = returncode
+        self.killed = False
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        self.returncode = self.final_returncode
+        return self.returncode
+
+    def kill(self):
+        self.killed = True
+
+
+def run_ffmpeg(monkeypatch, process):
+    commands = []
+
+    def popen(command, **kwargs):
+        commands.append(command)
+        return process
+
+    monkeypatch.setattr(youGPTube.subprocess, 'Popen', popen)
+    return commands
+
+
+def test_segments_are_read_from_the_segment_list(monkeypatch, tmp_path):
+    commands = run_ffmpeg(monkeypatch, FakeFfmpeg(
+        'segment_000.webm,0.000000,600.020000\n'
+        'segment_001.webm,600.020000,1200.000000\n'
+        'segment_002.webm,1200.000000,1452.500000\n'
+    ))
+
+    segments = list(youGPTube.chunk_audio_fixed('lecture.webm', 600, str(tmp_path)))
+
+    assert segments == [
+        (os.path.join(str(tmp_path), 'segment_000.webm'), 0),
+        (os.path.join(str(tmp_path), 'segment_001.webm'), 600),
+        (os.path.join(str(tmp_path), 'segment_002.webm'), 1200),
+    ]
+    command = commands[0]
+    assert command[command.index('-segment_time') + 1] == '600'
+    assert command[-1] == os.path.join(str(tmp_path), 'segment_%03d.webm')
+
+
+def test_a_segment_name_with_commas_is_kept_whole(monkeypatch, tmp_path):
+    run_ffmpeg(monkeypatch, FakeFfmpeg('part,one.webm,0.000000,10.000000\n'))
+    assert list(youGPTube.chunk_audio_fixed('a.webm', 10, str(tmp_path))) == [(os.path.join(str(tmp_path), 'part,one.webm'), 0)]
+
+
+def test_ffmpeg_failure_is_raised(monkeypatch, tmp_path):
+    run_ffmpeg(monkeypatch, FakeFfmpeg('', returncode=1, stderr='Invalid data found when processing input\n'))
+    with pytest.raises(RuntimeError, match='Invalid data'):
+        list(youGPTube.chunk_audio_fixed('broken.webm', 600, str(tmp_path)))
+
+
+def test_ffmpeg_is_stopped_when_the_caller_stops_early(monkeypatch, tmp_path):
+    process = FakeFfmpeg('segment_000.webm,0.000000,600.000000\nsegment_001.webm,600.000000,1200.000000\n')
+    run_ffmpeg(monkeypatch, process)
+
+    segments = youGPTube.chunk_audio_fixed('lecture.webm', 600, str(tmp_path))
+    next(segments)
+    segments.close()
+
+    assert process.killed
@@ -0,0 +1,20 @@
+import youGPTube
+
+
+def probe_duration(monkeypatch, tmp_path, duration, size):
+    path = tmp_path / 'speech.webm'
+    path.write_bytes(b'\0' * size)
+    monkeypatch.setattr(youGPTube.ffmpeg, 'probe', lambda filename: {'format': {'duration': str(duration)}})
+    return str(path)
+
+
+def test_low_bitrate_audio_keeps_the_default_segment_length(monkeypatch, tmp_path):
+    # One hour of 24 kbps Opus: the 24 MiB budget alone would allow a ~2 h segment
+    path = probe_duration(monkeypatch, tmp_path, 3600, 3600 * 3000)
+    assert youGPTube.segment_length_for_budget(path) == youGPTube.SEGMENT_SECONDS
+
+
+def test_budget_shortens_segments_of_high_bitrate_audio(monkeypatch, tmp_path):
+    # 1 MB/s: 24 MiB with the 10% margin is ~22 s
+    path = probe_duration(monkeypatch, tmp_path, 10, 10 * 1024 * 1024)
+    assert youGPTube.segment_length_for_budget(path) == int(24 * 0.9)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import vad
+
+FRAME = vad.FRAME_SECONDS
+
+
+# Alternating speech and pauses, like a lecture
+def speech_pattern(total_seconds, speech_seconds, pause_seconds):
+    mask = np.zeros(int(total_seconds / FRAME), dtype=bool)
+    t = 0.0
+    while t < total_seconds:
+        mask[int(t / FRAME):int(min(t + speech_seconds, total_seconds) / FRAME)] = True
+        t += speech_seconds + pause_seconds
+    return mask
+
+
+def energy_blocks(mask, block_frames=3000):
+    energy = np.where(mask, -10.0, -60.0).astype(np.float32)
+    return (energy[start:start + block_frames] for start in range(0, len(energy), block_frames))
+
+
+@pytest.mark.parametrize('pause_seconds', [0.5, 2.5, 5.0])
+def test_long_input_gives_about_duration_over_target_segments(pause_seconds):
+    mask = speech_pattern(3600, 8, pause_seconds)
+    segments = vad.plan_segments(mask, 600)
+    # Every segment but the last ends in the last search window of its target length
+    assert 6 <= len(segments) <= 3600 / (600 * (1 - vad.SEARCH_WINDOW_RATIO)) + 1
+    assert all(end - start <= 600 for start, end in segments)
+
+
+def test_segments_end_in_pauses_and_skip_them():
+    mask = speech_pattern(3600, 8, 2.5)
+    segments = vad.plan_segments(mask, 600)
+    for (_, end), (next_start, _) in zip(segments, segments[1:]):
+        assert not mask[int(end / FRAME)]
+        assert mask[int(next_start / FRAME)]
+        assert next_start > end
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    mask = np.zeros(int(60 / FRAME), dtype=bool)
+    mask[int(10 / FRAME):int(50 / FRAME)] = True
+    assert vad.plan_segments(mask, 600) == [(10.0, 50.0)]
+
+
+def test_speech_without_pauses_is_cut_at_the_target():
+    segments = vad.plan_segments(np.ones(int(25 / FRAME), dtype=bool), 10)
+    assert segments == [(0.0, 10.0), (10.0, 20.0), (20.0, 25.0)]
+
+
+def test_silence_only_gives_no_segments():
+    assert vad.plan_segments(np.zeros(1000, dtype=bool), 10) == []
+    assert list(vad.plan_segments_stream(iter([np.full(1000, -60.0, dtype=np.float32)]), 10)) == []
+
+
+def test_stream_yields_segments_before_the_input_ends():
+    mask = speech_pattern(3600, 8, 2.5)
+    consumed = []
+
+    def blocks():
+        for block in energy_blocks(mask):
+            consumed.append(len(block))
+            yield block
+
+    stream = vad.plan_segments_stream(blocks(), 600)
+    first = next(stream)
+    assert first[1] <= 600
+    # Only the audio up to a little past the first segment has been decoded
+    assert sum(consumed) * FRAME < 600 + 60 + 1
+    assert len([first] + list(stream)) == len(vad.plan_segments(mask, 600))
+
+
+def test_long_silences_end_the_segment_and_are_dropped():
+    mask = np.zeros(int(400 / FRAME), dtype=bool)
+    mask[:int(60 / FRAME)] = True
+    mask[int(300 / FRAME):] = True
+
+    assert vad.plan_segments(mask, 600) == [(0.0, 60.0), (300.0, 400.0)]
+    # The streamed plan runs on the detected speech, which the hangover widens by 0.1 s
+    assert list(vad.plan_segments_stream(energy_blocks(mask), 600)) == [(0.0, 60.1), (299.9, 400.0)]
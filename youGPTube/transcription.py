@@ -0,0 +1,95 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+# "openai" (Whisper API) or "local" (faster-whisper on CPU, no network needed)
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "openai")
+# Backend used for a segment when the primary one still fails after all retries ("local" or "")
+TRANSCRIPTION_FALLBACK = os.getenv("TRANSCRIPTION_FALLBACK", "")
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", 4))
+TRANSCRIPTION_RETRIES = 3
+TRANSCRIPTION_BACKOFF_SECONDS = 1.0
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "base")
+
+
+def openai_transcribe(audio_file, model="whisper-1"):
+    with open(audio_file, "rb") as audio:
+        response = openai.Audio.transcribe(model=model, file=audio)
+    return response.get("text", "")
+
+
+# Local Whisper on CPU with faster-whisper (CTranslate2, int8); the model is loaded on first use
+class LocalWhisperTranscriber:
+    def __init__(self, model_size=LOCAL_WHISPER_MODEL, workers=TRANSCRIPTION_WORKERS):
+        self.model_size = model_size
+        self.workers = workers
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from faster_whisper import WhisperModel
+                    self._model = WhisperModel(self.model_size, device="cpu", compute_type="int8", num_workers=self.workers)
+        return self._model
+
+    def __call__(self, audio_file):
+        segments, _ = self.model.transcribe(audio_file, vad_filter=True)
+        return " ".join(segment.text.strip() for segment in segments)
+
+
+local_transcriber = LocalWhisperTranscriber()
+
+TRANSCRIBERS = {
+    "openai": openai_transcribe,
+    "local": local_transcriber,
+}
+
+
+# Call fn(*args), retrying with exponential backoff (plus jitter) on any exception
+def with_retries(fn, *args, retries=TRANSCRIPTION_RETRIES, backoff=TRANSCRIPTION_BACKOFF_SECONDS):
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+            logging.warning(f"Transcription attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def transcribe_segment(audio_file, transcribe, fallback, retries, backoff):
+    try:
+        return with_retries(transcribe, audio_file, retries=retries, backoff=backoff)
+    except Exception as e:
+        if fallback is None:
+            raise RuntimeError(f"Error during transcription of {audio_file}: {str(e)}")
+        logging.error(f"Transcription of {audio_file} failed ({e}); using fallback backend")
+        return fallback(audio_file)
+
+
+# Transcribe (audio_file, start_seconds) segments concurrently on a bounded pool.
+# Segments are submitted as the iterable produces them (e.g. while ffmpeg is still cutting),
+# and the results are reassembled in timestamp order.
+def transcribe_segments(audio_files_with_times, transcribe=None, fallback=None, max_workers=TRANSCRIPTION_WORKERS,
+                        retries=TRANSCRIPTION_RETRIES, backoff=TRANSCRIPTION_BACKOFF_SECONDS):
+    transcribe = transcribe or TRANSCRIBERS[TRANSCRIPTION_BACKEND]
+    if fallback is None and TRANSCRIPTION_FALLBACK and TRANSCRIPTION_FALLBACK != TRANSCRIPTION_BACKEND:
+        fallback = TRANSCRIBERS[TRANSCRIPTION_FALLBACK]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (start_time, executor.submit(transcribe_segment, audio_file, transcribe, fallback, retries, backoff))
+            for audio_file, start_time in audio_files_with_times
+        ]
+        transcripts = [{"timestamp": start_time, "text": future.result()} for start_time, future in futures]
+
+    return sorted(transcripts, key=lambda transcript: transcript["timestamp"])
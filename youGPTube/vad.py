@@ -0,0 +1,176 @@
+import numpy as np
+
+# Energy-based voice activity detection used to choose where audio is cut for transcription.
+# Everything works on per-frame energies, so an hour of audio is ~180k floats.
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+# A frame is speech when it is this far above the estimated noise floor
+THRESHOLD_DB = 12.0
+NOISE_PERCENTILE = 10
+# Speech frames are extended by this much on both sides so word edges are not clipped
+HANGOVER_SECONDS = 0.1
+# Silences at least this long are valid cut points
+MIN_CUT_SILENCE_SECONDS = 0.2
+# Silences at least this long end the segment and are dropped entirely; shorter pauses are kept
+# inside segments so that speech is merged up to the target length
+DROP_SILENCE_SECONDS = 10.0
+# Cuts are searched for in the last quarter of each target-length window
+SEARCH_WINDOW_RATIO = 0.25
+
+
+# RMS energy (dB) per frame for a stream of 16-bit mono PCM, yielded block by block as it is read
+def frame_energy_blocks(stream, sample_rate=SAMPLE_RATE, frame_seconds=FRAME_SECONDS, frames_per_block=3000):
+    frame_samples = int(sample_rate * frame_seconds)
+    block_bytes = frame_samples * 2 * frames_per_block
+    remainder = b''
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        data = remainder + data
+        usable = len(data) - len(data) % (frame_samples * 2)
+        remainder = data[usable:]
+        if usable:
+            yield frame_energy(np.frombuffer(data[:usable], dtype=np.int16), frame_samples)
+
+
+def frame_energy(samples, frame_samples):
+    frames = samples[:len(samples) - len(samples) % frame_samples].reshape(-1, frame_samples).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return (20 * np.log10(rms + 1e-6)).astype(np.float32)
+
+
+# Boolean speech mask: above an adaptive threshold, then dilated by the hangover
+def speech_mask(energy_db, frame_seconds=FRAME_SECONDS, threshold_db=THRESHOLD_DB, hangover_seconds=HANGOVER_SECONDS):
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy_db, NOISE_PERCENTILE)
+    return dilate(energy_db > noise_floor + threshold_db, int(hangover_seconds / frame_seconds))
+
+
+def dilate(mask, hangover):
+    if not hangover:
+        return mask.copy()
+    return np.convolve(mask, np.ones(2 * hangover + 1), mode='same') > 0
+
+
+# Percentile of every energy seen so far, from a histogram of 0.5 dB bins: constant memory and
+# constant work per frame, however long the stream
+class RunningPercentile:
+    LOW_DB, HIGH_DB, BIN_DB = -130.0, 100.0, 0.5
+
+    def __init__(self):
+        self.counts = np.zeros(int((self.HIGH_DB - self.LOW_DB) / self.BIN_DB) + 1, dtype=np.int64)
+
+    def add(self, energy_db):
+        bins = np.clip(((energy_db - self.LOW_DB) / self.BIN_DB).astype(np.int64), 0, len(self.counts) - 1)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def percentile(self, q):
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, cumulative[-1] * q / 100))
+        return self.LOW_DB + index * self.BIN_DB
+
+
+# (start, end) frame indices of each run of False in mask
+def silent_runs(mask):
+    edges = np.diff(np.concatenate(([1], mask.astype(np.int8), [1])))
+    return np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+
+
+# Plan segments (in frames) over mask[start:limit], where the mask is final up to `limit`.
+# Each segment starts at the first speech frame and runs up to target frames, ending where the
+# longest silence in the last search window begins (at the window end if it has none), so speech
+# is merged across pauses and the silence at each cut is trimmed. A silence of at least `drop`
+# frames ends the segment early and is skipped. Unless `final`, planning stops when the next
+# segment could reach past `limit`. Returns (segments, frame to continue from).
+def _plan(mask, start, limit, final, target, window, min_cut, drop):
+    segments = []
+    while True:
+        speech = np.flatnonzero(mask[start:limit])
+        if not len(speech):
+            return segments, limit
+        segment_start = start + int(speech[0])
+        # A silence starting before the target is only known to be long enough to drop once
+        # `drop` frames past the target have been seen
+        if not final and segment_start + target + drop > limit:
+            return segments, segment_start
+
+        silence_starts, silence_ends = silent_runs(mask[segment_start:min(segment_start + target + drop, limit)])
+        long_silences = silence_starts[(silence_ends - silence_starts >= drop) & (silence_starts < target)]
+        if len(long_silences):
+            segments.append((segment_start, segment_start + int(long_silences[0])))
+            start = segments[-1][1]
+            continue
+
+        if segment_start + target >= limit:
+            segments.append((segment_start, start + int(speech[-1]) + 1))
+            return segments, limit
+
+        low, high = segment_start + target - window, segment_start + target
+        silence_starts, silence_ends = silent_runs(mask[low:limit])
+        candidates = (silence_starts <= high - low) & (silence_ends - silence_starts >= min_cut)
+        if candidates.any():
+            starts, lengths = silence_starts[candidates], (silence_ends - silence_starts)[candidates]
+            # Longest silence; ties go to the one closest to the target
+            end = low + int(starts[len(starts) - 1 - np.argmax(lengths[::-1])])
+        else:
+            end = high
+        segments.append((segment_start, max(end, segment_start + 1)))
+        start = segments[-1][1]
+
+
+def _to_seconds(segments, frame_seconds):
+    return [(round(float(start * frame_seconds), 3), round(float(end * frame_seconds), 3)) for start, end in segments]
+
+
+# Plan segments as (start_seconds, end_seconds) for a whole speech mask. Segments hold about
+# target_seconds of audio each (never more), so a long recording gives about duration / target
+# segments however often the speaker pauses; leading and trailing silence is left out.
+def plan_segments(mask, target_seconds, frame_seconds=FRAME_SECONDS, min_cut_silence_seconds=MIN_CUT_SILENCE_SECONDS,
+                  drop_silence_seconds=DROP_SILENCE_SECONDS, search_window_ratio=SEARCH_WINDOW_RATIO):
+    target = max(int(target_seconds / frame_seconds), 1)
+    window = int(target * search_window_ratio)
+    segments, _ = _plan(mask, 0, len(mask), True, target, window, int(min_cut_silence_seconds / frame_seconds),
+                        max(int(drop_silence_seconds / frame_seconds), 1))
+    return _to_seconds(segments, frame_seconds)
+
+
+# plan_segments over frame energies arriving in blocks (e.g. while ffmpeg is still decoding):
+# each segment is yielded as soon as the audio up to its end has been seen. The noise floor is a
+# running estimate over all energies read so far, and only the frames not yet planned are kept
+# and classified against it, so every block costs the same however long the stream is.
+def plan_segments_stream(energy_blocks, target_seconds, frame_seconds=FRAME_SECONDS, threshold_db=THRESHOLD_DB,
+                         hangover_seconds=HANGOVER_SECONDS, min_cut_silence_seconds=MIN_CUT_SILENCE_SECONDS,
+                         drop_silence_seconds=DROP_SILENCE_SECONDS, search_window_ratio=SEARCH_WINDOW_RATIO):
+    target = max(int(target_seconds / frame_seconds), 1)
+    window = int(target * search_window_ratio)
+    min_cut = int(min_cut_silence_seconds / frame_seconds)
+    drop = max(int(drop_silence_seconds / frame_seconds), 1)
+    # The hangover lets later frames still turn the last ones into speech
+    hangover = int(hangover_seconds / frame_seconds)
+    noise_floor = RunningPercentile()
+    # Energies of the frames from `base` on; `start` is where the next segment is searched from
+    energy, base, start = np.zeros(0, dtype=np.float32), 0, 0
+
+    def mask_of(energy):
+        return dilate(energy > noise_floor.percentile(NOISE_PERCENTILE) + threshold_db, hangover)
+
+    for block in energy_blocks:
+        noise_floor.add(block)
+        energy = np.concatenate((energy, block))
+        # The noise floor is only trusted once a full segment's worth of audio has been seen
+        if base + len(energy) < target + drop:
+            continue
+
+        mask = mask_of(energy)
+        segments, next_start = _plan(mask, start - base, len(mask) - hangover, False, target, window, min_cut, drop)
+        yield from _to_seconds([(first + base, last + base) for first, last in segments], frame_seconds)
+        start = next_start + base
+        # Frames before the next segment are planned; keep the hangover before it as context
+        trim = max(start - base - hangover, 0)
+        energy, base = energy[trim:], base + trim
+
+    mask = mask_of(energy)
+    segments, _ = _plan(mask, start - base, len(mask), True, target, window, min_cut, drop)
+    yield from _to_seconds([(first + base, last + base) for first, last in segments], frame_seconds)
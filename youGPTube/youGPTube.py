@@ -1,12 +1,10 @@
 import datetime
 import os
-from transformers import pipeline
 import shutil
 import subprocess 
+import tempfile
 from flask import Flask, render_template, request, jsonify, session, url_for, redirect
-import librosa
 import openai
-import soundfile as sf
 import yt_dlp
 from yt_dlp.utils import DownloadError
 import logging
@@ -15,6 +13,11 @@ import ffmpeg
 from flask_sqlalchemy import SQLAlchemy
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
+from summarization import chunk_text_by_tokens, parallel_map, reduce_summaries
+from model_server import get_summarizer
+from transcription import TRANSCRIPTION_BACKEND, openai_transcribe, transcribe_segments
+import vad
+from audio_cache import AudioCache
 
 load_dotenv()
 
@@ -134,39 +137,149 @@ def youtube_to_mp3(youtube_url: str, output_dir: str, retries: int = 3) -> str:
             logging.error(f"Unexpected error: {str(e)}")
             raise
 
-# Function to chunk audio into smaller segments
-def chunk_audio(filename, segment_length: int, output_dir):
+# Speech-mode audio: transcription only needs 16 kHz mono, so a low-bitrate Opus file is enough
+AUDIO_PIPELINE = os.getenv("AUDIO_PIPELINE", "speech")  # "speech" or "mp3"
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_BITRATE = "24k"
+# Whisper rejects uploads over 25 MB; segments are sized to stay under this budget
+SPEECH_SEGMENT_BYTES = int(os.getenv("SPEECH_SEGMENT_BYTES", 24 * 1024 * 1024))
+# Segment length used for transcription; the byte budget can only shorten it. Shorter segments
+# are transcribed in parallel and keep segment timestamps useful.
+SEGMENT_SECONDS = 10 * 60
+
+# Downloaded audio, shared between requests and reused for repeat requests of the same video
+audio_cache = AudioCache()
+
+# Download the smallest audio-only format and transcode it once to 16 kHz mono Opus
+def youtube_to_speech_audio(youtube_url: str, output_dir: str, retries: int = 3) -> str:
+    if not check_ffmpeg():
+        raise RuntimeError("FFmpeg is not installed. Please install FFmpeg to continue.")
+
+    ydl_config = {
+        "format": "worstaudio[vcodec=none]/worstaudio/bestaudio/best",
+        "outtmpl": os.path.join(output_dir, "source.%(ext)s"),
+        "socket_timeout": 30,
+        "retries": retries,
+    }
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_config) as ydl:
+            info = ydl.extract_info(youtube_url, download=True)
+            source_filename = ydl.prepare_filename(info)
+    except DownloadError as e:
+        raise RuntimeError(f"Error downloading video after {retries} attempts: {str(e)}")
+
+    speech_filename = os.path.join(output_dir, "speech.webm")
+    (
+        ffmpeg
+        .input(source_filename)
+        .output(speech_filename, vn=None, ac=1, ar=SPEECH_SAMPLE_RATE, acodec="libopus",
+                audio_bitrate=SPEECH_BITRATE, application="voip")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    os.remove(source_filename)
+    return speech_filename
+
+# Segment length (in seconds): SEGMENT_SECONDS, or less if a segment that long would not stay
+# under the byte budget at the file's measured byte rate
+def segment_length_for_budget(filename, budget_bytes=SPEECH_SEGMENT_BYTES, max_seconds=SEGMENT_SECONDS):
+    duration = float(ffmpeg.probe(filename)["format"]["duration"])
+    bytes_per_second = os.path.getsize(filename) / max(duration, 1)
+    # Keep a margin for container overhead and bitrate variation between segments
+    return min(max(int(budget_bytes / bytes_per_second * 0.9), 1), max_seconds)
+
+# "vad" cuts in pauses near the target length; "fixed" cuts every segment_length seconds
+SEGMENTATION_MODE = os.getenv("SEGMENTATION_MODE", "vad")
+
+# Function to chunk audio into segments of at most segment_length seconds.
+# Yields (segment_path, start_seconds) pairs, where start_seconds is the position in the original audio.
+def chunk_audio(filename, segment_length: int, output_dir, mode=SEGMENTATION_MODE):
     if not os.path.isdir(output_dir):
-        os.mkdir(output_dir)
-
-    audio, sr = librosa.load(filename, sr=44100)
-    duration = librosa.get_duration(y=audio, sr=sr)
-    num_segments = int(duration / segment_length) + 1
-
-    chunked_audio_files_with_times = []
-    for i in range(num_segments):
-        start = int(i * segment_length * sr)
-        end = int((i + 1) * segment_length * sr)
-        segment = audio[start:end]
-        chunk_filename = os.path.join(output_dir, f"segment_{str(i).zfill(3)}.mp3")
-        sf.write(chunk_filename, segment, sr)
-        chunked_audio_files_with_times.append((chunk_filename, start))
-
-    return chunked_audio_files_with_times
-
-# Function to transcribe audio using OpenAI
-def transcribe_audio(audio_files_with_times: list, model="whisper-1") -> list:
-    transcripts = []
-    for audio_file, start_time in audio_files_with_times:
-        audio = open(audio_file, "rb")
-        try:
-            response = openai.Audio.transcribe(model=model, file=audio)  # Updated method to transcribe audio
-            if "text" in response:
-                transcripts.append({"timestamp": start_time, "text": response["text"]})
-        except Exception as e:  # Catch all exceptions since openai.error is no longer available
-            logging.error(f"Error during transcription: {str(e)}")
-            raise RuntimeError(f"Error during transcription: {str(e)}")
-    return transcripts
+        os.makedirs(output_dir)
+    if mode == "vad":
+        return chunk_audio_vad(filename, segment_length, output_dir)
+    return chunk_audio_fixed(filename, segment_length, output_dir)
+
+# Fixed-length cuts. ffmpeg cuts the file without decoding it (-c copy), so memory stays bounded by one segment.
+# This is a generator: each segment is yielded as soon as ffmpeg finishes writing it, so
+# transcription of segment 0 can start while later segments are still being cut.
+def chunk_audio_fixed(filename, segment_length: int, output_dir):
+    _, extension = os.path.splitext(filename)
+    command = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', filename,
+        '-f', 'segment',
+        '-segment_time', str(segment_length),
+        '-reset_timestamps', '1',
+        '-c', 'copy',
+        # ffmpeg writes one "file,start,end" line here when each segment is complete
+        '-segment_list', 'pipe:1',
+        '-segment_list_type', 'csv',
+        os.path.join(output_dir, f"segment_%03d{extension}"),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            segment_name, start, _ = line.strip().rsplit(',', 2)
+            yield os.path.join(output_dir, segment_name), int(float(start))
+
+        process.wait()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to segment {filename}: {process.stderr.read().strip()}")
+    finally:
+        # Stop ffmpeg if the caller stops consuming segments early
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+# Frame energies of the audio, decoded by ffmpeg to 16 kHz mono PCM, yielded block by block while it decodes
+def audio_energy_blocks(filename):
+    command = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', filename,
+        '-vn', '-ac', '1', '-ar', str(vad.SAMPLE_RATE), '-f', 's16le', 'pipe:1',
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        yield from vad.frame_energy_blocks(process.stdout)
+        process.wait()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {filename}: {process.stderr.read().decode().strip()}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+# Silence-aware cuts: segments of about segment_length end in pauses, so words are not split between
+# segments, and the silence at each cut is left out. Segments are planned while the audio is still
+# being decoded, and each one is cut and yielded as soon as its end is known.
+def chunk_audio_vad(filename, segment_length: int, output_dir):
+    _, extension = os.path.splitext(filename)
+    kept = 0.0
+    for index, (start, end) in enumerate(vad.plan_segments_stream(audio_energy_blocks(filename), segment_length)):
+        segment_path = os.path.join(output_dir, f"segment_{index:03d}{extension}")
+        (
+            ffmpeg
+            .input(filename, ss=start, t=end - start)
+            .output(segment_path, c="copy")
+            .overwrite_output()
+            .run(quiet=True)
+        )
+        kept += end - start
+        yield segment_path, int(start)
+    logging.info(f"VAD kept {kept:.0f}s of audio")
+
+# Function to transcribe audio segments concurrently (Whisper API or local faster-whisper),
+# with retries per segment; results come back in timestamp order
+def transcribe_audio(audio_files_with_times, model="whisper-1") -> list:
+    transcribe = None
+    if TRANSCRIPTION_BACKEND == "openai":
+        transcribe = lambda audio_file: openai_transcribe(audio_file, model=model)
+    return transcribe_segments(audio_files_with_times, transcribe=transcribe)
 
 def get_transcription_from_youtube(youtube_url):
     try:
@@ -185,47 +298,71 @@ def get_transcription_from_youtube(youtube_url):
         # Handle any errors (e.g., video has no captions)
         raise Exception(f"Failed to get transcription: {str(e)}")
     
+# BART accepts at most 1024 input tokens; leave room for special tokens
+BART_MAX_INPUT_TOKENS = 900
+
+# Map-reduce settings for ChatCompletion summaries
+SUMMARY_CHUNK_TOKENS = 2000
+SUMMARY_TARGET_TOKENS = 600
+SUMMARY_MAX_WORKERS = 8
+
 def summarize_text(text, max_length=150, min_length=50):
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+    # Shared model server: the model is loaded once per process and chunks are batched across requests
+    summarizer = get_summarizer()
     
-    # Split the text into chunks that the model can handle
-    max_chunk_length = 1024
-    chunks = [text[i:i+max_chunk_length] for i in range(0, len(text), max_chunk_length)]
+    # Split the text into chunks the model can handle, on sentence boundaries and counted in model tokens
+    count_bart_tokens = lambda chunk: len(summarizer.tokenizer.encode(chunk, add_special_tokens=False))
+    chunks = chunk_text_by_tokens(text, BART_MAX_INPUT_TOKENS, count=count_bart_tokens)
     
-    summaries = []
-    for chunk in chunks:
-        summary = summarizer(chunk, max_length=max_length, min_length=min_length, do_sample=False)[0]['summary_text']
-        summaries.append(summary)
-    
-    return summaries
-
-
-# Function to summarize transcribed audio
+    return summarizer.summarize(chunks, max_length=max_length, min_length=min_length)
+
+
+def chat_summary(system_prompt, content, model="gpt-3.5-turbo"):
+    response = openai.ChatCompletion.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": content},
+        ],
+    )
+    return response["choices"][0]["message"]["content"]
+
+# Function to summarize transcribed audio.
+# Each transcribed segment is split on sentence boundaries into chunks that fit one request,
+# and all chunks are summarized in parallel (map phase); results keep their timestamps and order.
 def summarize(chunks_with_timestamps: list, system_prompt: str, model="gpt-3.5-turbo"):
-    summaries = []
+    work = []
     for chunk in chunks_with_timestamps:
         timestamp = chunk.get("timestamp", 0)
-        content = chunk.get("text", "")
-        
+        for content in chunk_text_by_tokens(chunk.get("text", ""), SUMMARY_CHUNK_TOKENS):
+            work.append((timestamp, content))
+
+    def summarize_chunk(item):
+        timestamp, content = item
         # Format the timestamp in minutes and seconds
         minutes = timestamp // 60
         seconds = timestamp % 60
         timestamp_formatted = f"{minutes:02d}:{seconds:02d}"
 
         # Generate the summary using OpenAI ChatCompletion
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": content},
-            ],
-        )
-        summary = response["choices"][0]["message"]["content"]
-        
-        # Append the formatted timestamp and summary
-        summaries.append(f"[{timestamp_formatted}] {summary}")
-
-    return summaries
+        summary = chat_summary(system_prompt, content, model=model)
+        return f"[{timestamp_formatted}] {summary}"
+
+    return parallel_map(summarize_chunk, work, max_workers=SUMMARY_MAX_WORKERS)
+
+# Reduce phase: merge the section summaries hierarchically into one overview
+def summarize_overview(summaries: list, model="gpt-3.5-turbo"):
+    system_prompt = (
+        "You are a helpful assistant that combines partial summaries of one YouTube video. "
+        "Merge them into a single, concise set of clear bullet points without repeating yourself."
+    )
+    return reduce_summaries(
+        summaries,
+        lambda text: chat_summary(system_prompt, text, model=model),
+        target_tokens=SUMMARY_TARGET_TOKENS,
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        max_workers=SUMMARY_MAX_WORKERS,
+    )
 
 def your_summarization_function(video_url):
     video_id = extract_video_id(video_url)
@@ -252,19 +389,29 @@ def summarize_video():
     
     return jsonify({'summaries': summaries})
 
+# Download (or reuse from the audio cache) the audio for a video in the configured pipeline's format
+def get_video_audio(youtube_url):
+    video_id = extract_video_id(youtube_url) or youtube_url
+    if AUDIO_PIPELINE == "speech":
+        produce = lambda work_dir: youtube_to_speech_audio(youtube_url, output_dir=work_dir)
+        return audio_cache.get_or_create(video_id, f"opus-{SPEECH_SAMPLE_RATE}-{SPEECH_BITRATE}", ".webm", produce)
+    produce = lambda work_dir: youtube_to_mp3(youtube_url, output_dir=work_dir)
+    return audio_cache.get_or_create(video_id, "mp3-192", ".mp3", produce)
+
 # Main function to process YouTube videos
 def summarize_youtube_video(youtube_url, outputs_dir):
-    raw_audio_dir = os.path.join(outputs_dir, "raw_audio")
-    chunks_dir = os.path.join(outputs_dir, "chunks")
-    segment_length = 10 * 60  # 10 minutes
-
-    if os.path.exists(outputs_dir):
-        shutil.rmtree(outputs_dir)
-    os.makedirs(outputs_dir)
+    # Each request cuts its segments in a private directory, so concurrent requests do not collide
+    os.makedirs(outputs_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="request-", dir=outputs_dir)
+    chunks_dir = os.path.join(work_dir, "chunks")
 
     try:
-        # Download audio and chunk it
-        audio_filename = youtube_to_mp3(youtube_url, output_dir=raw_audio_dir)
+        # Download audio (shared through the cache) and chunk it
+        audio_filename = get_video_audio(youtube_url)
+        if AUDIO_PIPELINE == "speech":
+            segment_length = segment_length_for_budget(audio_filename)
+        else:
+            segment_length = SEGMENT_SECONDS
         chunked_audio_files = chunk_audio(audio_filename, segment_length=segment_length, output_dir=chunks_dir)
         
         # Transcribe the chunked audio files
@@ -273,6 +420,10 @@ def summarize_youtube_video(youtube_url, outputs_dir):
         # Generate summaries
         system_prompt = "You are a helpful assistant that summarizes YouTube videos. Summarize the transcription to clear bullet points."
         summaries = summarize(transcriptions, system_prompt=system_prompt)
+
+        # Lead with an overview of the whole video when it has more than one section
+        if len(summaries) > 1:
+            summaries = [f"[Overview] {summarize_overview(summaries)}"] + summaries
         
         return transcriptions, summaries
     
@@ -280,6 +431,9 @@ def summarize_youtube_video(youtube_url, outputs_dir):
         logging.error(f"An error occurred during video processing: {str(e)}", exc_info=True)
         raise
 
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
     
 @app.route('/history_item/<int:history_id>', methods=['GET'])
 def get_history_item(history_id):
@@ -308,6 +462,12 @@ def delete_history(history_id):
     logging.info(f"Deleted history record with id: {history_id}")
     return jsonify({"success": True})
 
+# Per-batch wall and CPU timings of the local summarization model: CPU of the batching thread,
+# and of the whole process while the batch ran
+@app.route('/summarizer_stats', methods=['GET'])
+def summarizer_stats():
+    return jsonify(get_summarizer().stats())
+
 @app.route('/clear_session')
 def clear_session():
     session.clear()